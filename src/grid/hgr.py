@@ -25,12 +25,17 @@ Created on Mon Feb 03 18:01:00 2025.
 import copy
 import json
 import warnings
+from collections.abc import MutableMapping
+from functools import partial
 
 import numpy as np
 
 # Internal imports
 from pybdy.reader.factory import GetFile
 
+# points either side of a chunk needed to calculate the scale factors
+HALO = 3
+
 
 class H_Grid:
     def __init__(self, hgr_file, name_map_file, logger, dst=1):
@@ -54,7 +59,8 @@ class H_Grid:
         self.logger = logger
         self.dst = dst
         self.grid_type = ""
-        self.grid = {}  # grid variables
+        self.grid = GridVars()  # grid variables
+        self.file_vars = {}  # file names of the variables read from disk
 
         # TODO: enable .ncml option for loading variables
         if ".ncml" in self.file_path:
@@ -90,15 +96,31 @@ class H_Grid:
         # Work out what sort of source grid we have
         self.find_hgrid_type()
 
-        # Fill in missing variables we need for the grid type
+        # Fill in missing variables we need for the grid type, the scale
+        # factors are only calculated when they are used
         missing_vars = sorted(list(set(vars_want) - set(self.var_list)))
+        missing_e = [vi for vi in missing_vars if vi[0] == "e"]
+        missing_vars = sorted(list(set(missing_vars) - set(missing_e)))
         self.grid = fill_hgrid_vars(self.grid_type, self.grid, missing_vars)
+        for vi in missing_e:
+            self.grid.add(
+                vi,
+                partial(
+                    calc_e1_e2,
+                    self.grid["glam" + vi[-1]],
+                    self.grid["gphi" + vi[-1]],
+                    int(vi[1]),
+                ),
+            )
         self.var_list = list(self.grid.keys())
 
     def get_vars(self, vars_want):
         """
         Get the glam, gphi and e scale factors from file if possible.
 
+        Only the variable shapes are checked here, the data are read from
+        file the first time each variable is used.
+
         Parameters
         ----------
             vars_want (list)       : variables needed from file.
@@ -127,18 +149,15 @@ class H_Grid:
         nc = GetFile(self.file_path)
         for vi in vars_want:
             if vi in nm_var_list:
-                grid_tmp = nc.nc[nm[vi]][:].squeeze()  # [t, y, x]
-                if np.ma.is_masked(grid_tmp):
-                    grid_tmp = grid_tmp.filled()
-                if len(grid_tmp.shape) == 3:
-                    self.grid[vi] = grid_tmp
-                elif len(grid_tmp.shape) == 2:
-                    self.grid[vi] = grid_tmp[np.newaxis, :, :]
+                shape = nc.nc[nm[vi]].shape
+                if len([s for s in shape if s != 1]) in [2, 3]:
+                    self.file_vars[vi] = nm[vi]
+                    self.grid.add(vi, partial(read_hgrid_var, self.file_path, nm[vi]))
                 else:
                     warnings.warn(
                         nm[vi]
                         + " shape "
-                        + grid_tmp.shape
+                        + str(shape)
                         + " does not match required dimensions [t, y, x]"
                     )
                     # We can calculate the var later if the wrong size
@@ -185,20 +204,136 @@ class H_Grid:
         self.logger.info("Horizonal grid is type: " + self.grid_type)
 
     def subset_hgr(self, grd, indices):
-        """Use indices to spatially subset the domain."""
+        """
+        Use indices to spatially subset the domain.
+
+        The coordinates already in memory are copied for the chunk. Scale
+        factors that have not been used are read from file for the chunk
+        only, or calculated on the chunk plus a halo of HALO points so they
+        match those calculated on the full domain.
+
+        Parameters
+        ----------
+            grd (str)              : t, u or v grid
+            indices (list)         : min and max, i and j indicies for chunk
+
+        Returns
+        -------
+            out (object)           : horizontal grid object for the chunk
+        """
         x1 = indices[0]
         x2 = indices[1]
         y1 = indices[2]
         y2 = indices[3]
-        out = copy.deepcopy(self)
+        out = copy.copy(self)
+        out.grid = GridVars()
         for var in self.var_list:
             # all grids are needed for GridAngle
-            out.grid[var] = self.grid[var][:, y1:y2, x1:x2]  # [t, y, x]
+            if self.grid.is_loaded(var):
+                out.grid[var] = self.grid[var][:, y1:y2, x1:x2].copy()  # [t, y, x]
+            elif var in self.file_vars:
+                out.grid.add(
+                    var,
+                    partial(
+                        read_hgrid_var, self.file_path, self.file_vars[var], indices
+                    ),
+                )
+            else:
+                ny, nx = self.grid["glam" + var[-1]].shape[-2:]
+                hx1 = max(x1 - HALO, 0)
+                hx2 = min(x2 + HALO, nx)
+                hy1 = max(y1 - HALO, 0)
+                hy2 = min(y2 + HALO, ny)
+                crop = (
+                    slice(None),
+                    slice(y1 - hy1, min(y2, ny) - hy1),
+                    slice(x1 - hx1, min(x2, nx) - hx1),
+                )
+                out.grid.add(
+                    var,
+                    partial(
+                        calc_e1_e2_window,
+                        self.grid["glam" + var[-1]][:, hy1:hy2, hx1:hx2].copy(),
+                        self.grid["gphi" + var[-1]][:, hy1:hy2, hx1:hx2].copy(),
+                        int(var[1]),
+                        crop,
+                    ),
+                )
 
         out.indices = indices
         return out
 
 
+class GridVars(MutableMapping):
+    """
+    Dictionary of grid variables that are loaded when first used.
+
+    Variables can be added as arrays or as a function returning the array,
+    which is called and its result kept the first time the variable is used.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.loaders = {}
+
+    def add(self, name, loader):
+        """Add a variable that is loaded by calling loader when first used."""
+        self.data.pop(name, None)
+        self.loaders[name] = loader
+
+    def is_loaded(self, name):
+        """Return True if the variable is held in memory."""
+        return name in self.data
+
+    def __getitem__(self, name):
+        if name not in self.data:
+            self.data[name] = self.loaders.pop(name)()
+        return self.data[name]
+
+    def __setitem__(self, name, value):
+        self.loaders.pop(name, None)
+        self.data[name] = value
+
+    def __delitem__(self, name):
+        if name in self.data:
+            del self.data[name]
+        else:
+            del self.loaders[name]
+
+    def __iter__(self):
+        return iter(list(self.data) + list(self.loaders))
+
+    def __len__(self):
+        return len(self.data) + len(self.loaders)
+
+
+def read_hgrid_var(file_path, name, indices=None):
+    """
+    Read a horizontal grid variable from file as [t, y, x].
+
+    Parameters
+    ----------
+            file_path (str)     : string of file for loading hgr data
+            name (str)          : name of the variable in the file
+            indices (list)      : min and max, i and j indicies to read, all if None
+
+    Returns
+    -------
+            grid_tmp (np.array) : horizontal grid variable [t, y, x]
+    """
+    nc = GetFile(file_path)
+    if indices is None:
+        grid_tmp = nc.nc[name][:]
+    else:
+        # assume y and x are the last two dimensions
+        x1, x2, y1, y2 = indices
+        grid_tmp = nc.nc[name][..., y1:y2, x1:x2]
+    nc.close()
+    if np.ma.is_masked(grid_tmp):
+        grid_tmp = grid_tmp.filled()
+    return grid_tmp.reshape((-1,) + grid_tmp.shape[-2:])
+
+
 def fill_hgrid_vars(grid_type, grid, missing):
     """
     Calculate the missing horizontal grid variables and add them to grid.
@@ -317,3 +452,21 @@ def calc_e1_e2(glam, gphi, ij):
         e[..., -1, :] = e[..., -2, :] - (e[..., -3, :] - e[..., -2, :])
 
     return e
+
+
+def calc_e1_e2_window(glam, gphi, ij, crop):
+    """
+    Calculate scale factor e1 or e2 on a window with a halo and crop it.
+
+    Parameters
+    ----------
+            glam (np.array)  : mesh variable glam (lon) with halo [time, j, i]
+            gphi (np.array)  : mesh variable gphi (lat) with halo [time, j, i]
+            ij (int)         : ij direction 1 (i or x direction) or 2 (j or y direction)
+            crop (tuple)     : slices of the window within the halo
+
+    Returns
+    -------
+            e (np.array)     : horizontal distance scale factor e
+    """
+    return calc_e1_e2(glam, gphi, ij)[crop]
@@ -42,6 +42,7 @@ class Z_Grid:
         grd,
         indices=[],
         dst=1,
+        loader=None,
     ):
         """
         Master depth class.
@@ -56,6 +57,7 @@ class Z_Grid:
             grd (str)                : t, u or v grid
             indices (list)           : min and max, i and j indicies for chunk
             dst (bool)               : flag for destination (true) or source (false)
+            loader (object)          : ZGridLoader shared between chunks and grids
 
         Returns
         -------
@@ -69,13 +71,11 @@ class Z_Grid:
         self.grid_type = ""
         self.grid = {}  # grid variables
 
-        # TODO: enable .ncml option for loading variables
-        if ".ncml" in self.file_path:
-            raise Exception("Use .nc file for zgr input not .ncml")
-
-        nc = GetFile(self.file_path)
-        self.var_list = nc.nc.variables.keys()
-        nc.close()
+        if loader is None:
+            zgr_loader = ZGridLoader(self.file_path, self.name_map, dst)
+        else:
+            zgr_loader = loader
+        self.var_list = zgr_loader.var_list
 
         # Load what we can from grid file
         vars_want = [
@@ -103,15 +103,18 @@ class Z_Grid:
 
         if indices == []:
             indices = [0, None, 0, None]  # None is end for slice
-        self.get_vars(vars_want, indices)
+        self.get_vars(vars_want, indices, zgr_loader)
 
         # Work out what sort of source grid we have
         self.find_zgrid_type(zgr_type)
 
-        # Fill in missing variables we need for the grid type
-        missing_vars = sorted(list(set(vars_want) - set(self.var_list)))
-
-        self.grid = fill_zgrid_vars(self.grid_type, self.grid, hgr_type, missing_vars)
+        # Fill in missing variables we need for the grid type, these are
+        # shared with other grids and chunks using the same window
+        self.grid = zgr_loader.fill_vars(
+            self.grid_type, hgr_type, vars_want, indices
+        ).copy()
+        if loader is None:
+            zgr_loader.close()
         for var in list(self.grid.keys()):
             if var in ["mbathy", "ln_zco", "ln_zps", "ln_sco"]:
                 continue
@@ -131,7 +134,7 @@ class Z_Grid:
                 self.grid.pop(var, None)
         self.var_list = list(self.grid.keys())
 
-    def get_vars(self, vars_want, ind):
+    def get_vars(self, vars_want, ind, loader=None):
         """
         Get the gdep and e3 scale factors from file if possible.
 
@@ -139,36 +142,19 @@ class Z_Grid:
         ----------
             vars_want (list)       : variables needed from file.
             ind (list)             : min and max, i and j indicies for chunk
+            loader (object)        : ZGridLoader to read from, opened if None
 
         Returns
         -------
             None    : var_list is populated
         """
-        # find the variables that have been name mapped
-        if self.dst:
-            vm = "dst_"
+        if loader is None:
+            zgr_loader = ZGridLoader(self.file_path, self.name_map, self.dst)
         else:
-            vm = "sc_"
-
-        with open(self.name_map, "r") as j:
-            nm = json.loads(j.read())[vm + "variable_map"]
-
-        name_map_k = list(nm.keys())
-        name_map_v = list(nm.values())
-        nm_var_list = []
-        for i in range(len(name_map_v)):
-            if name_map_v[i] in self.var_list:
-                nm_var_list.append(name_map_k[i])
-
-        # get variables from file
-        nc = GetFile(self.file_path)
-        for vi in vars_want:
-            if (vi in nm_var_list) & ("ln_" not in vi):
-                # assume y and x are last two dimensions in t, z, y, x
-                self.grid[vi] = nc.nc[nm[vi]][..., ind[2] : ind[3], ind[0] : ind[1]]
-            elif (vi in nm_var_list) & ("ln_" in vi):
-                self.grid[vi] = nc.nc[nm[vi]][:]
-        nc.close()
+            zgr_loader = loader
+        self.grid.update(zgr_loader.get_vars(vars_want, ind))
+        if loader is None:
+            zgr_loader.close()
         self.var_list = list(self.grid.keys())
 
     def find_zgrid_type(self, zgr_type):
@@ -205,6 +191,102 @@ class Z_Grid:
         self.logger.info("Vertical grid is type: " + self.grid_type)
 
 
+class ZGridLoader:
+    def __init__(self, zgr_file, name_map_file, dst=1):
+        """
+        Read vertical grid windows from a zgr file that is opened once.
+
+        The variables read and derived for each window are kept so that chunks
+        and t, u and v grids using the same window share the arrays rather
+        than reading and calculating them again.
+
+        Parameters
+        ----------
+            zgr_file (str)           : string of file for loading zgr data
+            name_map_file (str)      : string of file for mapping variable names
+            dst (bool)               : flag for destination (true) or source (false)
+
+        Returns
+        -------
+            ZGridLoader (object)     : vertical grid loader object
+        """
+        self.file_path = zgr_file
+
+        # TODO: enable .ncml option for loading variables
+        if ".ncml" in self.file_path:
+            raise Exception("Use .nc file for zgr input not .ncml")
+
+        self.nc = GetFile(self.file_path)
+        self.var_list = list(self.nc.nc.variables.keys())
+
+        # find the variables that have been name mapped
+        if dst:
+            vm = "dst_"
+        else:
+            vm = "sc_"
+
+        with open(name_map_file, "r") as j:
+            nm = json.loads(j.read())[vm + "variable_map"]
+        self.name_map = {k: v for k, v in nm.items() if v in self.var_list}
+        self.read = {}
+        self.filled = {}
+
+    def get_vars(self, vars_want, ind):
+        """
+        Get the gdep and e3 scale factors from file for a window.
+
+        Parameters
+        ----------
+            vars_want (list)       : variables needed from file.
+            ind (list)             : min and max, i and j indicies for chunk
+
+        Returns
+        -------
+            grid (dict)            : vertical grid variables read from file
+        """
+        key = (tuple(vars_want), tuple(ind))
+        if key not in self.read:
+            grid = {}
+            for vi in vars_want:
+                if (vi in self.name_map) & ("ln_" not in vi):
+                    # assume y and x are last two dimensions in t, z, y, x
+                    grid[vi] = self.nc.nc[self.name_map[vi]][
+                        ..., ind[2] : ind[3], ind[0] : ind[1]
+                    ]
+                elif (vi in self.name_map) & ("ln_" in vi):
+                    grid[vi] = self.nc.nc[self.name_map[vi]][:]
+            self.read[key] = grid
+        return self.read[key].copy()
+
+    def fill_vars(self, zgr_type, hgr_type, vars_want, ind):
+        """
+        Get the vertical grid variables for a window filling in missing ones.
+
+        Parameters
+        ----------
+            zgr_type (str)         : type of vertical grid (zco, zps or sco)
+            hgr_type (str)         : horizontal grid type
+            vars_want (list)       : variables needed from file.
+            ind (list)             : min and max, i and j indicies for chunk
+
+        Returns
+        -------
+            grid (dict)            : vertical grid variables for all grids
+        """
+        key = (zgr_type, hgr_type, tuple(vars_want), tuple(ind))
+        if key not in self.filled:
+            grid = self.get_vars(vars_want, ind)
+            missing_vars = sorted(list(set(vars_want) - set(grid.keys())))
+            self.filled[key] = fill_zgrid_vars(zgr_type, grid, hgr_type, missing_vars)
+        return self.filled[key]
+
+    def close(self):
+        """Close the zgr file and release the shared variables."""
+        self.nc.close()
+        self.read = {}
+        self.filled = {}
+
+
 def fill_zgrid_vars(zgr_type, grid, hgr_type, missing):
     """
     Calculate the missing vertical grid variables and add them to grid.
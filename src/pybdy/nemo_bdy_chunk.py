@@ -24,6 +24,8 @@ Created on Thu Dec 19 10:39:46 2024.
 import warnings
 
 import numpy as np
+import scipy.sparse as sparse
+from scipy.sparse import csgraph
 
 
 def chunk_bdy(bdy):
@@ -65,6 +67,9 @@ def chunk_land(ibdy, jbdy, chunk_number, rw):
     """
     Find natural breaks in the boundary looking for gaps in i and j.
 
+    Points that are next to each other, including diagonally, are in the
+    same chunk. The chunks are numbered in the order of their first point.
+
     Parameters
     ----------
         ibdy (numpy.array)         : index in i direction
@@ -76,48 +81,63 @@ def chunk_land(ibdy, jbdy, chunk_number, rw):
     -------
         chunk_number (numpy.array) : array of chunk numbers
     """
-    if np.min(chunk_number) <= -1:
-        chk = 0
-    else:
-        chk = np.min(chunk_number)
-
-    for i in range(np.shape(ibdy)[0]):
-        # Subtract i and j index of point from the rest and test abs value
-        i_abs = np.abs(ibdy - ibdy[i])
-        j_abs = np.abs(jbdy - jbdy[i])
-        closeness_test = (i_abs <= 1) & (j_abs <= 1)
-
-        # Sanity check if the point is alone
-        if np.sum(closeness_test) == 1:
-            warnings.warn("One of the boundary chunks has only one grid point.")
-
-        # Check if any of these points already has a chunk number
-        chk_true = chunk_number[closeness_test] != -1
-        if any(chk_true):
-            lowest_chk = np.min(chunk_number[closeness_test][chk_true])
-            other_chk = np.unique(chunk_number[closeness_test][chk_true])
-            chunk_number[closeness_test] = lowest_chk
-            for c in range(len(other_chk)):
-                chunk_number[chunk_number == other_chk[c]] = lowest_chk
-        else:
-            lowest_chk = chk * 1
-            chk = chk + 1
-            chunk_number[closeness_test] = lowest_chk
+    n_pt = np.shape(ibdy)[0]
+    if n_pt == 0:
+        return chunk_number * 1
+
+    # Hash the (i, j) of each point so neighbours can be found by sorting
+    i_pt = np.asarray(ibdy, dtype=np.int64) - np.min(ibdy) + 1
+    j_pt = np.asarray(jbdy, dtype=np.int64) - np.min(jbdy) + 1
+    nj = np.max(j_pt) + 2
+    key = i_pt * nj + j_pt
+    order = np.argsort(key, kind="stable")
+    key_s = key[order]
+    uniq_key, first, count = np.unique(key_s, return_index=True, return_counts=True)
+
+    # Link each point to the first point at each of its 8 neighbours and
+    # at its own location
+    row = []
+    col = []
+    n_close = np.zeros(n_pt, dtype=int)
+    for di in [-1, 0, 1]:
+        for dj in [-1, 0, 1]:
+            nkey = key + di * nj + dj
+            ind = np.clip(np.searchsorted(uniq_key, nkey), 0, len(uniq_key) - 1)
+            found = uniq_key[ind] == nkey
+            n_close[found] += count[ind[found]]
+            row.append(np.flatnonzero(found))
+            col.append(order[first[ind[found]]])
+
+    # Points already given the same chunk number stay together
+    assigned = np.flatnonzero(chunk_number != -1)
+    if len(assigned):
+        _, inv = np.unique(chunk_number[assigned], return_inverse=True)
+        _, first_chk = np.unique(inv, return_index=True)
+        row.append(assigned)
+        col.append(assigned[first_chk[inv]])
+
+    # Sanity check if any point is alone
+    if np.any(n_close == 1):
+        warnings.warn("One of the boundary chunks has only one grid point.")
+
+    row = np.concatenate(row)
+    col = np.concatenate(col)
+    graph = sparse.coo_matrix(
+        (np.ones(len(row), dtype=bool), (row, col)), shape=(n_pt, n_pt)
+    )
+    _, labels = csgraph.connected_components(graph, directed=False)
 
-    # Rectify the chunk numbers
-    all_chunk = np.unique(chunk_number)
-    np.max(chunk_number)
+    # Rectify the chunk numbers so they follow the first point of each chunk
+    _, first_pt = np.unique(labels, return_index=True)
+    rank = np.zeros(len(first_pt), dtype=int)
+    rank[np.argsort(first_pt)] = np.arange(len(first_pt))
     chunk_number_s = np.zeros_like(chunk_number) - 1
-    c = 0
-    for i in range(len(all_chunk)):
-        chunk_number_s[chunk_number == all_chunk[i]] = c
-        c = c + 1
-    chunk_number = chunk_number_s * 1
+    chunk_number_s[:] = rank[labels]
 
     # plt.scatter(ibdy, jbdy, c=chunk_number)
     # plt.show()
 
-    return chunk_number
+    return chunk_number_s
 
 
 def chunk_corner(ibdy, jbdy, rbdy, chunk_number, rw):
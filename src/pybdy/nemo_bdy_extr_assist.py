@@ -21,7 +21,10 @@ Created on Thu Dec 21 17:34:00 2024.
 
 # External imports
 import numpy as np
-import scipy.spatial as sp
+import scipy.sparse as sparse
+
+# Local imports
+from .utils.nemo_bdy_lib import kd_points, kd_query, kd_tree
 
 
 def get_ind(dst_lon, dst_lat, sc_lon, sc_lat):
@@ -156,16 +159,8 @@ def get_vertical_weights(dst_dep, dst_len_z, num_bdy, sc_z, sc_z_len, ind, zco):
         sc_z = sc_z9[:, 0, 0]
         dst_dep9_rv = dst_dep9.ravel(order="F")
         z_ind = np.zeros((dst_len_z * num_bdy * 9, 2), dtype=np.int64)
-        try:
-            source_tree = sp.cKDTree(
-                list(zip(sc_z.ravel(order="F"))),
-                balanced_tree=False,
-                compact_nodes=False,
-            )
-        except TypeError:  # fix for scipy 0.16.0
-            source_tree = sp.cKDTree(list(zip(sc_z.ravel(order="F"))))
-
-        junk, nn_id = source_tree.query(list(zip(dst_dep9_rv)), k=1)
+        source_tree = kd_tree(kd_points(sc_z.ravel(order="F")), reuse=True)
+        junk, nn_id = kd_query(source_tree, kd_points(dst_dep9_rv), k=1)
 
         # WORKAROUND: the tree query returns out of range val when
         # dst_dep point is NaN, causing ref problems later.
@@ -181,31 +176,7 @@ def get_vertical_weights(dst_dep, dst_len_z, num_bdy, sc_z, sc_z_len, ind, zco):
 
     else:
         # 3D depths
-        for i in range(num_bdy):
-            for j in range(9):
-                try:
-                    source_tree = sp.cKDTree(
-                        list(zip(sc_z9[:, i, j])),
-                        balanced_tree=False,
-                        compact_nodes=False,
-                    )
-                except TypeError:  # fix for scipy 0.16.0
-                    source_tree = sp.cKDTree(list(zip(sc_z9[:, i, j])))
-
-                junk, nn_id = source_tree.query(list(zip(dst_dep9[:, i, j])), k=1)
-
-                # WORKAROUND: the tree query returns out of range val when
-                # dst_dep point is NaN, causing ref problems later.
-                nn_id[nn_id == sc_z_len] = sc_z_len - 1
-
-                # Find next adjacent point in the vertical
-                z9_ind[:, i, j, 0] = nn_id
-                z9_ind[sc_z9[nn_id, i, j] > dst_dep9[:, i, j], i, j, 1] = (
-                    nn_id[sc_z9[nn_id, i, j] > dst_dep9[:, i, j]] - 1
-                )
-                z9_ind[sc_z9[nn_id, i, j] <= dst_dep9[:, i, j], i, j, 1] = (
-                    nn_id[sc_z9[nn_id, i, j] <= dst_dep9[:, i, j]] + 1
-                )
+        z9_ind = vertical_nearest(sc_z9, dst_dep9)
 
     # Adjust out of range values
     z9_ind[z9_ind == -1] = 0
@@ -238,6 +209,80 @@ def get_vertical_weights(dst_dep, dst_len_z, num_bdy, sc_z, sc_z_len, ind, zco):
     return z9_dist, z9_ind_rv
 
 
+def vertical_nearest(sc_z9, dst_dep9):
+    """
+    Find the nearest source level and the adjacent level for each destination depth.
+
+    All source columns are searched at once assuming depth increases
+    monotonically down each column. Columns that are not strictly increasing
+    and destination depths equidistant between two source levels fall back
+    to a cKDTree search of that column so the result is unchanged.
+
+    Parameters
+    ----------
+    sc_z9 (np.array)    : the depth of the source points [sc_z_len, nbdy, 9]
+    dst_dep9 (np.array) : the depth of the destination points [dst_len_z, nbdy, 9]
+
+    Returns
+    -------
+    z9_ind (np.array)   : the indices of the sc depth nearest and next
+                          adjacent [dst_len_z, nbdy, 9, 2]
+    """
+    sc_z_len = sc_z9.shape[0]
+    dst_len_z = dst_dep9.shape[0]
+    sc_col = sc_z9.reshape(sc_z_len, -1)
+    dst_col = dst_dep9.reshape(dst_len_z, -1)
+    n_col = sc_col.shape[1]
+    col = np.arange(n_col)
+
+    # Position of each dst depth in its source column, in blocks of columns
+    # to limit the size of the comparison array
+    pos = np.zeros((dst_len_z, n_col), dtype=np.int64)
+    n_blk = max(1, 2**24 // (sc_z_len * dst_len_z))
+    for b in range(0, n_col, n_blk):
+        pos[:, b : b + n_blk] = np.sum(
+            sc_col[:, np.newaxis, b : b + n_blk]
+            < dst_col[np.newaxis, :, b : b + n_blk],
+            axis=0,
+        )
+
+    # Nearest of the levels either side, compared as squared distance like cKDTree
+    z_lo = np.maximum(pos - 1, 0)
+    z_hi = np.minimum(pos, sc_z_len - 1)
+    d_lo = (dst_col - sc_col[z_lo, col]) ** 2
+    d_hi = (dst_col - sc_col[z_hi, col]) ** 2
+    nn_id = np.where(d_lo < d_hi, z_lo, z_hi)
+
+    # WORKAROUND: the tree query returns out of range val when
+    # dst_dep point is NaN, causing ref problems later.
+    dst_nan = np.isnan(dst_col)
+    nn_id[dst_nan] = sc_z_len - 1
+
+    # Find next adjacent point in the vertical
+    sc_nn = sc_col[nn_id, col]
+    z_ind = np.zeros((dst_len_z, n_col, 2), dtype=np.int64)
+    z_ind[:, :, 0] = nn_id
+    z_ind[:, :, 1] = np.where(sc_nn > dst_col, nn_id - 1, nn_id + 1)
+    z_ind[dst_nan, 1] = 0
+
+    # Search irregular columns or equidistant depths with a tree
+    irregular = np.invert(np.all(np.diff(sc_col, axis=0) > 0, axis=0))
+    irregular |= np.any((d_lo == d_hi) & (z_lo != z_hi), axis=0)
+    for c in np.nonzero(irregular)[0]:
+        source_tree = kd_tree(kd_points(sc_col[:, c]))
+        junk, nn_id = kd_query(source_tree, kd_points(dst_col[:, c]), k=1)
+        nn_id[nn_id == sc_z_len] = sc_z_len - 1
+
+        z_ind[:, c, 0] = nn_id
+        z_ind[:, c, 1] = 0
+        above = sc_col[nn_id, c] > dst_col[:, c]
+        below = sc_col[nn_id, c] <= dst_col[:, c]
+        z_ind[above, c, 1] = nn_id[above] - 1
+        z_ind[below, c, 1] = nn_id[below] + 1
+
+    return z_ind.reshape(dst_dep9.shape + (2,))
+
+
 def get_vertical_weights_zco(dst_dep, dst_len_z, num_bdy, sc_z, sc_z_len):
     """
     Determine vertical weights for the linear interpolation onto Dst grid.
@@ -265,17 +310,8 @@ def get_vertical_weights_zco(dst_dep, dst_len_z, num_bdy, sc_z, sc_z_len):
     sc_z = sc_z[:, 0, 0]
     dst_dep_rv = dst_dep.ravel(order="F").filled(np.nan)
     z_ind = np.zeros((num_bdy * dst_len_z, 2), dtype=np.int64)
-    source_tree = None
-    try:
-        source_tree = sp.cKDTree(
-            list(zip(sc_z.ravel(order="F"))),
-            balanced_tree=False,
-            compact_nodes=False,
-        )
-    except TypeError:  # fix for scipy 0.16.0
-        source_tree = sp.cKDTree(list(zip(sc_z.ravel(order="F"))))
-
-    junk, nn_id = source_tree.query(list(zip(dst_dep_rv)), k=1)
+    source_tree = kd_tree(kd_points(sc_z.ravel(order="F")), reuse=True)
+    junk, nn_id = kd_query(source_tree, kd_points(dst_dep_rv), k=1)
 
     # WORKAROUND: the tree query returns out of range val when
     # dst_dep point is NaN, causing ref problems later.
@@ -310,6 +346,44 @@ def get_vertical_weights_zco(dst_dep, dst_len_z, num_bdy, sc_z, sc_z_len):
     return z9_dist, z9_ind
 
 
+def fill_nearest(sc_cen):
+    """
+    Fill nans with the nearest valid value along the bdy for all levels.
+
+    Notes
+    -----
+    Where a nan is the same distance from valid points on either side the
+    value of the point before it is used. Levels with no valid points are
+    left as nans.
+
+    Parameters
+    ----------
+    sc_cen (np.array)   : source data of the centre points [nz_sc, nbdy]
+
+    Returns
+    -------
+    sc_cen (np.array)   : filled source data [nz_sc, nbdy]
+    """
+    num_bdy = sc_cen.shape[1]
+    valid = np.invert(np.isnan(sc_cen))
+    pos = np.arange(num_bdy)
+
+    # Index of the nearest valid point before and after each point
+    prev_ind = np.maximum.accumulate(np.where(valid, pos, -1), axis=1)
+    next_ind = np.minimum.accumulate(np.where(valid, pos, num_bdy)[:, ::-1], axis=1)[
+        :, ::-1
+    ]
+    prev_dist = np.where(prev_ind >= 0, pos - prev_ind, num_bdy + 1)
+    next_dist = np.where(next_ind < num_bdy, next_ind - pos, num_bdy + 1)
+
+    near_ind = np.where(prev_dist <= next_dist, prev_ind, next_ind)
+    fill = valid.any(axis=1)[:, np.newaxis] & np.invert(valid)
+    lev_ind = np.broadcast_to(np.arange(sc_cen.shape[0])[:, np.newaxis], fill.shape)
+    sc_cen = sc_cen.copy()
+    sc_cen[fill] = sc_cen[lev_ind[fill], near_ind[fill]]
+    return sc_cen
+
+
 def flood_fill(sc_bdy, isslab, logger):
     """
     Fill the data horizontally then downwards to remove nans before interpolation.
@@ -331,15 +405,9 @@ def flood_fill(sc_bdy, isslab, logger):
     sc_bdy[nan_ind] = np.nan
     sc_shape = sc_bdy.shape
 
-    for i in range(sc_shape[0]):
-        # Check if layer centre-point has both nans and values
-        while np.isnan(sc_bdy[i, :, 0]).any() & (~np.isnan(sc_bdy[i, :, 0])).any():
-            # Flood sc land horizontally within the chunk for the centre point.
-            # This may not be perfect but better than filling with zeros
-            sc_nan = np.isnan(sc_bdy)
-            sc_bdy[:, 1:, 0][sc_nan[:, 1:, 0]] = sc_bdy[:, :-1, 0][sc_nan[:, 1:, 0]]
-            sc_nan = np.isnan(sc_bdy)
-            sc_bdy[:, :-1, 0][sc_nan[:, :-1, 0]] = sc_bdy[:, 1:, 0][sc_nan[:, :-1, 0]]
+    # Flood sc land horizontally within the chunk for the centre point.
+    # This may not be perfect but better than filling with zeros
+    sc_bdy[:, :, 0] = fill_nearest(sc_bdy[:, :, 0])
 
     if not isslab:
         data_ind, nan_ind = valid_index(sc_bdy, logger)
@@ -361,45 +429,6 @@ def flood_fill(sc_bdy, isslab, logger):
     return sc_bdy
 
 
-def interp_vertical(sc_bdy, dst_dep, bdy_bathy, z_ind, z_dist, num_bdy, zinterp=True):
-    """
-    Interpolate source data onto destination vertical levels.
-
-    Parameters
-    ----------
-    sc_bdy (np.array)   : souce data [nz_sc, nbdy, 9]
-    dst_dep (np.array)  : the depth of the destination grid chunk [nz, nbdy]
-    bdy_bathy (np.array): the destination grid bdy points bathymetry
-    z_ind (np.array)    : the indices of the sc depth above and below bdy point
-    z_dist (np.array)   : the distance weights of the selected points
-    num_bdy (int)       : number of boundary points in chunk
-    zinterp (bool)      : vertical interpolation flag
-
-    Returns
-    -------
-    data_out (np.array) : source data on destination depth levels
-    """
-    if zinterp is True:
-        sc_shape = sc_bdy.shape
-        sc_bdy = sc_bdy.flatten("F")
-
-        # Weighted averaged on new vertical grid
-        sc_bdy = sc_bdy[z_ind[:, 0]] * z_dist[:, 0] + sc_bdy[z_ind[:, 1]] * z_dist[:, 1]
-        sc_bdy_lev = sc_bdy.reshape((dst_dep.shape[0], num_bdy, sc_shape[2]), order="F")
-
-        # If z-level replace data below bed using nans in dst_dep (from mbathy)
-        ind_z = np.transpose(np.tile(np.isnan(dst_dep), (9, 1, 1)), axes=[1, 2, 0])
-        sc_bdy_lev[ind_z] = np.nan
-    else:
-        # if zinterp is false leave data below bottom for NEMO run-time interpolation
-        sc_bdy_lev = sc_bdy
-
-    if np.ma.is_masked(sc_bdy_lev):
-        sc_bdy_lev = sc_bdy_lev.filled(np.nan)
-
-    return sc_bdy_lev
-
-
 def distance_weights(sc_bdy, dist_tot, sc_z_len, r0, logger):
     """
     Find the distance weightings for averaging source data to destination.
@@ -495,30 +524,206 @@ def valid_index(sc_bdy, logger):
     return data_ind, nan_ind
 
 
-def interp_horizontal(sc_bdy, dist_wei, dist_fac, logger):
+def interp_operator(
+    sc_msk,
+    ind,
+    dist_tot,
+    z_ind,
+    z_dist,
+    dst_dep,
+    bdy_bathy,
+    isslab,
+    zinterp,
+    r0,
+    logger,
+    rot=None,
+    dtype=np.float64,
+):
     """
-    Interpolate the source data to the destination grid using weighted average.
+    Assemble the sparse operator that interpolates source data onto the bdy.
+
+    The 9 point gather, flood fill, vertical interpolation and distance weighted
+    horizontal interpolation only depend on the geometry and the source land mask
+    so they are combined into a single CSR matrix that can be applied to each
+    time slice. The flood fill is traced by passing the index of each gathered
+    point through flood_fill so the same points are copied as for the data.
 
     Parameters
     ----------
-        sc_bdy (numpy.array)      : source data
-        dist_wei (numpy.array)    : weightings for interpolation
-        dist_fac (numpy.array)    : sum of weightings
-        logger                    : log of statements
+    sc_msk (np.array)   : source land mask for the chunk [nz_sc, nj, ni]
+    ind (np.array)      : indices of bdy and 9 nearest neighbours flattened "F" j,i [nbdy, 9]
+    dist_tot (np.array) : distance from dst point to 9 nearest sc points [nbdy, 9]
+    z_ind (np.array)    : the indices of the sc depth above and below bdy point
+    z_dist (np.array)   : the distance weights of the selected points
+    dst_dep (np.array)  : the depth of the destination grid chunk [nz, nbdy]
+    bdy_bathy (np.array): the destination grid bdy points bathymetry
+    isslab (bool)       : if true the source variable has no depth axis
+    zinterp (bool)      : vertical interpolation flag
+    r0 (float)          : correlation distance
+    logger              : log of statements
+    rot (tuple)         : None or (gcos, gsin) [nbdy, 9] to rotate vectors ij -> en
+    dtype (type)        : floating point type of the operator applied to the
+                          data, the weights used to renormalise are float64
 
     Returns
     -------
-        dst_bdy (numpy.array)     : destination bdy points with data from source grid
+    interp_op (dict)    : operator(s), weights and valid rows for apply_interp_operator
     """
-    logger.info(" sc_bdy %s %s", np.nanmin(sc_bdy), np.nanmax(sc_bdy))
-    dst_bdy = np.zeros_like(dist_fac) * np.nan
-    ind_valid = dist_fac > 0.0
+    sc_z_len = sc_msk.shape[0]
+    num_bdy = ind.shape[0]
+    n_g = sc_z_len * num_bdy * 9
+    n_src = sc_msk.size
+
+    # Label each gathered point [nz_sc, nbdy, 9] with its flat "F" index
+    # and flood fill the labels as if they were data
+    msk_flat = sc_msk.transpose(0, 2, 1).reshape(sc_z_len, -1)
+    g_id = np.arange(n_g, dtype=np.float64).reshape((sc_z_len, num_bdy, 9), order="F")
+    g_id[msk_flat[:, ind] == 0] = np.nan
+    g_id = flood_fill(g_id, isslab, logger)
+
+    # Source labels and weights for each point on the dst levels [nz, nbdy, 9, 2]
+    if isslab:
+        g_id[:, np.isnan(bdy_bathy), :] = np.nan
+        lev_id = g_id[..., np.newaxis]
+        lev_wei = np.ones_like(lev_id)
+        lev_valid = np.isfinite(g_id)
+    elif zinterp:
+        g_rv = g_id.ravel(order="F")
+        lev_shape = (dst_dep.shape[0], num_bdy, 9, 2)
+        lev_id = np.stack((g_rv[z_ind[:, 0]], g_rv[z_ind[:, 1]]), axis=1)
+        lev_id = lev_id.reshape(lev_shape, order="F")
+        lev_wei = np.ma.filled(np.ma.asarray(z_dist, dtype=np.float64), np.nan)
+        lev_wei = lev_wei.reshape(lev_shape, order="F")
+        lev_valid = np.all(np.isfinite(lev_id) & np.isfinite(lev_wei), axis=3)
+        lev_valid &= ~np.isnan(dst_dep)[:, :, np.newaxis]
+    else:
+        lev_id = g_id[..., np.newaxis]
+        lev_wei = np.ones_like(lev_id)
+        lev_valid = np.isfinite(g_id)
+    lev_z_len = lev_id.shape[0]
+
+    # Horizontal weights use the same valid points as the data would
+    dist_wei, dist_fac = distance_weights(
+        np.where(lev_valid, 1.0, np.nan),
+        dist_tot.copy(),
+        lev_z_len,
+        r0,
+        logger,
+    )
+    row_valid = dist_fac > 0.0
+    coef = np.zeros_like(dist_wei)
+    coef[row_valid] = (dist_wei * lev_valid)[row_valid] / dist_fac[row_valid][
+        :, np.newaxis
+    ]
 
-    dst_bdy[ind_valid] = (
-        np.nansum(sc_bdy[:, :, :] * dist_wei, 2)[ind_valid] / dist_fac[ind_valid]
+    # Weights from gathered points to dst rows (F flattened [nz, nbdy])
+    rows = np.arange(lev_z_len * num_bdy).reshape((lev_z_len, num_bdy), order="F")
+    rows = np.broadcast_to(rows[:, :, np.newaxis, np.newaxis], lev_id.shape)
+    vals = coef[..., np.newaxis] * lev_wei
+    keep = np.broadcast_to(
+        (lev_valid & row_valid[..., np.newaxis])[..., np.newaxis], lev_id.shape
     )
-    logger.info(" dst_bdy %s %s", np.nanmin(dst_bdy), np.nanmax(dst_bdy))
-    # Quick check to see we have not got bad values
-    if np.sum(dst_bdy == np.inf) > 0:
-        raise RuntimeError("""Bad values found after weighted averaging""")
-    return dst_bdy
+    g_op = sparse.csr_matrix(
+        (vals[keep], (rows[keep], lev_id[keep].astype(np.int64))),
+        shape=(lev_z_len * num_bdy, n_g),
+    )
+
+    # Gather from the source slab [nz_sc, nj, ni] flattened in C order so the
+    # data can be used without a copy
+    nj, ni = sc_msk.shape[1:]
+    src_id = (
+        np.arange(sc_z_len)[:, np.newaxis, np.newaxis] * (nj * ni)
+        + ((ind % nj) * ni + ind // nj)[np.newaxis, :, :]
+    )
+    gather = sparse.csr_matrix(
+        (np.ones(n_g), (np.arange(n_g), src_id.ravel(order="F"))), shape=(n_g, n_src)
+    )
+    wei_op = (g_op @ gather).tocsr()
+
+    if rot is None:
+        op = wei_op.astype(dtype, copy=False)
+    else:
+        gcos = sparse.diags(
+            np.tile(rot[0][np.newaxis], (sc_z_len, 1, 1)).ravel(order="F")
+        )
+        gsin = sparse.diags(
+            np.tile(rot[1][np.newaxis], (sc_z_len, 1, 1)).ravel(order="F")
+        )
+        op = [
+            (g_op @ sparse.hstack((gcos @ gather, -gsin @ gather))).tocsr(),
+            (g_op @ sparse.hstack((gsin @ gather, gcos @ gather))).tocsr(),
+        ]
+        op = [o.astype(dtype, copy=False) for o in op]
+
+    return {
+        "op": op,
+        "wei": wei_op,
+        "cols": np.unique(wei_op.indices),
+        "valid": row_valid.ravel(order="F"),
+        "shape": (lev_z_len, num_bdy),
+    }
+
+
+def apply_interp_operator(interp_op, sc_array, sc_array_2=None):
+    """
+    Interpolate source data onto the bdy using interp_operator.
+
+    Missing data that is not covered by the land mask is removed and the
+    weights of the remaining points renormalised. A block of time steps can
+    be interpolated in one call by passing arrays with a leading time axis.
+
+    Parameters
+    ----------
+    interp_op (dict)      : operator from interp_operator
+    sc_array (np.array)   : source data for the chunk [nz_sc, nj, ni] or
+                            [nt, nz_sc, nj, ni]
+    sc_array_2 (np.array) : None or the second vector component, same shape
+                            as sc_array
+
+    Returns
+    -------
+    dst_bdy (np.array)    : destination bdy data [nz, nbdy] or [nt, nz, nbdy],
+                            or a tuple of the east and north components for
+                            vectors
+    """
+    is_block = sc_array.ndim == 4
+    if not is_block:
+        sc_array = sc_array[np.newaxis]
+        if sc_array_2 is not None:
+            sc_array_2 = sc_array_2[np.newaxis]
+    nt = sc_array.shape[0]
+
+    # Columns of x are the [nz_sc, nj, ni] arrays of each time step
+    x = sc_array.reshape(nt, -1).T
+    if sc_array_2 is None:
+        ops = [interp_op["op"]]
+        x_nan = np.isnan(x)
+    else:
+        ops = interp_op["op"]
+        x_2 = sc_array_2.reshape(nt, -1).T
+        x_nan = np.isnan(x) | np.isnan(x_2)
+        x = np.concatenate((x, x_2))
+
+    renorm = x_nan[interp_op["cols"]].any()
+    if renorm:
+        x = np.where(np.isnan(x), 0.0, x)
+        wei_sum = interp_op["wei"] @ np.invert(x_nan).astype(np.float64)
+        valid = interp_op["valid"][:, np.newaxis] & (wei_sum > 0.0)
+    else:
+        valid = np.repeat(interp_op["valid"][:, np.newaxis], nt, axis=1)
+
+    nz, nbdy = interp_op["shape"]
+    dst_bdy = []
+    for op in ops:
+        dst = np.asarray(op @ x)
+        if renorm:
+            dst[valid] /= wei_sum[valid]
+        dst[~valid] = np.nan
+        dst = dst.T.reshape(nt, nbdy, nz).transpose(0, 2, 1)
+        if not is_block:
+            dst = dst[0]
+        dst_bdy.append(dst)
+
+    if sc_array_2 is None:
+        return dst_bdy[0]
+    return dst_bdy[0], dst_bdy[1]
@@ -29,7 +29,6 @@ import logging
 from calendar import isleap, monthrange
 
 import numpy as np
-import scipy.spatial as sp
 from cftime import datetime, utime
 from scipy.interpolate import interp1d
 
@@ -37,11 +36,111 @@ from pybdy import nemo_bdy_extr_assist as extr_assist
 from pybdy import nemo_bdy_ncgen as ncgen
 from pybdy import nemo_bdy_ncpop as ncpop
 from pybdy.reader.factory import GetFile
-from pybdy.utils.nemo_bdy_lib import rot_rep, sub2ind
+from pybdy.utils.nemo_bdy_lib import (
+    bdy_gather,
+    kd_points,
+    kd_query,
+    kd_tree,
+    process_pool,
+    rot_rep,
+    sub2ind,
+)
 
 # Local Imports
 from . import nemo_bdy_grid_angle as ga
 
+# Extract object used by the worker processes, set by _init_worker
+_worker_extract = None
+
+
+def _init_worker(extract):
+    """Store the Extract object, and so its weights, once in each worker."""
+    global _worker_extract
+    _worker_extract = extract
+
+
+def _extract_chunk_worker(args):
+    """Extract a chunk in a worker process."""
+    return _worker_extract._extract_chunk(*args)
+
+
+def _as_dtype(sc_arrays, dtype):
+    """
+    Cast the blocks of source data that were read to dtype.
+
+    Parameters
+    ----------
+    sc_arrays (list) : source data [nt, nz, nj, ni] or None
+    dtype     (type) : floating point type of the data
+
+    Returns
+    -------
+    sc_arrays (list) : source data of type dtype or None
+    """
+    return [None if a is None else a.astype(dtype, copy=False) for a in sc_arrays]
+
+
+def _set_land(sc_array, land):
+    """
+    Set the land points of a block of source data to NaN.
+
+    Parameters
+    ----------
+    sc_array (np.array) : source data [nt, nz, nj, ni]
+    land     (np.array) : flat indices of the land points in [nz, nj, ni]
+
+    Returns
+    -------
+    sc_array (np.array) : source data with NaN on land
+    """
+    shape = sc_array.shape
+    flat = sc_array.reshape(shape[0], -1)
+    flat[:, land] = np.NaN
+    return flat.reshape(shape)
+
+
+def get_out_file(settings, grd, year, month):
+    """
+    Return the output file name of a grid for a month.
+
+    Parameters
+    ----------
+    settings (dict) : settings for bdy
+    grd      (str)  : grid type t, u or v
+    year     (int)  : year of the output
+    month    (int)  : month of the output
+
+    Returns
+    -------
+    f_out    (str)  : path of the output file
+    """
+    return (
+        settings["dst_dir"]
+        + settings["fn"]
+        + "_bdy"
+        + grd.upper()
+        + "_y"
+        + str(year)
+        + "m"
+        + "%02d" % month
+        + ".nc"
+    )
+
+
+def _fill_nan_mean(nc_var, mean):
+    """
+    Fill the nans of each time entry of an output variable with a mean.
+
+    Parameters
+    ----------
+    nc_var (obj)   : output variable [nt, ...], open for writing
+    mean   (float) : value to fill the nans with
+    """
+    for n in range(nc_var.shape[0]):
+        data = np.ma.getdata(nc_var[n])
+        data[np.isnan(data)] = mean
+        nc_var[n] = data
+
 
 # TODO: Convert the 'F' ordering to 'C' to improve efficiency
 class Extract:
@@ -239,32 +338,22 @@ class Extract:
                 tmp_gcos = np.zeros((1, bdy_ind.shape[0]))
                 tmp_gsin = np.zeros((1, bdy_ind.shape[0]))
 
-                # TODO: can this be converted to an ind op rather than a loop?
-
-                for p in range(bdy_ind.shape[0]):
-                    tmp_gcos[:, p] = dst_gcos[bdy_ind[p, 1], bdy_ind[p, 0]]
-                    tmp_gsin[:, p] = dst_gsin[bdy_ind[p, 1], bdy_ind[p, 0]]
+                tmp_gcos[0, :] = bdy_gather(dst_gcos, bdy_ind)
+                tmp_gsin[0, :] = bdy_gather(dst_gsin, bdy_ind)
 
                 self.dst_gcos[:, chunk] = np.tile(tmp_gcos, (dst_len_z, 1))
                 self.dst_gsin[:, chunk] = np.tile(tmp_gsin, (dst_len_z, 1))
 
             # Find nearest neighbour on the source grid to each dst bdy point
             # Ann Query substitute
-            source_tree = None
-            try:
-                source_tree = sp.cKDTree(
-                    list(zip(SC.lon_ch.ravel(order="F"), SC.lat_ch.ravel(order="F"))),
-                    balanced_tree=False,
-                    compact_nodes=False,
-                )
-            except TypeError:  # added this fix to make it compatible with scipy 0.16.0
-                source_tree = sp.cKDTree(
-                    list(zip(SC.lon_ch.ravel(order="F"), SC.lat_ch.ravel(order="F")))
-                )
-            dst_pts = list(
-                zip(dst_lon_ch.ravel(order="F"), dst_lat_ch.ravel(order="F"))
+            source_tree = kd_tree(
+                kd_points(SC.lon_ch.ravel(order="F"), SC.lat_ch.ravel(order="F")),
+                reuse=True,
+            )
+            dst_pts = kd_points(
+                dst_lon_ch.ravel(order="F"), dst_lat_ch.ravel(order="F")
             )
-            nn_dist, nn_id = source_tree.query(dst_pts, k=1)
+            nn_dist, nn_id = kd_query(source_tree, dst_pts, k=1)
 
             # Find surrounding points
             j_sp, i_sp = np.unravel_index(nn_id, source_dims, order="F")
@@ -316,19 +405,17 @@ class Extract:
             dist_tot = dist_tot[np.arange(dist_tot.shape[0])[:, None], dist_ind]
 
             # Shuffle ind to reflect ascending dist of source and dst points
-            ind = ind.T
-            for p in range(ind.shape[0]):
-                ind[p, :] = ind[p, dist_ind[p, :]]  # [chunk, 9]
+            ind = np.take_along_axis(ind.T, dist_ind, axis=1)  # [chunk, 9]
 
             if self.key_vec:
                 self.gcos = np.append(
                     self.gcos,
-                    sc_gcos.flatten("F")[ind].reshape(ind.shape, order="F"),
+                    sc_gcos.ravel(order="F")[ind],
                     axis=0,
                 )
                 self.gsin = np.append(
                     self.gsin,
-                    sc_gsin.flatten("F")[ind].reshape(ind.shape, order="F"),
+                    sc_gsin.ravel(order="F")[ind],
                     axis=0,
                 )
                 self.sc_chunk = np.append(
@@ -361,26 +448,16 @@ class Extract:
                 tmp_lon[r_id] = -9999
                 tmp_lat = dst_lat_ch.copy()
                 tmp_lat[r_id] = -9999
-                source_tree = None
-                try:
-                    source_tree = sp.cKDTree(
-                        list(zip(tmp_lon.ravel(order="F"), tmp_lat.ravel(order="F"))),
-                        balanced_tree=False,
-                        compact_nodes=False,
-                    )
-                except TypeError:  # fix for scipy 0.16.0
-                    source_tree = sp.cKDTree(
-                        list(zip(tmp_lon.ravel(order="F"), tmp_lat.ravel(order="F")))
-                    )
-
-                dst_pts = list(
-                    zip(
-                        dst_lon_ch[rr_id].ravel(order="F"),
-                        dst_lat_ch[rr_id].ravel(order="F"),
-                    )
+                source_tree = kd_tree(
+                    kd_points(tmp_lon.ravel(order="F"), tmp_lat.ravel(order="F"))
+                )
+                dst_pts = kd_points(
+                    dst_lon_ch[rr_id].ravel(order="F"),
+                    dst_lat_ch[rr_id].ravel(order="F"),
+                )
+                junk, an_id = kd_query(
+                    source_tree, dst_pts, k=3, distance_upper_bound=fr
                 )
-
-                junk, an_id = source_tree.query(dst_pts, k=3, distance_upper_bound=fr)
                 id_121[rr_id, :] = an_id
             #            id_121[id_121 == len(dst_lon_ch)] = 0
 
@@ -471,7 +548,7 @@ class Extract:
             # End of chunk loop
 
         # Set instance attributes
-        self.first = True
+        self.sc_masks = {}
         self.nav_lon = DC.lonlat[grd]["lon"]
         self.nav_lat = DC.lonlat[grd]["lat"]
         self.sc_ind_ch = sc_ind_ch
@@ -481,6 +558,64 @@ class Extract:
         self.sc_z_len = sc_z_len
         self.sc_time = sc_time
 
+        # Assemble the interpolation operators for each chunk and for each
+        # class of variable (3D or 2D) in the source data
+        var_slab = []
+        for v in range(self.nvar):
+            var_slab.append(self._is_slab(sc_time, self.var_nam[v]))
+
+        op_key = []
+        op_args = []
+        for c in range(len(all_chunk)):
+            chunk = chunk_number == all_chunk[c]
+            chunk_z = self.z_chunk == all_chunk[c]
+            t_mask = self._chunk_masks(c)[0]
+            rot = None
+            if self.key_vec:
+                chunk_s = self.sc_chunk == all_chunk[c]
+                rot = (self.gcos[chunk_s, :], self.gsin[chunk_s, :])
+            for slab in set(var_slab):
+                if slab:
+                    sc_msk = t_mask[0, 0:1, :, :]
+                else:
+                    sc_msk = t_mask[0, :, :, :]
+                op_key.append((c, slab))
+                op_args.append(
+                    (
+                        sc_msk,
+                        sc_ind_ch[c]["ind"],
+                        self.dist_tot[chunk, :],
+                        self.z_ind[chunk_z, :],
+                        self.z_dist[chunk_z, :],
+                        self.dst_dep[:, chunk],
+                        self.bdy_z[chunk],
+                        slab,
+                        self.settings["zinterp"],
+                        self.settings["r0"],
+                        self.logger,
+                        rot,
+                        self.dtype,
+                    )
+                )
+
+        # The operators of each chunk are independent so can be built on
+        # several worker processes
+        workers = self.settings.get("workers", 1)
+        if (workers > 1) and (len(op_args) > 1):
+            self.logger.info(
+                "Building %s interpolation operators on %s workers",
+                len(op_args),
+                workers,
+            )
+            with process_pool(workers) as pool:
+                ops = list(pool.map(extr_assist.interp_operator, *zip(*op_args)))
+        else:
+            ops = [extr_assist.interp_operator(*arg) for arg in op_args]
+
+        self.interp_op = [{} for c in range(len(all_chunk))]
+        for (c, slab), interp_op in zip(op_key, ops):
+            self.interp_op[c][slab] = interp_op
+
         self.d_bdy = {}
 
         # Need to qualify for key_vec
@@ -490,6 +625,89 @@ class Extract:
             else:
                 self.d_bdy[self.var_nam[v]] = {}
 
+    # Attributes computed in __init__ that are needed to extract each month
+    weight_attr = [
+        "jpj",
+        "jpi",
+        "jpk",
+        "dst_chunk",
+        "sc_ind_ch",
+        "sc_wrap",
+        "num_bdy",
+        "bdy_z",
+        "bdy_dz",
+        "dst_z",
+        "dst_dep",
+        "sc_z_len",
+        "nav_lon",
+        "nav_lat",
+        "interp_op",
+    ]
+
+    @property
+    def dtype(self):
+        """Return the type of the interpolated data, float32 if single precision."""
+        if self.settings.get("single_precision", False):
+            return np.float32
+        return np.float64
+
+    def get_weights(self):
+        """
+        Return the precomputed indices and weights so they can be cached.
+
+        Returns
+        -------
+        weights (dict) : attributes needed by extract_month and write_out
+        """
+        names = list(self.weight_attr)
+        if self.key_vec:
+            names.extend(["dst_gcos", "dst_gsin"])
+        if self.g_type == "t":
+            names.append("bdy_msk")
+        return {name: getattr(self, name) for name in names}
+
+    @classmethod
+    def from_weights(cls, setup, Grid, var_nam, grd, pair, weights):
+        """
+        Create an Extract object from weights returned by get_weights.
+
+        Parameters
+        ----------
+        setup           (list) : settings for bdy
+        Grid            (dict) : containing grid type 't', 'u', 'v' and source time
+        var_name        (list) : netcdf file variable names (str)
+        grd             (str)  : grid to process 't', 'u', 'v'
+        pair            (str)  : None or 'uv'
+        weights         (dict) : output of get_weights
+
+        Returns
+        -------
+        Extract       (obj) : Object with indexing arrays and weightings ready for interpolation
+        """
+        self = cls.__new__(cls)
+        self.logger = logging.getLogger(__name__)
+        self.g_type = grd
+        self.settings = setup
+        self.var_nam = var_nam
+        self.key_vec = pair == "uv"
+        self.nvar = len(self.var_nam)
+        if self.key_vec:
+            self.rot_dir = {"u": "i", "v": "j"}[grd]
+            self.fnames_2 = Grid["v"].source_time
+            self.nvar = self.nvar // 2
+        self.sc_time = Grid[grd].source_time
+        self.sc_masks = {}
+        for name, value in weights.items():
+            setattr(self, name, value)
+
+        self.d_bdy = {}
+        for v in range(self.nvar):
+            if grd == "v":
+                self.d_bdy[self.var_nam[v + 1]] = {}
+            else:
+                self.d_bdy[self.var_nam[v]] = {}
+        return self
+
     def extract_month(self, year, month):
         """
         Extract monthly data and interpolates onto the destination grid.
@@ -506,7 +724,92 @@ class Extract:
         self.logger.info("extract_month function called")
 
         sc_time = self.sc_time
-        sc_z_len = self.sc_z_len
+        first_date, last_date, meta_data = self._month_range(year, month)
+
+        # Create the data holding array for the month. This replaces the
+        # previous month so each month only depends on its own source data.
+        for v in range(self.nvar):
+            if self._is_slab(sc_time, self.var_nam[v]):
+                hold = np.zeros(
+                    (((last_date + 1) - first_date), 1, self.num_bdy), dtype=self.dtype
+                )
+            else:
+                hold = np.zeros(
+                    (
+                        ((last_date + 1) - first_date),
+                        len(self.dst_dep),
+                        self.num_bdy,
+                    ),
+                    dtype=self.dtype,
+                )
+
+            if self.key_vec is True and self.rot_dir == "j":
+                self.d_bdy[self.var_nam[v + 1]][year] = {"data": hold, "date": {}}
+            else:
+                self.d_bdy[self.var_nam[v]][year] = {"data": hold, "date": {}}
+
+        # loop over chunks
+
+        chunk_number = self.dst_chunk
+        all_chunk = np.unique(chunk_number)
+        args = []
+        for chk in range(len(all_chunk)):
+            # Read the masks before any workers are started so they are shared
+            self._chunk_masks(chk)
+            args.append((chk, meta_data, first_date, last_date))
+
+        workers = self.settings.get("workers", 1)
+        if (workers > 1) and (len(all_chunk) > 1):
+            if getattr(sc_time, "fork_safe", False):
+                self.logger.info(
+                    "Extracting %s chunks on %s workers", len(args), workers
+                )
+                with process_pool(workers, _init_worker, (self,)) as pool:
+                    data = list(pool.map(_extract_chunk_worker, args))
+            else:
+                self.logger.warning(
+                    "Source reader cannot be shared with worker processes, "
+                    + "extracting chunks serially"
+                )
+                data = [self._extract_chunk(*arg) for arg in args]
+        else:
+            data = [self._extract_chunk(*arg) for arg in args]
+
+        # add data to self.d_bdy
+        for chk in range(len(all_chunk)):
+            chunk_d = chunk_number == all_chunk[chk]
+            for vn in range(self.nvar):
+                if self.key_vec is True and self.rot_dir == "j":
+                    self.d_bdy[self.var_nam[vn + 1]][year]["data"][
+                        :, :, chunk_d
+                    ] = data[chk][vn]
+                else:
+                    self.d_bdy[self.var_nam[vn]][year]["data"][:, :, chunk_d] = data[
+                        chk
+                    ][vn]
+
+        # Need stats on fill pts in z and horiz + missing pts...
+
+    # end month
+    # end year
+    # End great loop of crawling chaos
+
+    def _month_range(self, year, month):
+        """
+        Find the source time entries and meta data needed for a month.
+
+        Parameters
+        ----------
+        year  (int) : year of data to be extracted
+        month (int) : month of the year to be extracted
+
+        Returns
+        -------
+        first_date  (int) : index of the first source time entry
+        last_date   (int) : index of the last source time entry
+        meta_data  (list) : scale factor and offset of each variable
+        """
+        sc_time = self.sc_time
 
         # define src/dst cals
         if self.settings.get("time_interpolation", True) is False:
@@ -602,453 +905,393 @@ class Extract:
                     first_date : last_date + 1
                 ]
 
-        # Check year entry exists in d_bdy, if not create it with data holding array.
-        for v in range(self.nvar):
-            try:
-                if self.key_vec is True and self.rot_dir == "j":
-                    self.d_bdy[self.var_nam[v + 1]][year]
-                else:
-                    self.d_bdy[self.var_nam[v]][year]
-            except KeyError:
-                try:
-                    len(sc_time[self.var_nam[v]]._get_dimensions())
-                except TypeError:
-                    raise Exception(
-                        'The variables in src data files may need renaming to match "'
-                        + self.var_nam[v]
-                        + '", see documentation on NcML rename.'
-                    )
-                if len(sc_time[self.var_nam[v]]._get_dimensions()) == 3:
-                    hold = np.zeros((((last_date + 1) - first_date), 1, self.num_bdy))
-                else:
-                    hold = np.zeros(
-                        (
-                            ((last_date + 1) - first_date),
-                            len(self.dst_dep),
-                            self.num_bdy,
-                        )
-                    )
+        return first_date, last_date, meta_data
 
-                if self.key_vec is True and self.rot_dir == "j":
-                    self.d_bdy[self.var_nam[v + 1]][year] = {"data": hold, "date": {}}
-                else:
-                    self.d_bdy[self.var_nam[v]][year] = {"data": hold, "date": {}}
+    def _extract_chunk(self, chk, meta_data, first_date, last_date):
+        """
+        Extract a chunk of monthly data and interpolate it onto the bdy.
 
-        # loop over chunks
+        Parameters
+        ----------
+        chk         (int) : index of the chunk
+        meta_data  (list) : scale factor and offset of each variable
+        first_date  (int) : index of the first time entry
+        last_date   (int) : index of the last time entry
 
-        chunk_number = self.dst_chunk
-        all_chunk = np.unique(chunk_number)
+        Returns
+        -------
+        data_chunk (list) : bdy data [nt, nz, nbdy_chunk] for each variable
+        """
+        sc_time = self.sc_time
+        chunk_d = self.dst_chunk == np.unique(self.dst_chunk)[chk]
 
-        for chk in range(len(all_chunk)):
-            chunk_d = chunk_number == all_chunk[chk]
-            chunk_z = self.z_chunk == all_chunk[chk]
-            if self.key_vec:
-                chunk_s = self.sc_chunk == all_chunk[chk]
+        i_run = np.arange(self.sc_ind_ch[chk]["imin"], self.sc_ind_ch[chk]["imax"])
+        j_run = np.arange(self.sc_ind_ch[chk]["jmin"], self.sc_ind_ch[chk]["jmax"])
+        extended_i = np.arange(
+            self.sc_ind_ch[chk]["imin"] - 1, self.sc_ind_ch[chk]["imax"]
+        )
+        extended_j = np.arange(
+            self.sc_ind_ch[chk]["jmin"] - 1, self.sc_ind_ch[chk]["jmax"]
+        )
+        if self.sc_wrap[chk]:
+            # If wrap_flag is true make indices wrap over east-west fold
+            # imax is already adjusted to x dim max if wrapped
+            extended_i[extended_i < 0] += self.sc_ind_ch[chk]["imax"]
+            i_plus = 0
+        else:
+            i_plus = 1
 
-            i_run = np.arange(self.sc_ind_ch[chk]["imin"], self.sc_ind_ch[chk]["imax"])
-            j_run = np.arange(self.sc_ind_ch[chk]["jmin"], self.sc_ind_ch[chk]["jmax"])
-            extended_i = np.arange(
-                self.sc_ind_ch[chk]["imin"] - 1, self.sc_ind_ch[chk]["imax"]
-            )
-            extended_j = np.arange(
-                self.sc_ind_ch[chk]["jmin"] - 1, self.sc_ind_ch[chk]["jmax"]
-            )
-            if self.sc_wrap[chk]:
-                # If wrap_flag is true make indices wrap over east-west fold
-                # imax is already adjusted to x dim max if wrapped
-                extended_i[extended_i < 0] += self.sc_ind_ch[chk]["imax"]
-                i_plus = 0
-            else:
-                i_plus = 1
+        t_mask, u_mask, v_mask, land_ind = self._chunk_masks(chk)
+        data_chunk = []
 
-            ind = self.sc_ind_ch[chk]["ind"]
+        # Loop over variables
+        for vn in range(self.nvar):
+            # Extract sub-region of data
+            self.logger.info("var_nam = %s", self.var_nam[vn])
+            varid = sc_time[self.var_nam[vn]]
+            # If extracting vector quantities open second var
+            if self.key_vec:
+                varid_2 = self.fnames_2[
+                    self.var_nam[vn + 1]
+                ]  # nc_2.variables[self.var_nam[vn + 1]]
 
-            if self.first:
+            # Determine if slab or not
+            isslab = len(varid._get_dimensions()) == 3
+
+            # Set up tmp dict of tmp arrays
+            if isslab:
+                sc_z_len = 1
+            else:
                 sc_z_len = self.sc_z_len
-                nc_3 = GetFile(self.settings["src_msk"])
-                varid_3 = nc_3["tmask"]
-                t_mask = varid_3[
-                    :1,
-                    :sc_z_len,
-                    np.min(j_run) : np.max(j_run) + 1,
-                    np.min(i_run) : np.max(i_run) + i_plus,
-                ]
-                if t_mask.shape[1] == 1:
-                    raise Exception(
-                        "Mask dimensions are not correct. Depth is "
-                        + str(sc_z_len)
-                        + " but tmask is "
-                        + str(t_mask.shape[1])
-                    )
 
-                if self.key_vec:
-                    varid_3 = nc_3["umask"]
-                    u_mask = varid_3[
-                        :1,
+            # Loop over blocks of time entries, sized by the type of the
+            # source data as it is read
+            itemsize = np.dtype(varid._get_dtype()).itemsize
+            if self.key_vec:
+                itemsize += np.dtype(varid_2._get_dtype()).itemsize
+            step_size = sc_z_len * (len(j_run) + 1) * (len(i_run) + 2) * itemsize
+            data_out = []
+            for f_0, f_1 in self._time_blocks(first_date, last_date, step_size):
+                sc_array = [None, None]
+                sc_alt_arr = [None, None]
+
+                # Extract 3D scalar variables
+                if not isslab and not self.key_vec:
+                    self.logger.info(" 3D source array ")
+                    sc_array[0] = varid[
+                        f_0:f_1,
+                        :sc_z_len,
+                        np.min(j_run) : np.max(j_run) + 1,
+                        np.min(i_run) : np.max(i_run) + i_plus,
+                    ]
+                # Extract 3D vector variables
+                elif self.key_vec:
+                    # For u vels take i-1
+                    sc_alt_arr[0] = varid[
+                        f_0:f_1,
                         :sc_z_len,
                         np.min(j_run) : np.max(j_run) + 1,
                         np.min(extended_i) : np.max(extended_i) + i_plus,
                     ]
-                    varid_3 = nc_3["vmask"]
-                    v_mask = varid_3[
-                        :1,
+                    # For v vels take j-1
+                    sc_alt_arr[1] = varid_2[
+                        f_0:f_1,
                         :sc_z_len,
                         np.min(extended_j) : np.max(extended_j) + 1,
                         np.min(i_run) : np.max(i_run) + i_plus,
                     ]
-                    if u_mask.shape[1] == 1:
-                        raise Exception(
-                            "Mask dimensions are not correct. Depth is "
-                            + str(sc_z_len)
-                            + " but umask is "
-                            + str(u_mask.shape[1])
-                        )
-                    if v_mask.shape[1] == 1:
-                        raise Exception(
-                            "Mask dimensions are not correct. Depth is "
-                            + str(sc_z_len)
-                            + " but vmask is "
-                            + str(v_mask.shape[1])
-                        )
-                nc_3.close()
+                # Extract 2D scalar vars
+                else:
+                    self.logger.info(" 2D source array ")
+                    sc_array[0] = varid[
+                        f_0:f_1,
+                        np.min(j_run) : np.max(j_run) + 1,
+                        np.min(i_run) : np.max(i_run) + i_plus,
+                    ][:, np.newaxis, :, :]
+
+                # Interpolate in float32 with ln_single_precision, otherwise
+                # in float64. Data already of that type are not copied
+                sc_array = _as_dtype(sc_array, self.dtype)
+                sc_alt_arr = _as_dtype(sc_alt_arr, self.dtype)
 
                 if self.sc_wrap[chk]:
                     # Stick first and last slice on opposite end
-                    t_mask = np.concatenate((t_mask, t_mask[:, :, :, 0:1]), axis=3)
                     if self.key_vec:
-                        u_mask = np.concatenate(
-                            (u_mask[:, :, :, -2:-1], u_mask, u_mask[:, :, :, 0:1]),
+                        sc_alt_arr[0] = np.concatenate(
+                            (
+                                sc_alt_arr[0][:, :, :, -2:-1],
+                                sc_alt_arr[0],
+                                sc_alt_arr[0][:, :, :, 0:1],
+                            ),
                             axis=3,
                         )
-                        v_mask = np.concatenate((v_mask, v_mask[:, :, :, 0:1]), axis=3)
-
-            # Loop over identified files
-            for f in range(first_date, last_date + 1):
-                sc_array = [None, None]
-                sc_alt_arr = [None, None]
-                # self.logger.info('opening nc file: %s', sc_time[f].file_name)
-                # Counters not implemented
-
-                sc_bdy = {}
-                # sc_bdy = np.zeros((len(self.var_nam), sc_z_len, ind.shape[0],
-                #                   ind.shape[1]))
-
-                # Loop over time entries from file f
-                for vn in range(self.nvar):
-                    # Extract sub-region of data
-                    self.logger.info("var_nam = %s", self.var_nam[vn])
-                    varid = sc_time[self.var_nam[vn]]
-                    # If extracting vector quantities open second var
-                    if self.key_vec:
-                        varid_2 = self.fnames_2[
-                            self.var_nam[vn + 1]
-                        ]  # nc_2.variables[self.var_nam[vn + 1]]
-
-                    # Determine if slab or not
-                    isslab = len(varid._get_dimensions()) == 3
-
-                    # Set up tmp dict of tmp arrays
-                    if isslab:
-                        sc_z_len = 1
-                    else:
-                        sc_z_len = self.sc_z_len
-
-                    sc_bdy[vn] = np.zeros((sc_z_len, ind.shape[0], ind.shape[1]))
-                    if self.key_vec:
-                        sc_bdy[vn + 1] = np.zeros(
-                            (sc_z_len, ind.shape[0], ind.shape[1])
+                        sc_alt_arr[1] = np.concatenate(
+                            (sc_alt_arr[1], sc_alt_arr[1][:, :, :, 0:1]), axis=3
                         )
-
-                    # Extract 3D scalar variables
-                    if not isslab and not self.key_vec:
-                        self.logger.info(" 3D source array ")
-                        sc_array[0] = varid[
-                            f : f + 1,
-                            :sc_z_len,
-                            np.min(j_run) : np.max(j_run) + 1,
-                            np.min(i_run) : np.max(i_run) + i_plus,
-                        ]
-                    # Extract 3D vector variables
-                    elif self.key_vec:
-                        # For u vels take i-1
-                        sc_alt_arr[0] = varid[
-                            f : f + 1,
-                            :sc_z_len,
-                            np.min(j_run) : np.max(j_run) + 1,
-                            np.min(extended_i) : np.max(extended_i) + i_plus,
-                        ]
-                        # For v vels take j-1
-                        sc_alt_arr[1] = varid_2[
-                            f : f + 1,
-                            :sc_z_len,
-                            np.min(extended_j) : np.max(extended_j) + 1,
-                            np.min(i_run) : np.max(i_run) + i_plus,
-                        ]
-                    # Extract 2D scalar vars
                     else:
-                        self.logger.info(" 2D source array ")
-                        sc_array[0] = varid[
-                            f : f + 1,
-                            np.min(j_run) : np.max(j_run) + 1,
-                            np.min(i_run) : np.max(i_run) + i_plus,
-                        ][:, np.newaxis, :, :]
-
-                    if self.sc_wrap[chk]:
-                        # Stick first and last slice on opposite end
-                        if self.key_vec:
-                            sc_alt_arr[0] = np.concatenate(
-                                (
-                                    sc_alt_arr[0][:, :, :, -2:-1],
-                                    sc_alt_arr[0],
-                                    sc_alt_arr[0][:, :, :, 0:1],
-                                ),
-                                axis=3,
-                            )
-                            sc_alt_arr[1] = np.concatenate(
-                                (sc_alt_arr[1], sc_alt_arr[1][:, :, :, 0:1]), axis=3
-                            )
-                        else:
-                            sc_array[0] = np.concatenate(
-                                (sc_array[0], sc_array[0][:, :, :, 0:1]), axis=3
-                            )
-
-                    # Average vector vars onto T-grid
-                    if self.key_vec:
-                        # First make sure land points have a zero val
-                        sc_alt_arr[0] *= u_mask
-                        sc_alt_arr[1] *= v_mask
-                        # Average from to T-grid assuming C-grid stagger
-                        sc_array[0] = 0.5 * (
-                            sc_alt_arr[0][:, :, :, :-1] + sc_alt_arr[0][:, :, :, 1:]
-                        )
-                        sc_array[1] = 0.5 * (
-                            sc_alt_arr[1][:, :, :-1, :] + sc_alt_arr[1][:, :, 1:, :]
+                        sc_array[0] = np.concatenate(
+                            (sc_array[0], sc_array[0][:, :, :, 0:1]), axis=3
                         )
 
-                    # Set land points to NaN and adjust with any scaling
-                    # Factor offset
-                    # Note using isnan/sum is relatively fast, but less than
-                    # bottleneck external lib
-                    self.logger.info(
-                        "SC ARRAY MIN MAX : %s %s",
-                        np.nanmin(sc_array[0]),
-                        np.nanmax(sc_array[0]),
+                # Average vector vars onto T-grid
+                if self.key_vec:
+                    # First make sure land points have a zero val
+                    sc_alt_arr[0] *= u_mask
+                    sc_alt_arr[1] *= v_mask
+                    # Average from to T-grid assuming C-grid stagger
+                    sc_array[0] = 0.5 * (
+                        sc_alt_arr[0][:, :, :, :-1] + sc_alt_arr[0][:, :, :, 1:]
                     )
-
-                    if isslab and not self.key_vec:
-                        sc_array[0][t_mask[:, 0:1, :, :] == 0] = np.NaN
-                    else:
-                        sc_array[0][t_mask == 0] = np.NaN
-                    self.logger.info(
-                        "SC ARRAY MIN MAX : %s %s",
-                        np.nanmin(sc_array[0]),
-                        np.nanmax(sc_array[0]),
+                    sc_array[1] = 0.5 * (
+                        sc_alt_arr[1][:, :, :-1, :] + sc_alt_arr[1][:, :, 1:, :]
                     )
-                    if not np.isnan(np.sum(meta_data[vn]["sf"])):
-                        sc_array[0] *= meta_data[vn]["sf"]
-                    if not np.isnan(np.sum(meta_data[vn]["os"])):
-                        sc_array[0] += meta_data[vn]["os"]
 
-                    if self.key_vec:
-                        sc_array[1][t_mask == 0] = np.NaN
-                        if not np.isnan(np.sum(meta_data[vn + 1]["sf"])):
-                            sc_array[1] *= meta_data[vn + 1]["sf"]
-                        if not np.isnan(np.sum(meta_data[vn + 1]["os"])):
-                            sc_array[1] += meta_data[vn + 1]["os"]
-
-                    # Now collapse the extracted data to an array
-                    # containing only nearest neighbours to dest bdy points
-                    # Loop over the depth axis
-                    for dep in range(sc_z_len):
-                        tmp_arr = [None, None]
-                        # Consider squeezing
-                        tmp_arr[0] = sc_array[0][0, dep, :, :].flatten("F")  # [:,:,dep]
-                        if not self.key_vec:
-                            sc_bdy[vn][dep, :, :] = self._flat_ref(tmp_arr[0], ind)
-                        else:
-                            tmp_arr[1] = sc_array[1][0, dep, :, :].flatten(
-                                "F"
-                            )  # [:,:,dep]
-                            # Include in the collapse the rotation from the
-                            # grid to real zonal direction, ie ij -> e
-                            sc_bdy[vn][dep, :] = (
-                                tmp_arr[0][ind[:]] * self.gcos[chunk_s, :]
-                                - tmp_arr[1][ind[:]] * self.gsin[chunk_s, :]
-                            )
-                            # Include... meridinal direction, ie ij -> n
-                            sc_bdy[vn + 1][dep, :] = (
-                                tmp_arr[1][ind[:]] * self.gcos[chunk_s, :]
-                                + tmp_arr[0][ind[:]] * self.gsin[chunk_s, :]
-                            )
-
-                    # End depths loop
-                    self.logger.info(" END DEPTHS LOOP ")
-                # End Looping over vars
-                self.logger.info(" END VAR LOOP ")
-                # ! Skip sc_bdy permutation
-
-                x = sc_array[0]
-                y = np.isnan(x)
-                z = np.invert(np.isnan(x))
-                x[y] = 0
-                self.logger.info("nans: %s", np.sum(y[:]))
-                # x = x[np.invert(y)]
+                # Set land points to NaN and adjust with any scaling
+                # Factor offset
+                # Note using isnan/sum is relatively fast, but less than
+                # bottleneck external lib
                 self.logger.info(
-                    "%s %s %s %s",
-                    x.shape,
-                    np.sum(x[z], dtype=np.float64),
-                    np.amin(x),
-                    np.amax(x),
+                    "SC ARRAY MIN MAX : %s %s",
+                    np.nanmin(sc_array[0]),
+                    np.nanmax(sc_array[0]),
                 )
 
-                # Calculate weightings to be used in interpolation from
-                # source data to dest bdy pts. Only need do once.
-                # if self.first:
-                for vn in range(self.nvar):
-                    varid = sc_time[self.var_nam[vn]]
-                    # Determine if slab or not
-                    isslab = len(varid._get_dimensions()) == 3
+                land = land_ind[isslab and not self.key_vec]
+                sc_array[0] = _set_land(sc_array[0], land)
+                self.logger.info(
+                    "SC ARRAY MIN MAX : %s %s",
+                    np.nanmin(sc_array[0]),
+                    np.nanmax(sc_array[0]),
+                )
+                if not np.isnan(np.sum(meta_data[vn]["sf"])):
+                    sc_array[0] *= meta_data[vn]["sf"]
+                if not np.isnan(np.sum(meta_data[vn]["os"])):
+                    sc_array[0] += meta_data[vn]["os"]
 
-                    # Set up tmp dict of tmp arrays
-                    if isslab:
-                        sc_z_len = 1
-                    else:
-                        sc_z_len = self.sc_z_len
-
-                    # Flood fill
-                    sc_bdy[vn] = extr_assist.flood_fill(sc_bdy[vn], isslab, self.logger)
-
-                    if not isslab:
-                        # Vertical interpolation
-                        sc_bdy_lev = extr_assist.interp_vertical(
-                            sc_bdy[vn],
-                            self.dst_dep[:, chunk_d],
-                            self.bdy_z[chunk_d],
-                            self.z_ind[chunk_z, :],
-                            self.z_dist[chunk_z, :],
-                            self.num_bdy_ch[chk],
-                            self.settings["zinterp"],
-                        )
-                    else:
-                        # No vertical interpolation
-                        sc_bdy_lev = sc_bdy[vn]
-                        sc_bdy_lev[:, np.isnan(self.bdy_z[chunk_d]), :] = np.NaN
-
-                    # distance weightings for averaging source data to destination
-                    dist_wei, dist_fac = extr_assist.distance_weights(
-                        sc_bdy_lev,
-                        self.dist_tot[chunk_d, :],
-                        len(sc_bdy_lev),
-                        self.settings["r0"],
-                        self.logger,
+                if self.key_vec:
+                    sc_array[1] = _set_land(sc_array[1], land)
+                    if not np.isnan(np.sum(meta_data[vn + 1]["sf"])):
+                        sc_array[1] *= meta_data[vn + 1]["sf"]
+                    if not np.isnan(np.sum(meta_data[vn + 1]["os"])):
+                        sc_array[1] += meta_data[vn + 1]["os"]
+
+                # Gather, flood fill, vertical and horizontal interpolation
+                # of the block of source data onto the dst bdy points
+                interp_op = self.interp_op[chk][isslab]
+                if not self.key_vec:
+                    dst_bdy = extr_assist.apply_interp_operator(interp_op, sc_array[0])
+                else:
+                    # Include the rotation from the grid to real zonal
+                    # and meridional directions, ie ij -> en
+                    dst_bdy, dst_bdy_2 = extr_assist.apply_interp_operator(
+                        interp_op, sc_array[0], sc_array[1]
                     )
 
-                    # weighted averaged (interpolation) onto new horizontal grid
-                    dst_bdy = extr_assist.interp_horizontal(
-                        sc_bdy_lev, dist_wei, dist_fac, self.logger
+                    self.logger.info("time to to rot and rep ")
+                    self.logger.info("%s %s", np.nanmin(dst_bdy), np.nanmax(dst_bdy))
+                    self.logger.info(
+                        "%s en to %s %s", self.rot_dir, self.rot_dir, dst_bdy.shape
                     )
 
-                    # weight vector array and rotate onto dest grid
-                    if self.key_vec:
-                        # Do the same for both components of u and v velocities
+                    dst_bdy = rot_rep(
+                        dst_bdy,
+                        dst_bdy_2,
+                        self.rot_dir,
+                        "en to %s" % self.rot_dir,
+                        self.dst_gcos[:, chunk_d].astype(self.dtype, copy=False),
+                        self.dst_gsin[:, chunk_d].astype(self.dtype, copy=False),
+                    )
+                    self.logger.info("%s %s", np.nanmin(dst_bdy), np.nanmax(dst_bdy))
+                # Apply 1-2-1 filter along bdy pts using NN ind self.id_121
+                if False:  # turning off filter for now
+                    # if self.first:
+                    if isslab:
+                        id_121 = self.id_121_2d[:, chunk_d, :]
+                        tmp_filt = self.tmp_filt_2d[:, chunk_d, :]
+                    else:
+                        id_121 = self.id_121_3d[:, chunk_d, :]
+                        tmp_filt = self.tmp_filt_3d[:, chunk_d, :]
 
-                        # Flood fill
-                        sc_bdy[vn + 1] = extr_assist.flood_fill(
-                            sc_bdy[vn + 1], isslab, self.logger
-                        )
+                    tmp_valid = np.invert(np.isnan(dst_bdy.flatten("F")[id_121]))
 
-                        if not isslab:
-                            # Vertical interpolation
-                            sc_bdy_lev2 = extr_assist.interp_vertical(
-                                sc_bdy[vn + 1],
-                                self.dst_dep[:, chunk_d],
-                                self.bdy_z[chunk_d],
-                                self.z_ind[chunk_z, :],
-                                self.z_dist[chunk_z, :],
-                                self.num_bdy_ch[chk],
-                                self.settings["zinterp"],
-                            )
-                        else:
-                            # No vertical interpolation
-                            sc_bdy_lev2 = sc_bdy[vn + 1]
-                            sc_bdy_lev2[:, np.isnan(self.bdy_z[chunk_d]), :] = np.NaN
-
-                        dst_bdy_2 = extr_assist.interp_horizontal(
-                            sc_bdy_lev2, dist_wei, dist_fac, self.logger
-                        )
+                    dst_bdy = np.nansum(
+                        dst_bdy.flatten("F")[id_121] * tmp_filt, 2
+                    ) / np.sum(tmp_filt * tmp_valid, 2)
 
-                        self.logger.info("time to to rot and rep ")
-                        self.logger.info(
-                            "%s %s", np.nanmin(dst_bdy), np.nanmax(dst_bdy)
-                        )
-                        self.logger.info(
-                            "%s en to %s %s", self.rot_dir, self.rot_dir, dst_bdy.shape
-                        )
+                    # Finished first run operations
+                    # self.first = False
 
-                        dst_bdy = rot_rep(
-                            dst_bdy,
-                            dst_bdy_2,
-                            self.rot_dir,
-                            "en to %s" % self.rot_dir,
-                            self.dst_gcos[:, chunk_d],
-                            self.dst_gsin[:, chunk_d],
-                        )
-                        self.logger.info(
-                            "%s %s", np.nanmin(dst_bdy), np.nanmax(dst_bdy)
-                        )
-                    # Apply 1-2-1 filter along bdy pts using NN ind self.id_121
-                    if False:  # turning off filter for now
-                        # if self.first:
-                        if isslab:
-                            id_121 = self.id_121_2d[:, chunk_d, :]
-                            tmp_filt = self.tmp_filt_2d[:, chunk_d, :]
-                        else:
-                            id_121 = self.id_121_3d[:, chunk_d, :]
-                            tmp_filt = self.tmp_filt_3d[:, chunk_d, :]
-
-                        tmp_valid = np.invert(np.isnan(dst_bdy.flatten("F")[id_121]))
-
-                        dst_bdy = np.nansum(
-                            dst_bdy.flatten("F")[id_121] * tmp_filt, 2
-                        ) / np.sum(tmp_filt * tmp_valid, 2)
-
-                        # Finished first run operations
-                        # self.first = False
-
-                    data_out = dst_bdy
-
-                    # add data to self.d_bdy
-                    if self.key_vec is True and self.rot_dir == "j":
-                        self.d_bdy[self.var_nam[vn + 1]][year]["data"][
-                            int(f - first_date), :, chunk_d
-                        ] = data_out.T
-                    else:
-                        self.d_bdy[self.var_nam[vn]][year]["data"][
-                            int(f - first_date), :, chunk_d
-                        ] = data_out.T
+                data_out.append(dst_bdy)
+            # End Looping over time blocks
+            data_chunk.append(np.concatenate(data_out, axis=0))
+        # End Looping over vars
+        self.logger.info(" END VAR LOOP ")
+        return data_chunk
 
-        # Need stats on fill pts in z and horiz + missing pts...
+    def _time_blocks(self, first_date, last_date, step_size):
+        """
+        Split the time entries into blocks that are read in one go.
 
-    # end month
-    # end year
-    # End great loop of crawling chaos
+        Without ln_block_read each time entry is read on its own. With it
+        the whole range is read at once, unless nn_block_mem (MB) limits
+        the size of each read.
+
+        Parameters
+        ----------
+        first_date  (int) : index of the first time entry
+        last_date   (int) : index of the last time entry
+        step_size   (int) : size in bytes of one time entry
+
+        Returns
+        -------
+        blocks     (list) : (start, stop) indices of each block
+        """
+        n_steps = 1
+        if self.settings.get("block_read", False):
+            n_steps = last_date + 1 - first_date
+            block_mem = self.settings.get("block_mem", 0) * 1024**2
+            if block_mem > 0:
+                n_steps = min(n_steps, max(1, int(block_mem // step_size)))
+        starts = range(first_date, last_date + 1, n_steps)
+        return [(f, min(f + n_steps, last_date + 1)) for f in starts]
+
+    def _is_slab(self, sc_time, var_nam):
+        """
+        Check whether a source variable is 2D (time, y, x).
+
+        Parameters
+        ----------
+        sc_time  (obj) : source grid group from the reader
+        var_nam  (str) : name of the variable
+
+        Returns
+        -------
+        isslab  (bool) : True if the variable has no depth axis
+        """
+        try:
+            n_dims = len(sc_time[var_nam]._get_dimensions())
+        except TypeError:
+            raise Exception(
+                'The variables in src data files may need renaming to match "'
+                + var_nam
+                + '", see documentation on NcML rename.'
+            )
+        return n_dims == 3
+
+    def _chunk_masks(self, chk):
+        """
+        Return the source land masks for a chunk, reading them on first use.
+
+        Parameters
+        ----------
+        chk  (int) : index of the chunk
 
-    # Allows reference of two equal sized but misshapen arrays
-    # equivalent to Matlab alpha(beta(:))
-    def _flat_ref(self, alpha, beta):
+        Returns
+        -------
+        t_mask   (np.array) : tmask for the chunk [1, nz_sc, nj, ni]
+        u_mask   (np.array) : umask for the chunk or None
+        v_mask   (np.array) : vmask for the chunk or None
+        land_ind     (dict) : flat indices of the land points in a time entry
+                              of [nz_sc, nj, ni] (False) or [1, nj, ni] (True)
+        """
+        if chk not in self.sc_masks:
+            t_mask, u_mask, v_mask = self._get_mask(chk)
+            land_ind = {
+                False: np.flatnonzero(t_mask == 0),
+                True: np.flatnonzero(t_mask[:, 0:1, :, :] == 0),
+            }
+            self.sc_masks[chk] = (t_mask, u_mask, v_mask, land_ind)
+        return self.sc_masks[chk]
+
+    def _get_mask(self, chk):
         """
-        Extract input index elements from array and order them in Fortran array and return the new array.
+        Read the source land masks for a chunk.
 
         Parameters
         ----------
-        alpha : input array
-        beta  : index array
+        chk  (int) : index of the chunk
 
         Returns
         -------
-        alpha : index elements in flat Fortran array
+        t_mask (np.array) : tmask for the chunk [1, nz_sc, nj, ni]
+        u_mask (np.array) : umask for the chunk extended by one point in i, or None
+        v_mask (np.array) : vmask for the chunk extended by one point in j, or None
         """
-        return alpha.flatten("F")[beta.flatten("F")].reshape(beta.shape, order="F")
+        sc_z_len = self.sc_z_len
+        i_run = np.arange(self.sc_ind_ch[chk]["imin"], self.sc_ind_ch[chk]["imax"])
+        j_run = np.arange(self.sc_ind_ch[chk]["jmin"], self.sc_ind_ch[chk]["jmax"])
+        extended_i = np.arange(
+            self.sc_ind_ch[chk]["imin"] - 1, self.sc_ind_ch[chk]["imax"]
+        )
+        extended_j = np.arange(
+            self.sc_ind_ch[chk]["jmin"] - 1, self.sc_ind_ch[chk]["jmax"]
+        )
+        if self.sc_wrap[chk]:
+            extended_i[extended_i < 0] += self.sc_ind_ch[chk]["imax"]
+            i_plus = 0
+        else:
+            i_plus = 1
+
+        u_mask = None
+        v_mask = None
+        nc_3 = GetFile(self.settings["src_msk"])
+        varid_3 = nc_3["tmask"]
+        t_mask = varid_3[
+            :1,
+            :sc_z_len,
+            np.min(j_run) : np.max(j_run) + 1,
+            np.min(i_run) : np.max(i_run) + i_plus,
+        ]
+        if t_mask.shape[1] == 1:
+            raise Exception(
+                "Mask dimensions are not correct. Depth is "
+                + str(sc_z_len)
+                + " but tmask is "
+                + str(t_mask.shape[1])
+            )
+
+        if self.key_vec:
+            varid_3 = nc_3["umask"]
+            u_mask = varid_3[
+                :1,
+                :sc_z_len,
+                np.min(j_run) : np.max(j_run) + 1,
+                np.min(extended_i) : np.max(extended_i) + i_plus,
+            ]
+            varid_3 = nc_3["vmask"]
+            v_mask = varid_3[
+                :1,
+                :sc_z_len,
+                np.min(extended_j) : np.max(extended_j) + 1,
+                np.min(i_run) : np.max(i_run) + i_plus,
+            ]
+            if u_mask.shape[1] == 1:
+                raise Exception(
+                    "Mask dimensions are not correct. Depth is "
+                    + str(sc_z_len)
+                    + " but umask is "
+                    + str(u_mask.shape[1])
+                )
+            if v_mask.shape[1] == 1:
+                raise Exception(
+                    "Mask dimensions are not correct. Depth is "
+                    + str(sc_z_len)
+                    + " but vmask is "
+                    + str(v_mask.shape[1])
+                )
+        nc_3.close()
+
+        if self.sc_wrap[chk]:
+            # Stick first and last slice on opposite end
+            t_mask = np.concatenate((t_mask, t_mask[:, :, :, 0:1]), axis=3)
+            if self.key_vec:
+                u_mask = np.concatenate(
+                    (u_mask[:, :, :, -2:-1], u_mask, u_mask[:, :, :, 0:1]),
+                    axis=3,
+                )
+                v_mask = np.concatenate((v_mask, v_mask[:, :, :, 0:1]), axis=3)
+
+        return t_mask, u_mask, v_mask
 
     # Convert numeric date from source to dest
     #   def convert_date(self, date):
@@ -1127,20 +1370,22 @@ class Extract:
 
         return deltaT[0], dstep
 
-    def time_interp(self, year, month):
+    def _time_targets(self, year, month):
         """
-        Perform a time interpolation of the BDY data to daily frequency.
+        Get the source and daily target times for the time interpolation.
 
-        Notes
-        -----
-        This method performs a time interpolation (if required). This is
-        necessary if the time frequency is not a factor of monthly output or the
-        input and output calendars differ. CF compliant calendar options
-        accepted: gregorian | standard, proleptic_gregorian, noleap | 365_day,
-        360_day or julian.*
-        """
-        # RDP: this could be made more flexible to interpolate to other deltaTs
+        Parameters
+        ----------
+        year  (int) : year being processed
+        month (int) : month being processed
 
+        Returns
+        -------
+        time_counter (np.array) : source times in seconds since date_origin
+        target_time  (np.array) : daily target times in seconds since date_origin
+        del_t        (float)    : length of source time step
+        dstep        (int)      : number of source time steps per day
+        """
         # Extract time information
         # TODO: check that we can just use var_nam[0]. Rational is that if
         # we're grouping variables then they must all have the same date stamps
@@ -1180,20 +1425,27 @@ class Extract:
         # get deltaT and number of time steps per day (dstep)
         del_t, dstep = self.time_delta(time_counter)
 
-        if self.key_vec is True:
-            if self.rot_dir == "i":
-                varnams = [
-                    self.var_nam[0],
-                ]
-            else:
-                varnams = [
-                    self.var_nam[1],
-                ]
-        else:
-            varnams = self.var_nam
-
         # target time index
         target_time = np.arange(time_000, time_end, 86400)
+
+        return time_counter, target_time, del_t, dstep
+
+    def time_interp(self, year, month):
+        """
+        Perform a time interpolation of the BDY data to daily frequency.
+
+        Notes
+        -----
+        This method performs a time interpolation (if required). This is
+        necessary if the time frequency is not a factor of monthly output or the
+        input and output calendars differ. CF compliant calendar options
+        accepted: gregorian | standard, proleptic_gregorian, noleap | 365_day,
+        360_day or julian.*
+        """
+        # RDP: this could be made more flexible to interpolate to other deltaTs
+        time_counter, target_time, del_t, dstep = self._time_targets(year, month)
+        varnams = self._out_names()
+
         if len(target_time):
             # interpolate
             for v in varnams:
@@ -1204,7 +1456,9 @@ class Extract:
                         axis=0,
                         bounds_error=True,
                     )
-                    self.d_bdy[v][year]["data"] = intfn(target_time)
+                    self.d_bdy[v][year]["data"] = intfn(target_time).astype(
+                        self.dtype, copy=False
+                    )
                 else:  # downsampling
                     for t in range(dstep):
                         intfn = interp1d(
@@ -1244,6 +1498,175 @@ class Extract:
         -------
             None
         """
+        ncid = self._create_out_file(year, month, unit_origin)
+
+        # Loop over variables in extracted object, writing them all before
+        # the file is closed
+        try:
+            #        for v in self.variables:
+            for v in self._out_names():
+                for name, data in self._out_data(v, self.d_bdy[v][year]["data"]):
+                    # Write variable to file
+                    ncpop.write_data(ncid, name, data)
+
+            ncpop.write_data(ncid, "time_counter", self.time_counter)
+            self._write_grid_info(ncid, ind)
+        finally:
+            ncid.close()
+
+    def stream_month(self, year, month, ind, unit_origin):
+        """
+        Extract, interpolate in time and write out a month one slice at a time.
+
+        Notes
+        -----
+        This is the ln_stream_write alternative to extract_month, time_interp
+        and write_out. The source data are read one time entry at a time and
+        each output time slice is written as soon as it is ready, so only two
+        source time slices are held in memory whatever the length of the
+        month. The time interpolation is linear between the two source time
+        entries either side of each daily output time, as in time_interp.
+
+        Parameters
+        ----------
+            year         (int) : year to process
+            month        (int) : month to process
+            ind          (dict): dictionary holding grid information
+            unit_origin  (str) : time reference '%d 00:00:00' %date_origin
+
+        Returns
+        -------
+            None
+        """
+        first_date, last_date, meta_data = self._month_range(year, month)
+        all_chunk = np.unique(self.dst_chunk)
+        n_chunk = len(all_chunk)
+        varnams = self._out_names()
+
+        # Source time entries needed for each output time slice
+        if self.settings.get("time_interpolation", True):
+            time_counter, target_time, del_t, dstep = self._time_targets(year, month)
+            if not len(target_time):
+                self.logger.warning("No output times in month %s %s", year, month)
+                return
+            if (target_time[0] < time_counter[0]) or (
+                target_time[-1] > time_counter[-1]
+            ):
+                raise ValueError(
+                    "Output times are outside the range of the source data."
+                )
+            hi_ind = np.searchsorted(time_counter, target_time)
+            hi_ind = np.clip(hi_ind, 1, len(time_counter) - 1)
+            lo_ind = hi_ind - 1
+            out_time = target_time
+        else:
+            lo_ind = np.arange(last_date + 1 - first_date)
+            hi_ind = lo_ind
+            out_time = self.time_counter
+
+        fill_mean = not self.settings["zinterp"]
+        data_sum = dict.fromkeys(varnams, 0.0)
+        data_count = dict.fromkeys(varnams, 0)
+        slices = {}
+        ncid = self._create_out_file(year, month, unit_origin)
+        try:
+            self._write_grid_info(ncid, ind)
+            for n in range(len(out_time)):
+                # Read the source time entries needed, dropping older ones
+                for f in list(slices):
+                    if f < lo_ind[n]:
+                        del slices[f]
+                for f in (lo_ind[n], hi_ind[n]):
+                    if f not in slices:
+                        slices[f] = self._extract_slice(
+                            first_date + f, n_chunk, meta_data, varnams
+                        )
+
+                for v in varnams:
+                    if hi_ind[n] == lo_ind[n]:
+                        data = slices[lo_ind[n]][v]
+                    else:
+                        # Linear interpolation in time, as done by interp1d
+                        x_lo = time_counter[lo_ind[n]]
+                        x_hi = time_counter[hi_ind[n]]
+                        y_lo = slices[lo_ind[n]][v]
+                        y_hi = slices[hi_ind[n]][v]
+                        slope = (y_hi - y_lo) / (x_hi - x_lo)
+                        data = slope * (out_time[n] - x_lo) + y_lo
+                    if fill_mean:
+                        data_sum[v] += np.nansum(data)
+                        data_count[v] += np.sum(np.invert(np.isnan(data)))
+                    out_data = self._out_data(v, data[np.newaxis], fill_mean=False)
+                    for name, data_out in out_data:
+                        nc_var = ncid.variables[name]
+                        nc_var[n] = np.reshape(data_out, nc_var.shape[1:])
+                ncid.variables["time_counter"][n] = out_time[n]
+
+            if fill_mean:
+                # Fill nans with the mean over the month once it is known
+                for v in varnams:
+                    _fill_nan_mean(ncid.variables[v], data_sum[v] / data_count[v])
+        finally:
+            ncid.close()
+
+        self.time_counter = out_time
+
+    def _extract_slice(self, f, n_chunk, meta_data, varnams):
+        """
+        Extract one source time entry for all chunks.
+
+        Parameters
+        ----------
+        f           (int) : index of the source time entry
+        n_chunk     (int) : number of chunks
+        meta_data  (list) : scale factor and offset of each variable
+        varnams    (list) : output names of the variables
+
+        Returns
+        -------
+        data_slice (dict) : bdy data [nz, nbdy] of each variable
+        """
+        data_slice = {}
+        for chk in range(n_chunk):
+            chunk_d = self.dst_chunk == np.unique(self.dst_chunk)[chk]
+            data_chunk = self._extract_chunk(chk, meta_data, f, f)
+            for vn in range(len(varnams)):
+                if varnams[vn] not in data_slice:
+                    data_slice[varnams[vn]] = np.zeros(
+                        (data_chunk[vn].shape[1], self.num_bdy), dtype=self.dtype
+                    )
+                data_slice[varnams[vn]][:, chunk_d] = data_chunk[vn][0]
+        return data_slice
+
+    def _out_names(self):
+        """Return the names of the variables written out for the grid."""
+        if self.key_vec is True:
+            if self.rot_dir == "i":
+                varnams = [
+                    self.var_nam[0],
+                ]
+            else:
+                varnams = [
+                    self.var_nam[1],
+                ]
+        else:
+            varnams = self.var_nam
+        return varnams
+
+    def _create_out_file(self, year, month, unit_origin):
+        """
+        Create the output file for a month.
+
+        Parameters
+        ----------
+            year         (int) : year to write out
+            month        (int) : month to write out
+            unit_origin  (str) : time reference '%d 00:00:00' %date_origin
+
+        Returns
+        -------
+            ncid         (obj) : the output file, open for writing
+        """
         # Define output filename
 
         self.logger.info(
@@ -1253,19 +1676,15 @@ class Extract:
             year,
         )
 
-        f_out = (
-            self.settings["dst_dir"]
-            + self.settings["fn"]
-            + "_bdy"
-            + self.g_type.upper()
-            + "_y"
-            + str(year)
-            + "m"
-            + "%02d" % month
-            + ".nc"
-        )
+        f_out = get_out_file(self.settings, self.g_type, year, month)
 
-        ncgen.CreateBDYNetcdfFile(
+        options = {
+            "compression": self.settings.get("out_compression", "none"),
+            "complevel": self.settings.get("out_complevel", 4),
+            "lsd": self.settings.get("out_lsd", -1),
+            "chunk_xb": self.settings.get("out_chunk_xb", 0),
+        }
+        ncid = ncgen.CreateBDYNetcdfFile(
             f_out,
             self.num_bdy,
             self.jpi,
@@ -1278,65 +1697,79 @@ class Extract:
             self.settings["dst_calendar"],
             self.settings["ice"],
             self.g_type.upper(),
+            options,
+            keep_open=True,
         )
 
         self.logger.info("Writing out BDY data to: %s", f_out)
+        return ncid
 
-        # Loop over variables in extracted object
+    def _out_data(self, v, data, fill_mean=True):
+        """
+        Prepare the data of a variable for writing out.
 
-        #        for v in self.variables:
-        if self.key_vec is True:
-            if self.rot_dir == "i":
-                varnams = [
-                    self.var_nam[0],
-                ]
-            else:
-                varnams = [
-                    self.var_nam[1],
-                ]
-        else:
-            varnams = self.var_nam
+        Parameters
+        ----------
+            v           (str)      : name of the variable
+            data        (np.array) : bdy data [nt, nz, nbdy]
+            fill_mean   (bool)     : if ln_zinterp is false fill nans with the
+                                     mean of the data
 
-        for v in varnams:
-            if self.settings["dyn2d"] and (
-                (v == "vozocrtx") or (v == "vomecrty")
-            ):  # Calculate depth averaged velocity
-                tile_dz = np.tile(self.bdy_dz, [len(self.time_counter), 1, 1, 1])
-                tile_dz = np.ma.filled(tile_dz, np.nan)
-                tmp_var = np.reshape(
-                    self.d_bdy[v][year]["data"][:, :, :], tile_dz.shape
-                )
-                tmp_var = np.nansum(tmp_var * tile_dz, 2) / np.nansum(tile_dz, 2)
-                # Write variable to file
-                if v == "vozocrtx":
-                    ncpop.write_data_to_file(f_out, "vobtcrtx", tmp_var)
-                else:
-                    ncpop.write_data_to_file(f_out, "vobtcrty", tmp_var)
-
-            if self.settings["zinterp"]:
-                # Replace NaNs with specified fill value
-                tmp_var = np.where(
-                    np.isnan(self.d_bdy[v][year]["data"][:, :, :]),
-                    self.settings["fv"],
-                    self.d_bdy[v][year]["data"][:, :, :],
-                )
-                jpk, jpj, jpi = tmp_var.shape
-
-                if jpj > 1:
-                    for k in range(jpk):
-                        tmp_var[k, :, :] = np.where(
-                            np.isnan(self.dst_dep),
-                            self.settings["fv"],
-                            tmp_var[k, :, :],
-                        )
+        Returns
+        -------
+            out_data    (list)     : (name, data) of each variable to write
+        """
+        out_data = []
+        if self.settings["dyn2d"] and (
+            (v == "vozocrtx") or (v == "vomecrty")
+        ):  # Calculate depth averaged velocity
+            tile_dz = np.tile(self.bdy_dz, [data.shape[0], 1, 1, 1])
+            tile_dz = np.ma.filled(tile_dz, np.nan)
+            tmp_var = np.reshape(data[:, :, :], tile_dz.shape)
+            tmp_var = np.nansum(tmp_var * tile_dz, 2) / np.nansum(tile_dz, 2)
+            if v == "vozocrtx":
+                out_data.append(("vobtcrtx", tmp_var))
             else:
-                # leave all data unfilled for run-time NEMO vertical interpolation
-                tmp_var = self.d_bdy[v][year]["data"][:, :, :]
+                out_data.append(("vobtcrty", tmp_var))
+
+        if self.settings["zinterp"]:
+            # Replace NaNs with specified fill value
+            tmp_var = np.where(
+                np.isnan(data[:, :, :]),
+                self.settings["fv"],
+                data[:, :, :],
+            )
+            jpk, jpj, jpi = tmp_var.shape
+
+            if jpj > 1:
+                for k in range(jpk):
+                    tmp_var[k, :, :] = np.where(
+                        np.isnan(self.dst_dep),
+                        self.settings["fv"],
+                        tmp_var[k, :, :],
+                    )
+        else:
+            # leave all data unfilled for run-time NEMO vertical interpolation
+            tmp_var = data[:, :, :]
+            if fill_mean:
                 tmp_var[np.isnan(tmp_var)] = np.nanmean(tmp_var)
 
-            # Write variable to file
-            ncpop.write_data_to_file(f_out, v, tmp_var)
+        out_data.append((v, tmp_var))
+        return out_data
+
+    def _write_grid_info(self, ncid, ind):
+        """
+        Write the depths, coordinates and bdy indices to the output file.
 
+        Parameters
+        ----------
+            ncid         (obj) : the output file, open for writing
+            ind          (dict): dictionary holding grid information
+
+        Returns
+        -------
+            None
+        """
         if self.settings["zinterp"]:
             # check depth array has had NaNs removed
 
@@ -1354,13 +1787,12 @@ class Extract:
 
         # Write remaining data to file (indices are in Python notation
         # therefore we must add 1 to i,j and r)
-        ncpop.write_data_to_file(f_out, "nav_lon", self.nav_lon)
-        ncpop.write_data_to_file(f_out, "nav_lat", self.nav_lat)
-        ncpop.write_data_to_file(f_out, "gdep" + self.g_type, tmp_dst_dep)
-        ncpop.write_data_to_file(f_out, "e3" + self.g_type, tmp_dst_dz)
-        ncpop.write_data_to_file(f_out, "nbidta", ind.bdy_i[:, 0] + 1)
-        ncpop.write_data_to_file(f_out, "nbjdta", ind.bdy_i[:, 1] + 1)
-        ncpop.write_data_to_file(f_out, "nbrdta", ind.bdy_r[:] + 1)
-        ncpop.write_data_to_file(f_out, "time_counter", self.time_counter)
+        ncpop.write_data(ncid, "nav_lon", self.nav_lon)
+        ncpop.write_data(ncid, "nav_lat", self.nav_lat)
+        ncpop.write_data(ncid, "gdep" + self.g_type, tmp_dst_dep)
+        ncpop.write_data(ncid, "e3" + self.g_type, tmp_dst_dz)
+        ncpop.write_data(ncid, "nbidta", ind.bdy_i[:, 0] + 1)
+        ncpop.write_data(ncid, "nbjdta", ind.bdy_i[:, 1] + 1)
+        ncpop.write_data(ncid, "nbrdta", ind.bdy_r[:] + 1)
         if self.g_type == "t":
-            ncpop.write_data_to_file(f_out, "bdy_msk", self.bdy_msk)
+            ncpop.write_data(ncid, "bdy_msk", self.bdy_msk)
@@ -28,6 +28,9 @@ import logging
 
 import numpy as np
 
+# Local Imports
+from .utils.nemo_bdy_lib import bdy_gather
+
 
 class Boundary:
     """Class for boundary definitions."""
@@ -209,7 +212,7 @@ class Boundary:
 
     def remove_landpoints_open_ocean(self, mask, bdy_i, bdy_r):
         """Remove the land points and open ocean points."""
-        unmask_index = mask[bdy_i[:, 1], bdy_i[:, 0]] == 1
+        unmask_index = bdy_gather(mask, bdy_i) == 1
         bdy_i = bdy_i[unmask_index, :]
         bdy_r = bdy_r[unmask_index]
         return bdy_i, bdy_r, unmask_index
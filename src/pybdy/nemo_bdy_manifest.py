@@ -0,0 +1,239 @@
+# ===================================================================
+# Copyright 2025 National Oceanography Centre
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# ===================================================================
+
+"""
+Created on Sun Oct 18 20:20:00 2026.
+
+Record the monthly bdy files as they are finished so an interrupted run
+can be resumed without writing them again.
+
+The manifest is a text file in sn_dst_dir with a line for each file
+written: a hash of the inputs of the run, the file name, the dates of the
+month it covers, its size and a sha256 checksum of its contents. Lines
+are only added once a file has been closed, so a file left part written
+by an interrupted run, or written by a run with other inputs, doesn't
+match the manifest.
+"""
+# External imports
+import datetime as dt
+import hashlib
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Increase if the contents of the output files change
+MANIFEST_VERSION = "1"
+
+# Files the output depends on, checked by size and modification time
+KEY_FILES = [
+    "src_hgr",
+    "src_zgr",
+    "dst_hgr",
+    "dst_zgr",
+    "src_msk",
+    "bathy",
+    "nme_map",
+    "src_dir",
+]
+
+# Settings that don't change the output data of a month. The dates are
+# checked for each month with month_span
+RUN_SETTINGS = [
+    "date_start",
+    "date_end",
+    "weight_cache",
+    "block_read",
+    "block_mem",
+    "workers",
+    "stream_write",
+    "max_open_files",
+    "tide_cache",
+    "async_write",
+]
+
+
+def get_key(settings, bdy_msk):
+    """
+    Hash the inputs that determine the output data.
+
+    Parameters
+    ----------
+    settings (dict)    : settings for bdy
+    bdy_msk (np.array) : mask of the regional domain
+
+    Returns
+    -------
+    key (str)          : hex digest of the inputs
+    """
+    sha = hashlib.sha256()
+    sha.update(MANIFEST_VERSION.encode())
+    for name in KEY_FILES:
+        path = settings.get(name, "")
+        sha.update((name + "=" + str(path)).encode())
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            sha.update(("%d %d" % (stat.st_size, stat.st_mtime_ns)).encode())
+    msk = np.ascontiguousarray(bdy_msk)
+    sha.update(str(msk.shape).encode())
+    sha.update(msk.tobytes())
+    for name in sorted(settings):
+        if name not in RUN_SETTINGS:
+            sha.update((name + "=" + str(settings[name])).encode())
+    return sha.hexdigest()
+
+
+def get_file(settings):
+    """
+    Return the manifest file name of the output directory.
+
+    Parameters
+    ----------
+    settings (dict) : settings for bdy
+
+    Returns
+    -------
+    filename (str)  : path of the manifest in the output directory
+    """
+    return settings["dst_dir"] + settings["fn"] + "_bdy_manifest.txt"
+
+
+def month_span(settings, year, month):
+    """
+    Return the dates of a month covered by the date range of the run.
+
+    The first and last months are cut short by sn_date_start and
+    sn_date_end, so their files change if the date range is changed.
+
+    Parameters
+    ----------
+    settings (dict) : settings for bdy
+    year     (int)  : year of the month
+    month    (int)  : month of the year
+
+    Returns
+    -------
+    span (str)      : first and last dates, '%Y-%m-%d/%Y-%m-%d'
+    """
+    st_d = dt.datetime.strptime(settings["date_start"], "%Y-%m-%d")
+    en_d = dt.datetime.strptime(settings["date_end"], "%Y-%m-%d")
+    first = dt.datetime(year, month, 1)
+    if month < 12:
+        last = dt.datetime(year, month + 1, 1)
+    else:
+        last = dt.datetime(year + 1, 1, 1)
+    first = max(first, st_d)
+    last = min(last, en_d)
+    return first.strftime("%Y-%m-%d") + "/" + last.strftime("%Y-%m-%d")
+
+
+def checksum(filename):
+    """
+    Return the sha256 checksum of the contents of a file.
+
+    Parameters
+    ----------
+    filename (str) : path of the file
+
+    Returns
+    -------
+    digest (str)   : hex digest of the file
+    """
+    sha = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for block in iter(lambda: f.read(2**24), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+class Manifest:
+    """Output files finished by runs with the same inputs."""
+
+    def __init__(self, filename, key):
+        """
+        Initialise the manifest.
+
+        Parameters
+        ----------
+        filename (str) : path of the manifest file
+        key (str)      : hash of the inputs of the run
+        """
+        self.filename = filename
+        self.key = key
+
+    def record(self, out_file, span):
+        """
+        Add a finished output file to the manifest.
+
+        Each file is added with a single append so forked workers can
+        record their files at the same time.
+
+        Parameters
+        ----------
+        out_file (str) : path of the closed output file
+        span (str)     : dates covered by the file, from month_span
+        """
+        line = "\t".join(
+            [
+                self.key,
+                os.path.basename(out_file),
+                span,
+                str(os.path.getsize(out_file)),
+                checksum(out_file),
+            ]
+        )
+        with open(self.filename, "a") as f:
+            f.write(line + "\n")
+
+    def load(self):
+        """
+        Read the files recorded by runs with the same inputs.
+
+        Returns
+        -------
+        done (dict) : dates, size and checksum of each file name
+        """
+        done = {}
+        if not os.path.isfile(self.filename):
+            return done
+        with open(self.filename) as f:
+            for line in f:
+                fields = line.rstrip("\n").split("\t")
+                if (len(fields) == 5) and (fields[0] == self.key):
+                    done[fields[1]] = (fields[2], int(fields[3]), fields[4])
+        return done
+
+    def is_complete(self, out_file, span, done):
+        """
+        Check an output file matches its entry in the manifest.
+
+        Parameters
+        ----------
+        out_file (str) : path of the output file
+        span (str)     : dates the file should cover, from month_span
+        done (dict)    : files recorded in the manifest, from load
+
+        Returns
+        -------
+        complete (bool): True if the file covers the same dates and is
+                         unchanged since it was written
+        """
+        entry = done.get(os.path.basename(out_file))
+        if (entry is None) or (not os.path.isfile(out_file)):
+            return False
+        if (entry[0] != span) or (os.path.getsize(out_file) != entry[1]):
+            return False
+        return checksum(out_file) == entry[2]
@@ -24,18 +24,93 @@ import logging
 from netCDF4 import Dataset
 
 
+def data_options(dims, dim_lens, options):
+    """
+    Return the createVariable arguments of a time varying data variable.
+
+    Parameters
+    ----------
+    dims (tuple)     : dimension names of the variable
+    dim_lens (dict)  : length of each dimension
+    options (dict)   : output options compression ('none', 'zlib', 'zstd', ...),
+                       complevel, lsd (least significant digit, -1 for none)
+                       and chunk_xb (bdy points in a chunk, 0 for all)
+
+    Returns
+    -------
+    kwargs (dict)    : keyword arguments for createVariable
+    """
+    kwargs = {}
+    compression = str(options.get("compression", "none")).lower()
+    if compression == "zlib":
+        kwargs["zlib"] = True
+        kwargs["complevel"] = options.get("complevel", 4)
+    elif compression not in ["none", ""]:
+        # Other compressors need netCDF4 1.6 and the netCDF-C plugins
+        kwargs["compression"] = compression
+        kwargs["complevel"] = options.get("complevel", 4)
+
+    lsd = options.get("lsd", -1)
+    if lsd >= 0:
+        kwargs["least_significant_digit"] = lsd
+
+    # NEMO reads one time entry of all the depths and bdy points at a time
+    chunk_xb = options.get("chunk_xb", 0)
+    if (chunk_xb > 0) or kwargs:
+        if chunk_xb <= 0:
+            chunk_xb = dim_lens["xb"]
+        chunks = []
+        for dim in dims:
+            if dim == "time_counter":
+                chunks.append(1)
+            elif dim == "xb":
+                chunks.append(min(chunk_xb, dim_lens["xb"]))
+            else:
+                chunks.append(dim_lens[dim])
+        kwargs["chunksizes"] = chunks
+    return kwargs
+
+
 def CreateBDYNetcdfFile(
-    filename, xb_len, x_len, y_len, depth_len, rw, h, orig, fv, calendar, ln_ice, grd
+    filename,
+    xb_len,
+    x_len,
+    y_len,
+    depth_len,
+    rw,
+    h,
+    orig,
+    fv,
+    calendar,
+    ln_ice,
+    grd,
+    options=None,
+    keep_open=False,
 ):
-    """Create a template of bdy netcdf files. A common for T, I, U, V, E grid types."""
+    """
+    Create a template of bdy netcdf files. A common for T, I, U, V, E grid types.
+
+    The options (see data_options) set the compression, quantisation and
+    chunks of the time varying data variables. With keep_open the open
+    Dataset is returned so the data can be written without reopening it.
+    """
     gridNames = ["T", "I", "U", "V", "E", "Z"]  # All possible grids
 
     # Additional dimension lengths
     yb_len = 1
+    dim_lens = {"z": depth_len, "yb": yb_len, "xb": xb_len}
+    if options is None:
+        options = {}
 
     # Enter define mode
     ncid = Dataset(filename, "w", clobber=True, format="NETCDF4")
 
+    def create_data(name, dims):
+        """Create a time varying data variable with the output options."""
+        return ncid.createVariable(
+            name, "f4", dims, fill_value=fv, **data_options(dims, dim_lens, options)
+        )
+
     # define dimensions
     if grd in gridNames and grd != "Z":  # i.e grid NOT barotropic (Z)
         ncid.createDimension("z", depth_len)
@@ -86,39 +161,9 @@ def CreateBDYNetcdfFile(
             ),
             fill_value=fv,
         )
-        varN1pID = ncid.createVariable(
-            "N1p",
-            "f4",
-            (
-                "time_counter",
-                "z",
-                "yb",
-                "xb",
-            ),
-            fill_value=fv,
-        )
-        varN3nID = ncid.createVariable(
-            "N3n",
-            "f4",
-            (
-                "time_counter",
-                "z",
-                "yb",
-                "xb",
-            ),
-            fill_value=fv,
-        )
-        varN5sID = ncid.createVariable(
-            "N5s",
-            "f4",
-            (
-                "time_counter",
-                "z",
-                "yb",
-                "xb",
-            ),
-            fill_value=fv,
-        )
+        varN1pID = create_data("N1p", ("time_counter", "z", "yb", "xb"))
+        varN3nID = create_data("N3n", ("time_counter", "z", "yb", "xb"))
+        varN5sID = create_data("N5s", ("time_counter", "z", "yb", "xb"))
     elif grd in ["T", "I"]:
         varztID = ncid.createVariable(
             "gdept",
@@ -149,69 +194,13 @@ def CreateBDYNetcdfFile(
             ),
             fill_value=fv,
         )
-        vartmpID = ncid.createVariable(
-            "votemper",
-            "f4",
-            (
-                "time_counter",
-                "z",
-                "yb",
-                "xb",
-            ),
-            fill_value=fv,
-        )
-        varsalID = ncid.createVariable(
-            "vosaline",
-            "f4",
-            (
-                "time_counter",
-                "z",
-                "yb",
-                "xb",
-            ),
-            fill_value=fv,
-        )
-        varsshID = ncid.createVariable(
-            "sossheig",
-            "f4",
-            (
-                "time_counter",
-                "yb",
-                "xb",
-            ),
-            fill_value=fv,
-        )
+        vartmpID = create_data("votemper", ("time_counter", "z", "yb", "xb"))
+        varsalID = create_data("vosaline", ("time_counter", "z", "yb", "xb"))
+        varsshID = create_data("sossheig", ("time_counter", "yb", "xb"))
         if ln_ice | (grd == "I"):
-            varildID = ncid.createVariable(
-                "ice1",
-                "f4",
-                (
-                    "time_counter",
-                    "yb",
-                    "xb",
-                ),
-                fill_value=fv,
-            )
-            variicID = ncid.createVariable(
-                "ice2",
-                "f4",
-                (
-                    "time_counter",
-                    "yb",
-                    "xb",
-                ),
-                fill_value=fv,
-            )
-            varisnID = ncid.createVariable(
-                "ice3",
-                "f4",
-                (
-                    "time_counter",
-                    "yb",
-                    "xb",
-                ),
-                fill_value=fv,
-            )
+            varildID = create_data("ice1", ("time_counter", "yb", "xb"))
+            variicID = create_data("ice2", ("time_counter", "yb", "xb"))
+            varisnID = create_data("ice3", ("time_counter", "yb", "xb"))
     elif grd == "U":
         varztID = ncid.createVariable(
             "gdepu",
@@ -233,27 +222,8 @@ def CreateBDYNetcdfFile(
             ),
             fill_value=fv,
         )
-        varbtuID = ncid.createVariable(
-            "vobtcrtx",
-            "f4",
-            (
-                "time_counter",
-                "yb",
-                "xb",
-            ),
-            fill_value=fv,
-        )
-        vartouID = ncid.createVariable(
-            "vozocrtx",
-            "f4",
-            (
-                "time_counter",
-                "z",
-                "yb",
-                "xb",
-            ),
-            fill_value=fv,
-        )
+        varbtuID = create_data("vobtcrtx", ("time_counter", "yb", "xb"))
+        vartouID = create_data("vozocrtx", ("time_counter", "z", "yb", "xb"))
     elif grd == "V":
         varztID = ncid.createVariable(
             "gdepv",
@@ -275,38 +245,10 @@ def CreateBDYNetcdfFile(
             ),
             fill_value=fv,
         )
-        varbtvID = ncid.createVariable(
-            "vobtcrty",
-            "f4",
-            (
-                "time_counter",
-                "yb",
-                "xb",
-            ),
-            fill_value=fv,
-        )
-        vartovID = ncid.createVariable(
-            "vomecrty",
-            "f4",
-            (
-                "time_counter",
-                "z",
-                "yb",
-                "xb",
-            ),
-            fill_value=fv,
-        )
+        varbtvID = create_data("vobtcrty", ("time_counter", "yb", "xb"))
+        vartovID = create_data("vomecrty", ("time_counter", "z", "yb", "xb"))
     elif grd == "Z":
-        varsshID = ncid.createVariable(
-            "sossheig",
-            "f4",
-            (
-                "time_counter",
-                "yb",
-                "xb",
-            ),
-            fill_value=fv,
-        )
+        varsshID = create_data("sossheig", ("time_counter", "yb", "xb"))
         varmskID = ncid.createVariable(
             "bdy_msk",
             "f4",
@@ -510,4 +452,6 @@ def CreateBDYNetcdfFile(
     else:
         logging.error("Unknown Grid")
 
+    if keep_open:
+        return ncid
     ncid.close()
@@ -33,6 +33,20 @@ def write_data_to_file(filename, variable_name, data):
     data -- data that will be written to variable in netcdf.
     """
     ncid = Dataset(filename, "a", clobber=False, format="NETCDF4")
+    write_data(ncid, variable_name, data)
+    ncid.close()
+
+
+def write_data(ncid, variable_name, data):
+    """
+    Write the data to a variable of the open netcdf templete file.
+
+    Parameters
+    ----------
+    ncid -- open netCDF4 Dataset
+    variable_name -- variable name into which the data is written to.
+    data -- data that will be written to variable in netcdf.
+    """
     count = data.shape
 
     three_dim_variables = ["votemper", "vosaline", "N1p", "N3n", "N5s"]
@@ -68,5 +82,3 @@ def write_data_to_file(filename, variable_name, data):
             ncid.variables[variable_name][:, :] = data[:, :]
         elif len(count) == 3:
             ncid.variables[variable_name][:, :, :] = data[:, :, :]
-
-    ncid.close()
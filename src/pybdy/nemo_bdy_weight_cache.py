@@ -0,0 +1,234 @@
+# ===================================================================
+# Copyright 2025 National Oceanography Centre
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# ===================================================================
+
+"""
+Created on Sun Oct 18 10:12:00 2026.
+
+Store the boundary indices and interpolation weights between runs so
+repeat runs over the same domain can skip the grid setup.
+
+The cache is a .npz file in sn_dst_dir named after a hash of the grid,
+mask and namelist settings that the weights depend on. The grid files
+are hashed by their header, size and modification time.
+"""
+# External imports
+import hashlib
+import logging
+import os
+
+import numpy as np
+import scipy.sparse as sparse
+
+logger = logging.getLogger(__name__)
+
+# Increase if the contents of the cache change
+CACHE_VERSION = "2"
+
+# Bytes read from the start of each file for the key, enough for the
+# netCDF header of the grids
+HEADER_BYTES = 2**16
+
+# Files and settings the weights depend on
+KEY_FILES = ["src_hgr", "src_zgr", "dst_hgr", "dst_zgr", "src_msk", "nme_map"]
+KEY_SETTINGS = [
+    "rimwidth",
+    "r0",
+    "zinterp",
+    "src_zgr_type",
+    "dst_zgr_type",
+    "dyn2d",
+    "dyn3d",
+    "tra",
+    "ice",
+    "single_precision",
+]
+
+
+def get_key(settings, bdy_msk):
+    """
+    Hash the inputs that determine the boundary weights.
+
+    Parameters
+    ----------
+    settings (dict)    : settings for bdy
+    bdy_msk (np.array) : mask of the regional domain
+
+    Returns
+    -------
+    key (str)          : hex digest of the inputs
+    """
+    sha = hashlib.sha256()
+    sha.update(CACHE_VERSION.encode())
+    for name in KEY_FILES:
+        path = settings[name]
+        sha.update(name.encode())
+        if os.path.isfile(path):
+            # The grids can be several GB so only the header is read, with
+            # the size and modification time standing in for the data
+            stat = os.stat(path)
+            sha.update(("%d %d" % (stat.st_size, stat.st_mtime_ns)).encode())
+            with open(path, "rb") as f:
+                sha.update(f.read(HEADER_BYTES))
+        else:
+            # Remote data so use the url
+            sha.update(str(path).encode())
+    msk = np.ascontiguousarray(bdy_msk)
+    sha.update(str(msk.shape).encode())
+    sha.update(msk.tobytes())
+    for name in KEY_SETTINGS:
+        sha.update((name + "=" + str(settings.get(name, False))).encode())
+    return sha.hexdigest()
+
+
+def get_file(settings, bdy_msk):
+    """
+    Return the cache file name for the given inputs.
+
+    Parameters
+    ----------
+    settings (dict)    : settings for bdy
+    bdy_msk (np.array) : mask of the regional domain
+
+    Returns
+    -------
+    filename (str)     : path of the cache file in the output directory
+    """
+    key = get_key(settings, bdy_msk)
+    return settings["dst_dir"] + settings["fn"] + "_bdy_weights_" + key[:16] + ".npz"
+
+
+def save(filename, cache):
+    """
+    Write the cache to a .npz file.
+
+    Parameters
+    ----------
+    filename (str) : path of the cache file
+    cache (dict)   : nested dicts and lists of arrays, sparse matrices and scalars
+    """
+    flat = {}
+    _flatten(cache, "", flat)
+    tmp_file = filename + ".tmp.npz"
+    np.savez(tmp_file, **flat)
+    os.replace(tmp_file, filename)
+    logger.info("Written weight cache %s", filename)
+
+
+def load(filename):
+    """
+    Read the cache from a .npz file.
+
+    Parameters
+    ----------
+    filename (str) : path of the cache file
+
+    Returns
+    -------
+    cache (dict)   : the cache or None if it doesn't exist or can't be read
+    """
+    if not os.path.isfile(filename):
+        logger.info("No weight cache found at %s", filename)
+        return None
+    try:
+        with np.load(filename, allow_pickle=False) as npz:
+            flat = {k: npz[k] for k in npz.files}
+        cache = _unflatten(flat)
+    except (OSError, ValueError, KeyError) as err:
+        logger.warning("Ignoring unreadable weight cache %s: %s", filename, err)
+        return None
+    if cache.get("version") != CACHE_VERSION:
+        logger.info("Weight cache %s is from another version", filename)
+        return None
+    logger.info("Using weight cache %s", filename)
+    return cache
+
+
+def _encode(key):
+    """Encode a dict key with its type."""
+    if isinstance(key, (bool, np.bool_)):
+        return "b." + str(int(key))
+    elif isinstance(key, (int, np.integer)):
+        return "i." + str(key)
+    return "s." + str(key)
+
+
+def _decode(key):
+    """Decode a dict key written by _encode."""
+    k_type, k_val = key.split(".", 1)
+    if k_type == "b":
+        return bool(int(k_val))
+    elif k_type == "i":
+        return int(k_val)
+    return k_val
+
+
+def _flatten(obj, path, flat):
+    """Flatten nested containers into a dict of arrays keyed by path@type."""
+    if isinstance(obj, dict):
+        flat[path + "@dict"] = np.array(len(obj))
+        for k, v in obj.items():
+            _flatten(v, path + "/" + _encode(k), flat)
+    elif isinstance(obj, (list, tuple)):
+        flat[path + "@list"] = np.array(len(obj))
+        for i, v in enumerate(obj):
+            _flatten(v, path + "/" + str(i), flat)
+    elif sparse.issparse(obj):
+        obj = obj.tocsr()
+        flat[path + "@csr_data"] = obj.data
+        flat[path + "@csr_indices"] = obj.indices
+        flat[path + "@csr_indptr"] = obj.indptr
+        flat[path + "@csr_shape"] = np.array(obj.shape)
+    elif np.ma.isMaskedArray(obj):
+        flat[path + "@ma_data"] = np.ma.getdata(obj)
+        flat[path + "@ma_mask"] = np.ma.getmaskarray(obj)
+    elif isinstance(obj, np.ndarray):
+        flat[path + "@array"] = obj
+    elif obj is None:
+        flat[path + "@none"] = np.array(0)
+    else:
+        flat[path + "@scalar"] = np.array(obj)
+
+
+def _unflatten(flat):
+    """Rebuild the nested containers written by _flatten."""
+    tree = {}
+    for name, value in flat.items():
+        path, tag = name.rsplit("@", 1)
+        node = tree
+        for part in path.split("/")[1:]:
+            node = node.setdefault("children", {}).setdefault(part, {})
+        node.setdefault("tags", {})[tag] = value
+    return _build(tree)
+
+
+def _build(node):
+    """Convert a node of the flattened tree back to its object."""
+    tags = node["tags"]
+    children = node.get("children", {})
+    if "dict" in tags:
+        return {_decode(k): _build(v) for k, v in children.items()}
+    elif "list" in tags:
+        return [_build(children[str(i)]) for i in range(int(tags["list"]))]
+    elif "csr_data" in tags:
+        return sparse.csr_matrix(
+            (tags["csr_data"], tags["csr_indices"], tags["csr_indptr"]),
+            shape=tuple(tags["csr_shape"]),
+        )
+    elif "ma_data" in tags:
+        return np.ma.masked_array(tags["ma_data"], mask=tags["ma_mask"])
+    elif "array" in tags:
+        return tags["array"]
+    elif "none" in tags:
+        return None
+    return tags["scalar"].item()
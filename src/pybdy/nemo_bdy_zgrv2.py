@@ -23,11 +23,10 @@ Created.
 import logging
 
 import numpy as np
-import scipy.spatial as sp
 
 # Local imports
 from .reader.factory import GetFile
-from .utils.nemo_bdy_lib import sub2ind
+from .utils.nemo_bdy_lib import bdy_gather, kd_points, kd_query, kd_tree, sub2ind
 
 
 def get_bdy_depths_old(bdy_t, bdy_u, bdy_v, DstCoord, settings):
@@ -167,34 +166,26 @@ def get_bdy_depths(DstCoord, bdy_ind, grd):
         elif grd == "v":
             g = grd
 
-        # find bdy indices from subscripts
-        g_ind = sub2ind(
-            mbathy.shape,
-            bdy_ind[grd].bdy_i_ch[c_ind, 0],
-            bdy_ind[grd].bdy_i_ch[c_ind, 1],
-        )
-
-        # Get the gdept, gdepw and e3 data from the Dst grid
-
-        m_w = np.ma.array(np.squeeze(DstCoord.zgr[grd][c].grid["gdep" + g + "w"]))
-        m_t = np.ma.array(np.squeeze(DstCoord.zgr[grd][c].grid["gdep" + grd]))
-        m_e = np.ma.array(np.squeeze(DstCoord.zgr[grd][c].grid["e3" + grd]))
-
-        bdy_wz[c] = np.ma.zeros((m_w.shape[0], len(g_ind)))
-        bdy_tz[c] = np.ma.zeros((m_t.shape[0], len(g_ind)))
-        bdy_e3[c] = np.ma.zeros((m_e.shape[0], len(g_ind)))
-        for k in range(m_w.shape[0]):
-            tmp_w = np.ma.masked_where(mbathy + 1 < (k + 1), m_w[k, :, :])
-            tmp_t = np.ma.masked_where(mbathy < (k + 1), m_t[k, :, :])
-            tmp_e = np.ma.masked_where(mbathy < (k + 1), m_e[k, :, :])
+        # Get the gdept, gdepw and e3 data from the Dst grid at the bdy points
 
-            tmp_w = tmp_w.flatten("F")
-            tmp_t = tmp_t.flatten("F")
-            tmp_e = tmp_e.flatten("F")
+        bdy_i_ch = bdy_ind[grd].bdy_i_ch[c_ind, :]
+        bdy_mbathy = bdy_gather(mbathy, bdy_i_ch)
+        m_w = bdy_gather(
+            np.ma.array(np.squeeze(DstCoord.zgr[grd][c].grid["gdep" + g + "w"])),
+            bdy_i_ch,
+        )
+        m_t = bdy_gather(
+            np.ma.array(np.squeeze(DstCoord.zgr[grd][c].grid["gdep" + grd])), bdy_i_ch
+        )
+        m_e = bdy_gather(
+            np.ma.array(np.squeeze(DstCoord.zgr[grd][c].grid["e3" + grd])), bdy_i_ch
+        )
 
-            bdy_wz[c][k, :] = tmp_w[g_ind]
-            bdy_tz[c][k, :] = tmp_t[g_ind]
-            bdy_e3[c][k, :] = tmp_e[g_ind]
+        # Mask the levels below the bathymetry
+        k = np.arange(1, m_w.shape[0] + 1)[:, np.newaxis]
+        bdy_wz[c] = np.ma.masked_where(bdy_mbathy + 1 < k, m_w).astype(np.float64)
+        bdy_tz[c] = np.ma.masked_where(bdy_mbathy < k, m_t).astype(np.float64)
+        bdy_e3[c] = np.ma.masked_where(bdy_mbathy < k, m_e).astype(np.float64)
 
     return bdy_tz, bdy_wz, bdy_e3
 
@@ -230,21 +221,18 @@ def get_bdy_sc_depths(SourceCoord, DstCoord, bdy_ind, grd):
             continue
         c_ind = bdy_ind[grd].chunk_number == SourceCoord.all_chunk[c]
 
-        source_tree = sp.cKDTree(
-            list(
-                zip(
-                    np.ravel(np.squeeze(SourceCoord.hgr[grd][c].grid["glam" + grd])),
-                    np.ravel(np.squeeze(SourceCoord.hgr[grd][c].grid["gphi" + grd])),
-                )
-            )
+        source_tree = kd_tree(
+            kd_points(
+                np.ravel(np.squeeze(SourceCoord.hgr[grd][c].grid["glam" + grd])),
+                np.ravel(np.squeeze(SourceCoord.hgr[grd][c].grid["gphi" + grd])),
+            ),
+            reuse=True,
         )
-        dst_pts = list(
-            zip(
-                DstCoord.bdy_lonlat[grd]["lon"][c_ind],
-                DstCoord.bdy_lonlat[grd]["lat"][c_ind],
-            )
+        dst_pts = kd_points(
+            DstCoord.bdy_lonlat[grd]["lon"][c_ind],
+            DstCoord.bdy_lonlat[grd]["lat"][c_ind],
         )
-        nn_dist, nn_id = source_tree.query(dst_pts, k=1)
+        nn_dist, nn_id = kd_query(source_tree, dst_pts, k=1)
 
         mbathy = np.float16(SourceCoord.zgr[grd][c].grid["mbathy"].squeeze())
         mbathy[mbathy == 0] = np.NaN
@@ -260,7 +248,7 @@ def get_bdy_sc_depths(SourceCoord, DstCoord, bdy_ind, grd):
         bdy_wz[c] = np.ma.zeros((tmp_w.shape[0], len(nn_id)))
         bdy_tz[c] = np.ma.zeros((tmp_t.shape[0], len(nn_id)))
         bdy_e3[c] = np.ma.zeros((tmp_e.shape[0], len(nn_id)))
-        for k in range(bdy_wz.shape[0]):
+        for k in range(bdy_wz[c].shape[0]):
             bdy_wz[c][k, :] = np.ravel(tmp_w[k, :, :])[nn_id]
             bdy_tz[c][k, :] = np.ravel(tmp_t[k, :, :])[nn_id]
             bdy_e3[c][k, :] = np.ravel(tmp_e[k, :, :])[nn_id]
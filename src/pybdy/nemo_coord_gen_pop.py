@@ -30,6 +30,8 @@ from datetime import datetime
 
 from netCDF4 import Dataset
 
+from .utils.nemo_bdy_lib import bdy_gather
+
 
 class Coord:
     """Class for writing boundayr coordinate data to netcdf file."""
@@ -157,9 +159,7 @@ class Coord:
                     self.logger.debug(
                         "%s %s %s", ind, self.bdy_ind[ind].bdy_i[:, 1], data.shape
                     )
-                    data = data[
-                        (self.bdy_ind[ind].bdy_i[:, 1]), (self.bdy_ind[ind].bdy_i[:, 0])
-                    ]
+                    data = bdy_gather(data, self.bdy_ind[ind].bdy_i)
                 elif len(vardic[ind]) == 1:
                     data = self.bdy_ind[ind].bdy_r[:]
                 else:
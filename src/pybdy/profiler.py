@@ -25,6 +25,7 @@ The main application script for the NRCT.
 # External imports
 import datetime as dt
 import logging
+import os
 import time
 
 import numpy as np
@@ -37,9 +38,11 @@ from pybdy import nemo_bdy_dst_coord as dst_coord
 from pybdy import nemo_bdy_extr_assist as extr_assist
 from pybdy import nemo_bdy_extr_tm3 as extract
 from pybdy import nemo_bdy_gen_c as gen_grid
+from pybdy import nemo_bdy_manifest as bdy_manifest
 from pybdy import nemo_bdy_ncpop as ncpop
 from pybdy import nemo_bdy_setup as setup
 from pybdy import nemo_bdy_source_coord as source_coord
+from pybdy import nemo_bdy_weight_cache as weight_cache
 from pybdy import nemo_bdy_zgrv2 as zgrv
 from pybdy import nemo_coord_gen_pop as coord
 from pybdy import pybdy_settings_editor
@@ -48,6 +51,7 @@ from pybdy.reader import factory
 from pybdy.tide import nemo_bdy_tide3 as tide
 from pybdy.tide import nemo_bdy_tide_ncgen
 from pybdy.utils import Constants
+from pybdy.utils.nemo_bdy_lib import BackgroundTasks, bdy_gather, process_pool
 
 
 class Grid(object):
@@ -66,8 +70,11 @@ class Grid(object):
 logger = logging.getLogger(__name__)
 logging.basicConfig(filename="nrct.log", level=logging.INFO)
 
+# Number of months written in the background at once with ln_async_write
+ASYNC_WRITE_PENDING = 2
 
-def process_bdy(setup_filepath=0, mask_gui=False):
+
+def process_bdy(setup_filepath=0, mask_gui=False, workers=None, resume=False):
     """
     Handle all the calls to generate open boundary conditions for a given regional domain.
 
@@ -83,6 +90,11 @@ def process_bdy(setup_filepath=0, mask_gui=False):
     ----------
         setup_filepath (str) : file path to find namelist.bdy
         mask_gui       (bool): whether use of the GUI is required
+        workers        (int) : None or number of worker processes, overrides
+                               nn_workers in the namelist
+        resume         (bool): skip the months whose output files were
+                               finished by a resumable run with the same
+                               inputs and record the files written
 
     Returns
     -------
@@ -98,6 +110,8 @@ def process_bdy(setup_filepath=0, mask_gui=False):
 
     Setup = setup.Setup(setup_filepath)  # default settings file
     settings = Setup.settings
+    if workers is not None:
+        settings["workers"] = workers
 
     logger.info("Reading setup completed")
 
@@ -105,6 +119,483 @@ def process_bdy(setup_filepath=0, mask_gui=False):
     DstCoord.bdy_msk = bdy_msk == 1
     logger.info("Reading mask completed")
 
+    # Each output file is recorded once written so a later run can resume
+    manifest = None
+    if resume:
+        manifest = bdy_manifest.Manifest(
+            bdy_manifest.get_file(settings), bdy_manifest.get_key(settings, bdy_msk)
+        )
+
+    # Reuse the boundary indices and weights from a previous run if the
+    # grids, mask and settings are unchanged
+    cache_file = None
+    cache = None
+    if settings.get("weight_cache", False):
+        if settings["tide"]:
+            logger.warning("Weight cache is not used when ln_tide is true")
+        else:
+            cache_file = weight_cache.get_file(settings, bdy_msk)
+            cache = weight_cache.load(cache_file)
+
+    if cache is None:
+        bdy_ind = _setup_grids(Setup, bdy_msk, SourceCoord, DstCoord)
+    else:
+        settings["zinterp"] = cache["zinterp"]
+        bdy_ind = {}
+        for grd in ["t", "u", "v"]:
+            bdy_ind[grd] = Grid()
+            bdy_ind[grd].grid_type = grd
+            for name, value in cache["bdy"][grd].items():
+                setattr(bdy_ind[grd], name, value)
+
+        coords_file = settings["dst_dir"] + "/" + settings["coords_file"]
+        if Setup.bool_settings["coords_file"] and not os.path.isfile(coords_file):
+            co_set = coord.Coord(coords_file, bdy_ind)
+            co_set.populate(
+                hgr.H_Grid(settings["dst_hgr"], settings["nme_map"], logger, dst=1)
+            )
+            logger.info("File: coordinates.bdy.nc generated and populated")
+
+    # Set up time information
+
+    t_adj = settings["src_time_adj"]  # any time adjutments?
+    reader = factory.GetReader(
+        settings["src_dir"],
+        t_adj,
+        max_open=settings.get("max_open_files"),
+        date_range=_source_date_range(settings),
+    )
+    for grd in ["t", "u", "v"]:
+        bdy_ind[grd].source_time = reader[grd]
+
+    unit_origin = settings["date_origin"] + " 00:00:00"
+
+    # Extract source data on dst grid
+
+    if settings["tide"]:
+        if (
+            (settings["tide_model"].lower() == "tpxo7p2")
+            or (settings["tide_model"].lower() == "tpxo9v5")
+            or (settings["tide_model"].lower() == "fes2014")
+        ):
+            cons = tide.nemo_bdy_tide_rot(
+                Setup,
+                DstCoord,
+                bdy_ind["t"],
+                bdy_ind["u"],
+                bdy_ind["v"],
+                settings["clname"],
+            )
+        else:
+            logger.error("Tidal model: %s, not recognised", settings["tide_model"])
+            return
+
+        write_tidal_data(Setup, DstCoord, bdy_ind, settings["clname"], cons)
+
+    logger.info("Tidal constituents written to file")
+
+    # Set the year and month range
+
+    st_d = dt.datetime.strptime(settings["date_start"], "%Y-%m-%d")
+    en_d = dt.datetime.strptime(settings["date_end"], "%Y-%m-%d")
+
+    if st_d.year > en_d.year:
+        logging.error(
+            "Please check the nn_year_000 and nn_year_end " + "values in input bdy file"
+        )
+        return
+
+    yrs = list(range(st_d.year, en_d.year + 1))
+
+    if en_d.year - st_d.year >= 1:
+        if en_d.month - st_d.month < 12:
+            logger.info(
+                "Warning: All months will be extracted as the number "
+                + "of years is greater than 1"
+            )
+        mns = list(range(1, 13))
+    else:
+        if en_d.month > 12 or st_d.month < 1:
+            logging.error(
+                "Please check the nn_date_start and nn_date_end "
+                + "month values in input bdy file"
+            )
+            return
+        if en_d.day == 1:
+            mns = list(range(st_d.month, en_d.month))
+        else:
+            mns = list(range(st_d.month, en_d.month + 1))
+
+    # Enter the loop for each year and month extraction
+
+    logger.info("Entering extraction loop")
+
+    ln_dyn2d = settings["dyn2d"]
+    ln_dyn3d = settings["dyn3d"]  # are total or bc velocities required
+    ln_tra = settings["tra"]
+    ln_ice = settings["ice"]
+
+    # Define mapping of variables to grids with a dictionary
+
+    emap = {}
+    grd = ["t", "u", "v"]
+    pair = [None, "uv", "uv"]  # TODO: devolve this to the namelist?
+
+    # TODO: The following is a temporary stop gap to assign variables. In
+    # future we need a slicker way of determining the variables to extract.
+    # Perhaps by scraping the .ncml file - this way biogeochemical tracers
+    # can be included in the ln_tra = .true. option without having to
+    # explicitly declaring them.
+
+    var_in = {}
+    for g in range(len(grd)):
+        var_in[grd[g]] = []
+
+    if ln_tra:
+        var_in["t"].extend(["votemper", "vosaline"])
+
+    if ln_dyn2d or ln_dyn3d:
+        var_in["u"].extend(["vozocrtx", "vomecrty"])
+        var_in["v"].extend(["vozocrtx", "vomecrty"])
+
+    if ln_dyn2d:
+        var_in["t"].extend(["sossheig"])
+
+    if ln_ice:
+        var_in["t"].extend(["ice1", "ice2", "ice3"])
+
+    # As variables are associated with grd there must be a filename attached
+    # to each variable
+
+    for g in range(len(grd)):
+        if len(var_in[grd[g]]) > 0:
+            emap[grd[g]] = {"variables": var_in[grd[g]], "pair": pair[g]}
+
+    # Each grid, year and month is an independent task once the Extract
+    # objects have been set up
+    tasks = []
+    for year in yrs:
+        for month in mns:
+            if (dt.datetime(year, month, 1) < dt.datetime(st_d.year, st_d.month, 1)) | (
+                dt.datetime(year, month, 1) > dt.datetime(en_d.year, en_d.month, 1)
+            ):
+                continue
+            for key in emap:
+                tasks.append((key, year, month))
+
+    if manifest is not None:
+        tasks = _pending_tasks(tasks, manifest, settings)
+        if len(tasks) == 0:
+            logger.info("All months have been written, nothing to resume")
+            logger.info("End NRCT Logging: " + time.asctime())
+            logger.info("==========================================")
+            return
+
+    extract_obj = {}
+
+    # Initialise the mapping indices for each grid
+
+    for key, val in list(emap.items()):
+        if cache is None:
+            extract_obj[key] = extract.Extract(
+                Setup.settings,
+                SourceCoord,
+                DstCoord,
+                bdy_ind,
+                val["variables"],
+                key,
+                val["pair"],
+            )
+        else:
+            extract_obj[key] = extract.Extract.from_weights(
+                Setup.settings,
+                bdy_ind,
+                val["variables"],
+                key,
+                val["pair"],
+                cache["extract"][key],
+            )
+
+    if (cache_file is not None) and (cache is None):
+        cache = {"version": weight_cache.CACHE_VERSION, "zinterp": settings["zinterp"]}
+        cache["bdy"] = {}
+        for grd in ["t", "u", "v"]:
+            cache["bdy"][grd] = {
+                "bdy_i": bdy_ind[grd].bdy_i,
+                "bdy_r": bdy_ind[grd].bdy_r,
+                "chunk_number": bdy_ind[grd].chunk_number,
+                "bdy_i_ch": bdy_ind[grd].bdy_i_ch,
+            }
+        cache["extract"] = {}
+        for key in extract_obj:
+            cache["extract"][key] = extract_obj[key].get_weights()
+        weight_cache.save(cache_file, cache)
+
+    # TODO: Write the nearest neighbour parent grid point to each bdy point
+    #       possibly to the coordinates.bdy.nc file to help with comparison
+    #       plots later.
+
+    _run_tasks(tasks, extract_obj, bdy_ind, unit_origin, settings, manifest)
+
+    logger.info("End NRCT Logging: " + time.asctime())
+    logger.info("==========================================")
+
+
+# Extract objects and settings used by the worker processes, set by
+# _init_task_worker
+_task_state = None
+
+
+def _init_task_worker(state):
+    """Store the Extract objects once in each worker."""
+    global _task_state
+    _task_state = state
+    # Chunks are not split further within a worker
+    state[3]["workers"] = 1
+
+
+def _run_task_worker(task):
+    """Process a grid, year and month task in a worker process."""
+    extract_obj, bdy_ind, unit_origin, settings, manifest = _task_state
+    key, year, month = task
+    _process_month(
+        extract_obj[key],
+        year,
+        month,
+        bdy_ind[key],
+        unit_origin,
+        settings,
+        manifest=manifest,
+    )
+    return task
+
+
+def _pending_tasks(tasks, manifest, settings):
+    """
+    Remove the tasks whose output files are recorded in the manifest.
+
+    Parameters
+    ----------
+        tasks        (list) : (grid, year, month) of each task in order
+        manifest     (obj)  : Manifest of the output files
+        settings     (dict) : settings for bdy
+
+    Returns
+    -------
+        pending      (list) : tasks still to be run
+    """
+    done = manifest.load()
+    pending = []
+    for key, year, month in tasks:
+        f_out = extract.get_out_file(settings, key, year, month)
+        span = bdy_manifest.month_span(settings, year, month)
+        if manifest.is_complete(f_out, span, done):
+            logger.info("Skipping %s, already written", f_out)
+        else:
+            pending.append((key, year, month))
+    logger.info("Resuming with %s of %s tasks still to run", len(pending), len(tasks))
+    return pending
+
+
+def _run_tasks(tasks, extract_obj, bdy_ind, unit_origin, settings, manifest=None):
+    """
+    Extract, interpolate in time and write out each grid, year and month.
+
+    Notes
+    -----
+    With nn_workers > 1 the tasks run concurrently on forked worker
+    processes that each hold a copy of the Extract objects, so the state
+    of one month doesn't leak into another. Each task writes its own
+    output file so the files are the same as a serial run.
+
+    Run serially with ln_async_write each month is written out on a
+    forked process while the next month is extracted. At most
+    ASYNC_WRITE_PENDING months are held waiting to be written and any
+    error in writing is raised once the writes have finished.
+
+    Parameters
+    ----------
+        tasks        (list) : (grid, year, month) of each task in order
+        extract_obj  (dict) : Extract object of each grid
+        bdy_ind      (dict) : Grid object of each grid
+        unit_origin  (str)  : time reference '%d 00:00:00' %date_origin
+        settings     (dict) : settings for bdy
+        manifest     (obj)  : None or Manifest to record the output files in
+
+    Returns
+    -------
+        None
+    """
+    workers = settings.get("workers", 1)
+    parallel = (workers > 1) and (len(tasks) > 1)
+    if parallel and not _fork_safe(extract_obj, settings):
+        logger.warning(
+            "Source reader cannot be shared with worker processes, "
+            + "processing months serially"
+        )
+        parallel = False
+
+    if not parallel:
+        async_write = settings.get("async_write", False) and not settings.get(
+            "stream_write", False
+        )
+        if async_write and not _fork_safe(extract_obj, settings):
+            logger.warning(
+                "Source reader cannot be shared with a writer process, "
+                + "writing months in turn"
+            )
+            async_write = False
+        if not async_write:
+            for key, year, month in tasks:
+                _process_month(
+                    extract_obj[key],
+                    year,
+                    month,
+                    bdy_ind[key],
+                    unit_origin,
+                    settings,
+                    manifest=manifest,
+                )
+            return
+
+        with BackgroundTasks(ASYNC_WRITE_PENDING) as writer:
+            for key, year, month in tasks:
+                _process_month(
+                    extract_obj[key],
+                    year,
+                    month,
+                    bdy_ind[key],
+                    unit_origin,
+                    settings,
+                    writer,
+                    manifest,
+                )
+        return
+
+    logger.info("Processing %s tasks on %s workers", len(tasks), workers)
+    state = (extract_obj, bdy_ind, unit_origin, settings, manifest)
+    with process_pool(workers, _init_task_worker, (state,)) as pool:
+        for key, year, month in pool.map(_run_task_worker, tasks):
+            logger.info("Finished grid %s year %s month %s", key, year, month)
+
+
+def _process_month(
+    extract_obj, year, month, ind, unit_origin, settings, writer=None, manifest=None
+):
+    """
+    Extract, interpolate in time and write out one grid for one month.
+
+    Parameters
+    ----------
+        extract_obj  (obj)  : Extract object of the grid
+        year         (int)  : year to process
+        month        (int)  : month to process
+        ind          (obj)  : Grid object of the grid
+        unit_origin  (str)  : time reference '%d 00:00:00' %date_origin
+        settings     (dict) : settings for bdy
+        writer       (obj)  : BackgroundTasks to write out on, None to
+                              write out before returning
+        manifest     (obj)  : None or Manifest to record the output file in
+
+    Returns
+    -------
+        None
+    """
+    if settings.get("stream_write", False):
+        # Write each time slice as soon as it is ready
+        extract_obj.stream_month(year, month, ind, unit_origin)
+        _record_month(extract_obj, year, month, manifest)
+        return
+
+    # Extract the data for a given month and year
+    extract_obj.extract_month(year, month)
+
+    # Interpolate/stretch in time if time frequecy is not a factor
+    # of a month and/or parent:child calendars differ
+    if settings.get("time_interpolation", True):
+        logger.info("Applying temporal interpolation from parent to child.")
+        extract_obj.time_interp(year, month)
+    else:
+        logger.info("Temporal interpolation not applied.")
+
+    # Finally write to file
+    if writer is None:
+        _write_month(extract_obj, year, month, ind, unit_origin, manifest)
+    else:
+        writer.submit(
+            _write_month, extract_obj, year, month, ind, unit_origin, manifest
+        )
+
+
+def _write_month(extract_obj, year, month, ind, unit_origin, manifest):
+    """Write out one grid for one month and record the file."""
+    extract_obj.write_out(year, month, ind, unit_origin)
+    _record_month(extract_obj, year, month, manifest)
+
+
+def _record_month(extract_obj, year, month, manifest):
+    """Record the finished output file of a grid for a month."""
+    if manifest is not None:
+        settings = extract_obj.settings
+        manifest.record(
+            extract.get_out_file(settings, extract_obj.g_type, year, month),
+            bdy_manifest.month_span(settings, year, month),
+        )
+
+
+def _source_date_range(settings):
+    """
+    Return the range of dates covered by the months to extract.
+
+    Parameters
+    ----------
+    settings (dict) : settings for bdy
+
+    Returns
+    -------
+    start (datetime) : start of the first month
+    end   (datetime) : start of the month after the last month
+    """
+    st_d = dt.datetime.strptime(settings["date_start"], "%Y-%m-%d")
+    en_d = dt.datetime.strptime(settings["date_end"], "%Y-%m-%d")
+    if en_d.year > st_d.year:
+        # All the months of each year are extracted
+        return dt.datetime(st_d.year, 1, 1), dt.datetime(en_d.year + 1, 1, 1)
+    start = dt.datetime(st_d.year, st_d.month, 1)
+    if en_d.month == 12:
+        return start, dt.datetime(en_d.year + 1, 1, 1)
+    return start, dt.datetime(en_d.year, en_d.month + 1, 1)
+
+
+def _fork_safe(extract_obj, settings):
+    """Check the source data can be read from forked workers."""
+    for key in extract_obj:
+        sources = [extract_obj[key].sc_time]
+        if extract_obj[key].key_vec:
+            sources.append(extract_obj[key].fnames_2)
+        for sc_time in sources:
+            if not getattr(sc_time, "fork_safe", False):
+                return False
+    return True
+
+
+def _setup_grids(Setup, bdy_msk, SourceCoord, DstCoord):
+    """
+    Generate the boundary indices and gather the grid information for each chunk.
+
+    Parameters
+    ----------
+        Setup       (list)       : settings for bdy
+        bdy_msk     (numpy.array): a mask array of the regional domain
+        SourceCoord (obj)        : source grid information, filled in place
+        DstCoord    (obj)        : destination grid information, filled in place
+
+    Returns
+    -------
+        bdy_ind     (dict)       : boundary information for grid type 't', 'u', 'v'
+    """
+    settings = Setup.settings
+
     bdy_ind = {}  # define a dictionary to hold the grid information
 
     for grd in ["t", "u", "v"]:
@@ -152,14 +643,10 @@ def process_bdy(setup_filepath=0, mask_gui=False):
 
     for grd in ["t", "u", "v"]:
         for geo_crd in ["lon", "lat"]:
-            DstCoord.bdy_lonlat[grd][geo_crd] = np.zeros(nbdy[grd])
-
-    for grd in ["t", "u", "v"]:
-        for i in range(nbdy[grd]):
-            x = bdy_ind[grd].bdy_i[i, 1]
-            y = bdy_ind[grd].bdy_i[i, 0]
-            DstCoord.bdy_lonlat[grd]["lon"][i] = DstCoord.lonlat[grd]["lon"][x, y]
-            DstCoord.bdy_lonlat[grd]["lat"][i] = DstCoord.lonlat[grd]["lat"][x, y]
+            DstCoord.bdy_lonlat[grd][geo_crd] = np.array(
+                bdy_gather(DstCoord.lonlat[grd][geo_crd], bdy_ind[grd].bdy_i),
+                dtype=np.float64,
+            )
 
         DstCoord.lonlat[grd]["lon"][DstCoord.lonlat[grd]["lon"] > 180] -= 360
 
@@ -187,6 +674,8 @@ def process_bdy(setup_filepath=0, mask_gui=False):
     SourceCoord.zgr = {}
 
     logger.info("Gathering vertical grid information")
+    dst_zgr = zgr.ZGridLoader(settings["dst_zgr"], settings["nme_map"], dst=1)
+    sc_zgr = zgr.ZGridLoader(settings["src_zgr"], settings["nme_map"], dst=0)
     for grd in ["t", "u", "v"]:
         bdy_ind[grd].bdy_i_ch = np.zeros_like(bdy_ind[grd].bdy_i)
         all_chunk = np.unique(bdy_ind[grd].chunk_number)
@@ -259,6 +748,7 @@ def process_bdy(setup_filepath=0, mask_gui=False):
                 grd,
                 chunk_sub_dst,
                 dst=1,
+                loader=dst_zgr,
             )
 
             SourceCoord.zgr[grd][c] = zgr.Z_Grid(
@@ -270,8 +760,11 @@ def process_bdy(setup_filepath=0, mask_gui=False):
                 grd,
                 chunk_sub_sc,
                 dst=0,
+                loader=sc_zgr,
             )
 
+    dst_zgr.close()
+    sc_zgr.close()
     logger.info("Reading grid completed")
     DstCoord.all_chunk = all_chunk_grd
     SourceCoord.all_chunk = all_chunk_grd
@@ -319,158 +812,7 @@ def process_bdy(setup_filepath=0, mask_gui=False):
             DstCoord.depths[grd]["bdy_z"] = tmp_tz
         logger.info("Depths defined with destination equal to source levels")
 
-    # Set up time information
-
-    t_adj = settings["src_time_adj"]  # any time adjutments?
-    reader = factory.GetReader(settings["src_dir"], t_adj)
-    for grd in ["t", "u", "v"]:
-        bdy_ind[grd].source_time = reader[grd]
-
-    unit_origin = settings["date_origin"] + " 00:00:00"
-
-    # Extract source data on dst grid
-
-    if settings["tide"]:
-        if (
-            (settings["tide_model"].lower() == "tpxo7p2")
-            or (settings["tide_model"].lower() == "tpxo9v5")
-            or (settings["tide_model"].lower() == "fes2014")
-        ):
-            cons = tide.nemo_bdy_tide_rot(
-                Setup,
-                DstCoord,
-                bdy_ind["t"],
-                bdy_ind["u"],
-                bdy_ind["v"],
-                settings["clname"],
-            )
-        else:
-            logger.error("Tidal model: %s, not recognised", settings["tide_model"])
-            return
-
-        write_tidal_data(Setup, DstCoord, bdy_ind, settings["clname"], cons)
-
-    logger.info("Tidal constituents written to file")
-
-    # Set the year and month range
-
-    st_d = dt.datetime.strptime(settings["date_start"], "%Y-%m-%d")
-    en_d = dt.datetime.strptime(settings["date_end"], "%Y-%m-%d")
-
-    if st_d.year > en_d.year:
-        logging.error(
-            "Please check the nn_year_000 and nn_year_end " + "values in input bdy file"
-        )
-        return
-
-    yrs = list(range(st_d.year, en_d.year + 1))
-
-    if en_d.year - st_d.year >= 1:
-        if en_d.month - st_d.month < 12:
-            logger.info(
-                "Warning: All months will be extracted as the number "
-                + "of years is greater than 1"
-            )
-        mns = list(range(1, 13))
-    else:
-        if en_d.month > 12 or st_d.month < 1:
-            logging.error(
-                "Please check the nn_date_start and nn_date_end "
-                + "month values in input bdy file"
-            )
-            return
-        if en_d.day == 1:
-            mns = list(range(st_d.month, en_d.month))
-        else:
-            mns = list(range(st_d.month, en_d.month + 1))
-
-    # Enter the loop for each year and month extraction
-
-    logger.info("Entering extraction loop")
-
-    ln_dyn2d = settings["dyn2d"]
-    ln_dyn3d = settings["dyn3d"]  # are total or bc velocities required
-    ln_tra = settings["tra"]
-    ln_ice = settings["ice"]
-
-    # Define mapping of variables to grids with a dictionary
-
-    emap = {}
-    grd = ["t", "u", "v"]
-    pair = [None, "uv", "uv"]  # TODO: devolve this to the namelist?
-
-    # TODO: The following is a temporary stop gap to assign variables. In
-    # future we need a slicker way of determining the variables to extract.
-    # Perhaps by scraping the .ncml file - this way biogeochemical tracers
-    # can be included in the ln_tra = .true. option without having to
-    # explicitly declaring them.
-
-    var_in = {}
-    for g in range(len(grd)):
-        var_in[grd[g]] = []
-
-    if ln_tra:
-        var_in["t"].extend(["votemper", "vosaline"])
-
-    if ln_dyn2d or ln_dyn3d:
-        var_in["u"].extend(["vozocrtx", "vomecrty"])
-        var_in["v"].extend(["vozocrtx", "vomecrty"])
-
-    if ln_dyn2d:
-        var_in["t"].extend(["sossheig"])
-
-    if ln_ice:
-        var_in["t"].extend(["ice1", "ice2", "ice3"])
-
-    # As variables are associated with grd there must be a filename attached
-    # to each variable
-
-    for g in range(len(grd)):
-        if len(var_in[grd[g]]) > 0:
-            emap[grd[g]] = {"variables": var_in[grd[g]], "pair": pair[g]}
-
-    extract_obj = {}
-
-    # Initialise the mapping indices for each grid
-
-    for key, val in list(emap.items()):
-        extract_obj[key] = extract.Extract(
-            Setup.settings,
-            SourceCoord,
-            DstCoord,
-            bdy_ind,
-            val["variables"],
-            key,
-            val["pair"],
-        )
-
-    # TODO: Write the nearest neighbour parent grid point to each bdy point
-    #       possibly to the coordinates.bdy.nc file to help with comparison
-    #       plots later.
-
-    for year in yrs:
-        for month in mns:
-            if (dt.datetime(year, month, 1) < dt.datetime(st_d.year, st_d.month, 1)) | (
-                dt.datetime(year, month, 1) > dt.datetime(en_d.year, en_d.month, 1)
-            ):
-                continue
-            for key, val in list(emap.items()):
-                # Extract the data for a given month and year
-                extract_obj[key].extract_month(year, month)
-
-                # Interpolate/stretch in time if time frequecy is not a factor
-                # of a month and/or parent:child calendars differ
-                if settings.get("time_interpolation", True):
-                    logger.info("Applying temporal interpolation from parent to child.")
-                    extract_obj[key].time_interp(year, month)
-                else:
-                    logger.info("Temporal interpolation not applied.")
-
-                # Finally write to file
-                extract_obj[key].write_out(year, month, bdy_ind[key], unit_origin)
-
-    logger.info("End NRCT Logging: " + time.asctime())
-    logger.info("==========================================")
+    return bdy_ind
 
 
 def write_tidal_data(setup_var, dst_coord_var, grid, tide_cons, cons):
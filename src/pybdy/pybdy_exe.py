@@ -29,6 +29,8 @@ from . import profiler
 # Logging set to info
 logging.basicConfig(level=logging.INFO)
 
+USAGE = "usage: pybdy [-g] [-w <workers>] [-r] -s <namelist.bdy> "
+
 
 def main():
     """
@@ -38,37 +40,59 @@ def main():
     """
     setup_file = ""
     mask_gui = False
+    workers = None
+    resume = False
     try:
         opts, dummy_args = getopt.getopt(
-            sys.argv[1:], "hs:g", ["help", "setup=", "mask_gui"]
+            sys.argv[1:],
+            "hs:gw:r",
+            ["help", "setup=", "mask_gui", "workers=", "resume"],
         )
     except getopt.GetoptError:
-        print("usage: pybdy -s <namelist.bdy> ")
+        print(USAGE)
         sys.exit(2)
 
     for opt, arg in opts:
         if opt == "-h":
-            print("usage: pybdy [-g] -s <namelist.bdy> ")
+            print(USAGE)
             print(
                 "       -g (optional) will open settings editor before extracting the data"
             )
+            print(
+                "       -w <workers> (optional) number of processes, overrides nn_workers"
+            )
+            print("       -r (optional) resume, skipping the months already written")
             print("       -s <bdy filename> file to use")
             sys.exit()
         elif opt in ("-s", "--setup"):
             setup_file = arg
         elif opt in ("-g", "--mask_gui"):
             mask_gui = True
+        elif opt in ("-w", "--workers"):
+            try:
+                workers = int(arg)
+            except ValueError:
+                print("-w <workers> must be an integer")
+                sys.exit(2)
+        elif opt in ("-r", "--resume"):
+            resume = True
 
     if setup_file == "":
-        print("usage: pybdy [-g] -s <namelist.bdy> ")
+        print(USAGE)
         sys.exit(2)
 
     # Logger
     # logger = logging.getLogger(__name__)
     t0 = time.time()
     cProfile.runctx(
-        "f(x, y)",
-        {"f": profiler.process_bdy, "x": setup_file, "y": mask_gui},
+        "f(x, y, z, r)",
+        {
+            "f": profiler.process_bdy,
+            "x": setup_file,
+            "y": mask_gui,
+            "z": workers,
+            "r": resume,
+        },
         {},
         "pybdy_stats",
     )
@@ -0,0 +1,76 @@
+# ===================================================================
+# Copyright 2025 National Oceanography Centre
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# ===================================================================
+
+"""
+Created on Sun Oct 18 17:45:00 2026.
+
+Entry to crop the tide model atlas to the destination domain ahead of
+tidal runs.
+"""
+
+import getopt
+import logging
+import sys
+
+from grid import hgr
+from pybdy import nemo_bdy_setup as setup
+from pybdy.tide import nemo_bdy_tide_cache as tide_cache
+
+# Logging set to info
+logging.basicConfig(level=logging.INFO)
+
+
+def main():
+    """
+    Run main function.
+
+    Reads the namelist and writes the tide cache of its domain to the output
+    directory. An existing cache of the domain is replaced.
+    """
+    setup_file = ""
+    try:
+        opts, dummy_args = getopt.getopt(sys.argv[1:], "hs:", ["help", "setup="])
+    except getopt.GetoptError:
+        print("usage: pybdy_tide_cache -s <namelist.bdy> ")
+        sys.exit(2)
+
+    for opt, arg in opts:
+        if opt in ("-h", "--help"):
+            print("usage: pybdy_tide_cache -s <namelist.bdy> ")
+            print("       -s <bdy filename> file to use")
+            sys.exit()
+        elif opt in ("-s", "--setup"):
+            setup_file = arg
+
+    if setup_file == "":
+        print("usage: pybdy_tide_cache -s <namelist.bdy> ")
+        sys.exit(2)
+
+    logger = logging.getLogger(__name__)
+    settings = setup.Setup(setup_file).settings
+    dst_hgr = hgr.H_Grid(settings["dst_hgr"], settings["nme_map"], logger, dst=1)
+    lonlat = {}
+    for grd in ["t", "u", "v"]:
+        lonlat[grd] = {
+            "lon": dst_hgr.grid["glam" + grd],
+            "lat": dst_hgr.grid["gphi" + grd],
+        }
+    lon, lat = tide_cache.domain_points(lonlat)
+    dirname = tide_cache.get_dir(settings, lon, lat)
+    tide_cache.build(settings, lon, lat, dirname)
+    print("Tide cache: %s" % dirname)
+
+
+if __name__ == "__main__":
+    main()
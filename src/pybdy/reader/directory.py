@@ -18,14 +18,93 @@ Abstraction for the data repository.
 
 @author: Mr. Srikanth Nagella.
 """
-import copy
+import json
 import logging
+import os
+import threading
+from collections import OrderedDict
 from os import listdir
 
 import numpy as np
-from cftime import utime
+from cftime import datetime, utime
 from netCDF4 import Dataset
 
+# Default maximum number of source files held open at once
+MAX_OPEN_FILES = 64
+
+# Name of the time index kept in the source directory
+INDEX_FILE = ".pybdy_time_index.json"
+
+# Increase if the contents of the time index change
+INDEX_VERSION = 1
+
+
+class DatasetPool(object):
+    """
+    Least recently used pool of open netCDF datasets.
+
+    Opening a file is slow on parallel file systems, so the files read by
+    the directory reader are kept open and reused until more than
+    max_open are needed, when the least recently used file is closed.
+    The pool belongs to one process, a worker process started by fork
+    drops the datasets it inherits and opens its own.
+    """
+
+    def __init__(self, max_open=MAX_OPEN_FILES, mask_and_scale=True):
+        """
+        Create an empty pool.
+
+        Parameters
+        ----------
+        max_open        (int) : maximum number of files held open
+        mask_and_scale (bool) : False to read the raw values of the variables
+        """
+        self.max_open = max_open
+        self.mask_and_scale = mask_and_scale
+        self._datasets = OrderedDict()
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def get(self, filename):
+        """
+        Return the open dataset of a file, opening it if needed.
+
+        Parameters
+        ----------
+        filename (str) : path of the netCDF file
+
+        Returns
+        -------
+        dataset  (obj) : netCDF4 Dataset open for reading
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                # Handles inherited from the parent process are not shared
+                self._datasets = OrderedDict()
+                self._pid = os.getpid()
+            if filename in self._datasets:
+                self._datasets.move_to_end(filename)
+                return self._datasets[filename]
+            dataset = Dataset(filename, "r")
+            if not self.mask_and_scale:
+                dataset.set_auto_maskandscale(False)
+            self._datasets[filename] = dataset
+            while len(self._datasets) > max(self.max_open, 1):
+                self._datasets.popitem(last=False)[1].close()
+            return dataset
+
+    def close(self):
+        """Close all the open datasets."""
+        with self._lock:
+            if self._pid == os.getpid():
+                for dataset in self._datasets.values():
+                    dataset.close()
+            self._datasets = OrderedDict()
+
+
+# Pool shared by all the grids and variables of the directory readers
+dataset_pool = DatasetPool()
+
 
 class Reader(object):
     """
@@ -39,27 +118,48 @@ class Reader(object):
 
     grid_type_list = ["t", "u", "v", "i"]
 
-    def __init__(self, directory, time_adjust):
+    def __init__(self, directory, time_adjust, max_open=None, date_range=None):
         """
         Take in directory path as input and return the required information to the bdy.
 
+        Notes
+        -----
+        The times in each file are kept in an index file in the directory
+        so later runs only open the files that are new or have changed.
+
         Parameters
         ----------
         directory   : The directory in which to look for the files
         time_adjust : amount of time to be adjusted to the time read from file.
+        max_open    : maximum number of source files held open, None to keep
+                      the current limit
+        date_range  : (start, end) datetimes, only the files with times in
+                      this range and the files either side are used. None to
+                      use all the files.
 
         Returns
         -------
         None        : object
         """
+        # Start from no open files in case the files have changed since an
+        # earlier reader
+        dataset_pool.close()
+        if max_open is not None:
+            dataset_pool.max_open = max_open
+        self.logger = logging.getLogger(__name__)
         self.directory = directory
+        self.date_range = date_range
         self.day_interval = 1
         self.hr_interval = 0
         self.grid_source_data = {}
+        self.time_index = self.load_time_index()
+        self.index_changed = False
+        self.index_files = set()
         for grid_type in self.grid_type_list:
             self.grid_source_data[grid_type] = self.get_source_timedata(
                 grid_type, time_adjust
             )
+        self.save_time_index()
         if self.grid_type_list is not None and len(self.grid_source_data) != 0:
             self.calculate_time_interval()
 
@@ -94,6 +194,125 @@ class Reader(object):
         hrs = hrs / (60 * 60)
         return days, hrs
 
+    def load_time_index(self):
+        """
+        Read the time index of the directory.
+
+        Returns
+        -------
+        index (dict) : times of each file keyed by file name, empty if
+                       there is no usable index
+        """
+        filename = os.path.join(self.directory, INDEX_FILE)
+        if not os.path.isfile(filename):
+            return {}
+        try:
+            with open(filename) as f:
+                index = json.load(f)
+        except (OSError, ValueError) as err:
+            self.logger.warning("Ignoring unreadable time index %s: %s", filename, err)
+            return {}
+        if index.get("version") != INDEX_VERSION:
+            return {}
+        return index["files"]
+
+    def save_time_index(self):
+        """Write the time index of the directory if it has changed."""
+        stale = set(self.time_index) - self.index_files
+        if not (self.index_changed or stale):
+            return
+        for name in stale:
+            del self.time_index[name]
+        filename = os.path.join(self.directory, INDEX_FILE)
+        tmp_file = filename + ".tmp%s" % os.getpid()
+        try:
+            with open(tmp_file, "w") as f:
+                json.dump({"version": INDEX_VERSION, "files": self.time_index}, f)
+            os.replace(tmp_file, filename)
+        except OSError as err:
+            # Read only source data, the times are read again next run
+            self.logger.warning("Cannot write time index %s: %s", filename, err)
+
+    def get_file_times(self, filename):
+        """
+        Return the times in a file, from the index if the file is unchanged.
+
+        Parameters
+        ----------
+        filename (str) : path of the source file
+
+        Returns
+        -------
+        entry   (dict) : units, calendar and raw times of the file
+        """
+        name = os.path.basename(filename)
+        stat = os.stat(filename)
+        self.index_files.add(name)
+        entry = self.time_index.get(name)
+        if (
+            entry is None
+            or entry["mtime"] != stat.st_mtime_ns
+            or entry["size"] != stat.st_size
+        ):
+            nc = dataset_pool.get(filename)
+            varid = nc.variables["time_counter"]
+            entry = {
+                "mtime": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "units": varid.units,
+                "calendar": varid.calendar,
+                "time": np.ma.getdata(varid[:]).astype(float).tolist(),
+            }
+            self.time_index[name] = entry
+            self.index_changed = True
+        return entry
+
+    def select_files(self, dir_list, entries, t_adjust):
+        """
+        Select the files that overlap the date range.
+
+        Parameters
+        ----------
+        dir_list  (list) : sorted list of files
+        entries   (list) : times of each file from get_file_times
+        t_adjust (float) : amount of time added to the times in the files
+
+        Returns
+        -------
+        keep      (list) : True for the files to use
+        """
+        keep = [True] * len(dir_list)
+        if self.date_range is None or not dir_list:
+            return keep
+        start, end = [
+            datetime(d.year, d.month, d.day, d.hour, d.minute, d.second)
+            for d in self.date_range
+        ]
+        overlap = []
+        for entry in entries:
+            if not entry["time"]:
+                overlap.append(False)
+                continue
+            cal = utime(entry["units"], entry["calendar"])
+            t_start = cal.date2num(start) - t_adjust
+            t_end = cal.date2num(end) - t_adjust
+            overlap.append(
+                (entry["time"][0] <= t_end) and (entry["time"][-1] >= t_start)
+            )
+        ind = np.flatnonzero(overlap)
+        if not len(ind):
+            self.logger.warning(
+                "No source files in %s between %s and %s, using all of them",
+                self.directory,
+                start,
+                end,
+            )
+            return keep
+        # Include the files either side for the time interpolation
+        first = max(ind[0] - 1, 0)
+        last = min(ind[-1] + 1, len(dir_list) - 1)
+        return [first <= i <= last for i in range(len(dir_list))]
+
     def get_source_timedata(self, grid, t_adjust):
         """
         Get the source time data information.
@@ -103,30 +322,24 @@ class Reader(object):
         Builds up sourcedata objects of a given grid.
         """
         dir_list = self.get_dir_list(grid)
+        entries = [self.get_file_times(filename) for filename in dir_list]
+        keep = self.select_files(dir_list, entries, t_adjust)
         group = GridGroup()
         group.data_list = []
         group.time_counter = []
         group.date_counter = []
-        for filename in dir_list:
-            nc = Dataset(filename, "r")
-            varid = nc.variables["time_counter"]
-            for index in range(0, len(varid)):
-                x = [filename, index]
-                group.data_list.append(x)
-                group.time_counter.append(varid[index] + t_adjust)
-                group.date_counter.append(
-                    utime(varid.units, varid.calendar).num2date(varid[index] + t_adjust)
+        for filename, entry, use in zip(dir_list, entries, keep):
+            if not use:
+                continue
+            time = np.array(entry["time"]) + t_adjust
+            group.data_list.extend([[filename, index] for index in range(len(time))])
+            group.time_counter.extend(time.tolist())
+            if len(time):
+                group.date_counter.extend(
+                    utime(entry["units"], entry["calendar"]).num2date(time).tolist()
                 )
-            group.units = varid.units
-            group.calendar = varid.calendar
-            nc.close()
-        tmp_data_list = copy.deepcopy(group.data_list)
-        tmp_time_counter = copy.deepcopy(group.time_counter)
-        for index in range(len(group.time_counter)):
-            tmp_data_list[index] = group.data_list[index]
-            tmp_time_counter[index] = group.time_counter[index]
-        group.data_list = tmp_data_list
-        group.time_counter = tmp_time_counter
+            group.units = entry["units"]
+            group.calendar = entry["calendar"]
         return group
 
     def calculate_time_interval(self):
@@ -158,6 +371,9 @@ class Reader(object):
 
 
 class GridGroup:
+    # Open files are held per process so can be used from worker processes
+    fork_safe = True
+
     def __init__(self):
         pass
 
@@ -194,11 +410,11 @@ class Variable(object):
     time_counter_const = "time_counter"
 
     def __init__(self, filenames, variable):
+        self.logger = logging.getLogger(__name__)
         self.variable = variable
         self.file_names = filenames
         self.dimensions = self.get_dimensions()
         self.set_time_dimension_index()
-        self.logger = logging.getLogger(__name__)
 
     def __str__(self):
         return (
@@ -209,11 +425,9 @@ class Variable(object):
     def __len__(self):
         """Return the length of the variable."""
         try:
-            dataset = Dataset(self.file_names[0], "r")
+            dataset = dataset_pool.get(self.file_names[0][0])
             dvar = dataset.variables[self.variable]
-            val = len(dvar)
-            dataset.close()
-            return val
+            return len(dvar)
         except KeyError:
             self.logger.error("Cannot find the requested variable " + self.variable)
         except (IOError, RuntimeError):
@@ -224,11 +438,9 @@ class Variable(object):
         """Return the data requested."""
         try:
             if self.time_dim_index == -1:
-                dataset = Dataset(self.file_names[0][0], "r")
+                dataset = dataset_pool.get(self.file_names[0][0])
                 dvar = dataset.variables[self.variable]
-                retval = dvar[val]
-                dataset.close()
-                return retval
+                return dvar[val]
             else:
                 # select all the files that are required for the selected range
                 # read the data and merge them
@@ -247,24 +459,30 @@ class Variable(object):
                     start = 0
                 if stop is None:
                     stop = len(self.file_names)
-                finalval = None
+                # group consecutive time entries of the same file so each
+                # file is read once
+                groups = []
                 for index in range(start, stop, step):
-                    dataset = Dataset(self.file_names[index][0], "r")
+                    fname, t_ind = self.file_names[index]
+                    if (
+                        groups
+                        and groups[-1][0] == fname
+                        and groups[-1][2] == t_ind - step
+                    ):
+                        groups[-1][2] = t_ind
+                    else:
+                        groups.append([fname, t_ind, t_ind])
+                retvals = []
+                for fname, t_start, t_end in groups:
+                    dataset = dataset_pool.get(fname)
                     val = list(val)
-                    val[self.time_dim_index] = slice(
-                        self.file_names[index][1], self.file_names[index][1] + 1
-                    )
+                    val[self.time_dim_index] = slice(t_start, t_end + 1, step)
                     val = tuple(val)
                     dvar = dataset.variables[self.variable]
-                    retval = dvar[val]
-                    if finalval is None:
-                        finalval = retval
-                    else:
-                        finalval = np.concatenate(
-                            (finalval, retval), axis=self.time_dim_index
-                        )
-                    dataset.close()
-                return finalval
+                    retvals.append(dvar[val])
+                if len(retvals) == 1:
+                    return retvals[0]
+                return np.concatenate(retvals, axis=self.time_dim_index)
 
         except KeyError:
             self.logger.error("Cannot find the requested variable " + self.variable)
@@ -275,7 +493,7 @@ class Variable(object):
     def get_attribute_values(self, attr_name):
         """Return the attribute value of the variable."""
         try:
-            dataset = Dataset(self.file_names[0][0], "r")
+            dataset = dataset_pool.get(self.file_names[0][0])
             dvar = dataset.variables[self.variable]
             ret_val = {}
             for name in attr_name:
@@ -284,7 +502,6 @@ class Variable(object):
                     ret_val[name] = val
                 except AttributeError:
                     ret_val[name] = None
-            dataset.close()
             return ret_val
         except KeyError:
             self.logger.error("Cannot find the requested variable " + self.variable)
@@ -295,7 +512,7 @@ class Variable(object):
     def get_dimensions(self):
         """Return the dimensions of the variables."""
         try:
-            dataset = Dataset(self.file_names[0][0], "r")
+            dataset = dataset_pool.get(self.file_names[0][0])
             dvar = dataset.variables[self.variable]
             return dvar.dimensions
         except KeyError:
@@ -304,6 +521,23 @@ class Variable(object):
             self.logger.error("Cannot open the file " + self.file_names[0])
         return None
 
+    def _get_dtype(self):
+        """Return the type of the data read, after any scale factor and offset."""
+        try:
+            dataset = dataset_pool.get(self.file_names[0][0])
+            dvar = dataset.variables[self.variable]
+            dtypes = [dvar.dtype]
+            if dataset_pool.mask_and_scale:
+                for name in ["scale_factor", "add_offset"]:
+                    if name in dvar.ncattrs():
+                        dtypes.append(np.asarray(dvar.getncattr(name)).dtype)
+            return np.result_type(*dtypes)
+        except KeyError:
+            self.logger.error("Cannot find the requested variable " + self.variable)
+        except (IOError, RuntimeError):
+            self.logger.error("Cannot open the file " + self.file_names[0])
+        return None
+
     def set_time_dimension_index(self):
         """Set the time dimension index."""
         self.time_dim_index = -1
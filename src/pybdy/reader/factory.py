@@ -31,7 +31,7 @@ from pybdy.reader.ncml import NcMLFile
 from pybdy.reader.ncml import Reader as NcMLReader
 
 
-def GetReader(uri, t_adjust, reader_type=None):
+def GetReader(uri, t_adjust, reader_type=None, max_open=None, date_range=None):
     if reader_type is None:
         print(uri)
         if uri.endswith(".ncml"):
@@ -42,9 +42,9 @@ def GetReader(uri, t_adjust, reader_type=None):
             print("Error input should be a NcML file or URL or a Local directory")
             return None
     if reader_type == "NcML":
-        return NcMLReader(uri, t_adjust)
+        return NcMLReader(uri, t_adjust, max_open)
     else:
-        return DirectoryReader(uri, t_adjust)
+        return DirectoryReader(uri, t_adjust, max_open, date_range)
 
 
 class NetCDFFile(object):
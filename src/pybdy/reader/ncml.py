@@ -14,55 +14,36 @@
 
 
 """
-NcML reading implementation using pyjnius.
+NcML reading implementation using netCDF4.
+
+The part of NcML used by pyBDY is interpreted here: union and
+joinExisting aggregations of files listed with netcdf or scan elements,
+variable and dimension renames and variable attributes. The variables
+are read with netCDF4 without scaling or masking, the scale factor and
+offset are applied by the caller.
 
 @author: Mr. Srikanth Nagella.
 """
-# Loading of NCML jar file
 import logging
 import os
-import string
+import re
+import xml.etree.ElementTree as ET
+from urllib.parse import urljoin
+from urllib.request import urlopen
 
-import jnius_config
 import numpy as np
 from cftime import utime
 
-ncmlpath, file_name = os.path.split(__file__)
-ncmlpath = os.path.join(ncmlpath, "jars", "netcdfAll-4.6.jar")
-jnius_config.set_classpath(".", ncmlpath)
-try:
-    if os.environ["http_proxy"] is not None:
-        # split the proxy name and port
-        proxylist = string.split(os.environ["http_proxy"], ":")
-        proxy_host = proxylist[0]
-        proxy_port = proxylist[1]
-        jnius_config.add_options(
-            "-Dhttp.proxyHost=" + proxy_host, "-Dhttp.proxyPort=" + proxy_port
-        )
-except Exception:
-    print("Didn't find a proxy environment variable")
-NetcdfDataset = None
-NcMLReader = None
-Section = None
-try:
-    from jnius import autoclass
-
-    def init_jnius():
-        global NetcdfDataset
-        global NcMLReader
-        global Section
-        NetcdfDataset = autoclass("ucar.nc2.dataset.NetcdfDataset")
-        NcMLReader = autoclass("ucar.nc2.ncml.NcMLReader")
-        Section = autoclass("ucar.ma2.Section")
-
-    init_jnius()
-except ImportError:
-    print(
-        "Warning: Please make sure pyjnius is installed and jvm.dll/libjvm.so/libjvm.dylib is in the path"
-    )
+from pybdy.reader.directory import DatasetPool
 
 time_counter_const = "time_counter"
 
+# Namespace of the NcML elements
+NCML_NS = "{http://www.unidata.ucar.edu/namespaces/netcdf/ncml-2.2}"
+
+# Open files shared by the NcML readers, values are read unscaled
+dataset_pool = DatasetPool(mask_and_scale=False)
+
 
 class Reader(object):
     """
@@ -77,21 +58,29 @@ class Reader(object):
     grid_type_list = ["t", "u", "v", "i"]
     time_counter = time_counter_const
 
-    def __init__(self, uri, time_adjust):
+    def __init__(self, uri, time_adjust, max_open=None):
+        """
+        Read the NcML file and the times of the source data.
+
+        Parameters
+        ----------
+        uri         : path or url of the NcML file
+        time_adjust : amount of time to be adjusted to the time read from file.
+        max_open    : maximum number of source files held open, None to keep
+                      the current limit
+        """
+        self.logger = logging.getLogger(__name__)
         self.uri = uri
         self.time_adjust = time_adjust
-        try:
-            self.dataset = NetcdfDataset.openFile(self.uri, None)
-        except (IOError, RuntimeError):
-            self.logger.error("Cannot open the file " + self.uri)
+        # Start from no open files in case the files have changed since an
+        # earlier reader
+        dataset_pool.close()
+        if max_open is not None:
+            dataset_pool.max_open = max_open
+        self.dataset = open_ncml(self.uri)
         self.grid = GridGroup(self.uri, self.dataset)
         self._get_source_timedata(self.grid, self.time_adjust)
 
-    def __del__(self):
-        """Destructor close the netcdf file."""
-        if self.dataset is not None:
-            self.dataset.close()
-
     def __getitem__(self, val):
         """
         Return the grid.
@@ -111,16 +100,13 @@ class Reader(object):
         """Get the source time data information. Builds up sourcedata objects of a given grid."""
         timevar = grid[self.time_counter]
         grid.time_counter = timevar[:] + t_adjust
-        grid.date_counter = []
-        for index in range(0, len(grid.time_counter)):
-            grid.date_counter.append(
-                utime(grid.units, grid.calendar).num2date(grid.time_counter[index])
-            )
+        grid.date_counter = list(
+            utime(grid.units, grid.calendar).num2date(grid.time_counter)
+        )
 
     def close(self):
-        """Not yet implemented."""
-        # TODO: keep the netcdf file open until its expicitly closed.
-        pass
+        """Close the source files."""
+        dataset_pool.close()
 
 
 class GridGroup(object):
@@ -133,6 +119,8 @@ class GridGroup(object):
     """
 
     logger = logging.getLogger(__name__)
+    # Open files are held per process so can be used from worker processes
+    fork_safe = True
 
     def __init__(self, filename, dataset):
         """Source data that holds the dataset information."""
@@ -145,40 +133,29 @@ class GridGroup(object):
         self.dataset = dataset
         self.update_atrributes()
 
-    def __del__(self):
-        self.dataset = None
-
     def __getitem__(self, val):
         """Return the data requested."""
-        try:
-            return Variable(self.dataset, val)
-        except KeyError:
-            self.logger.error("Cannot find the requested variable " + self.variable)
-        except (IOError, RuntimeError):
-            self.logger.error("Cannot open the file " + self.file_name)
-        return None
+        return Variable(self.dataset, val)
 
     def get_meta_data(self, variable, source_dic):
         """Return a dictionary with meta data information correspoinding to the variable."""
         # source_dic = {}
         try:
-            dvar = self.dataset.findVariable(variable)
-            if dvar is None:
-                raise KeyError()
+            dvar = self.dataset[variable]
             source_dic["sf"] = 1
             source_dic["os"] = 0
-            mv_attr = dvar.findAttributeIgnoreCase("missing_value")
+            mv_attr = dvar.find_attribute("missing_value")
             if mv_attr is not None:
-                source_dic["mv"] = mv_attr.getValues().copyToNDJavaArray()
-            sf_attr = dvar.findAttributeIgnoreCase("scale_factor")
+                source_dic["mv"] = mv_attr
+            sf_attr = dvar.find_attribute("scale_factor")
             if sf_attr is not None:
-                source_dic["sf"] = sf_attr.getValues().copyToNDJavaArray()
-            os_attr = dvar.findAttributeIgnoreCase("add_offset")
+                source_dic["sf"] = sf_attr
+            os_attr = dvar.find_attribute("add_offset")
             if os_attr is not None:
-                source_dic["os"] = os_attr.getValues().copyToNDJavaArray()
-            fv_attr = dvar.findAttributeIgnoreCase("_FillValue")
+                source_dic["os"] = os_attr
+            fv_attr = dvar.find_attribute("_FillValue")
             if fv_attr is not None:
-                source_dic["mv"] = fv_attr.getValue(0)
+                source_dic["mv"] = np.ravel(fv_attr)[0]
             return source_dic
         except KeyError:
             self.logger.error("Cannot find the requested variable " + variable)
@@ -188,15 +165,9 @@ class GridGroup(object):
 
     def update_atrributes(self):
         """Update the units and calendar information for the grid."""
-        try:
-            var = Variable(self.dataset, time_counter_const)
-            self.units = var.get_attribute_value("units")
-            self.calendar = var.get_attribute_value("calendar")
-        except KeyError:
-            self.logger.error("Cannot find the requested variable " + self.variable)
-        except (IOError, RuntimeError):
-            self.logger.error("Cannot open the file " + self.file_name)
-        return None
+        var = Variable(self.dataset, time_counter_const)
+        self.units = var.get_attribute_value("units")
+        self.calendar = var.get_attribute_value("calendar")
 
 
 class Variable(object):
@@ -206,102 +177,38 @@ class Variable(object):
         self.variable = variable
 
     def __str__(self):
-        return (
-            "pyBDY NcML Object from file: %s and variable %s" % self.file_name,
-            self.variable,
-        )
+        return "pyBDY NcML Object for variable %s" % self.variable
 
     def __len__(self):
         """Return the length of the variable."""
         try:
-            dvar = self.dataset.findVariable(self.variable)
-            if dvar is None:
-                raise KeyError()
-            val = dvar.getDimension(0).getLength()
-            return val
+            return self.dataset[self.variable].shape[0]
         except KeyError:
             self.logger.error("Cannot find the requested variable " + self.variable)
         return None
 
     def __getitem__(self, val):
-        """Return the data requested."""
-        if type(val) != tuple:
-            val = (val,)
+        """Return the data requested, unscaled in the type of the files."""
         try:
-            dvar = self.dataset.findVariable(self.variable)
-            if dvar is None:
-                raise KeyError()
-            dims = dvar.getShape()
-            # get the requested slice and extract that information from jnius
-            # Check if the request data is with in the dataset dimensions
-            start = [0] * len(dims)
-            stop = dims
-            stride = [1] * len(dims)
-            new_dims = tuple()
-            np_input = False
-            for idx in range(0, len(dims)):
-                try:
-                    if val[idx].start is not None:
-                        start[idx] = val[idx].start
-                    if val[idx].step is not None:
-                        stride[idx] = val[idx].step
-                    if val[idx].stop is not None:
-                        if val[idx].stop == -1:
-                            val[idx] = stop[idx] - 1
-                        elif val[idx].stop > stop[idx]:
-                            val[idx].stop = stop[idx]
-                        stop[idx] = (val[idx].stop - start[idx]) // stride[idx]
-                        if (val[idx].stop - start[idx]) % stride[idx] != 0:
-                            stop[idx] = stop[idx] + 1
-                    new_dims = new_dims + (stop[idx],)
-                except IndexError:
-                    pass
-                except AttributeError:
-                    if isinstance(val[idx], int):
-                        start[idx] = val[idx]
-                        stop[idx] = 1
-                    elif isinstance(val[idx], np.ndarray):
-                        new_dims = new_dims + (val[idx].shape)
-                        np_input = True
-            # Create a section object that represents the requested slice
-            start = [int(i) for i in start]
-            stop = [int(i) for i in stop]
-            stride = [int(i) for i in stride]
-            selected_section = Section(start, stop, stride)
-            data_array = dvar.read(selected_section)
-            retval = data_array.copyToNDJavaArray()
-            # TODO: copy it into numpy instead of Java array and then convert to numpy
-            # convert to numpy array
-            retval = np.asarray(retval, dtype="float")
-            self.logger.info(retval.shape)
-            if np_input:  # if an array is passed as selection
-                ret_dim_list = ()
-                for idx in range(0, len(dims)):
-                    if isinstance(val[idx], np.ndarray):
-                        ret_dim_list2 = ret_dim_list + (val[idx],)
-                        # can't do all the reductions at once due to Index Error: shape mismatch
-                        retval = retval[ret_dim_list2]
-                    ret_dim_list = ret_dim_list + (slice(None, None, None),)
-                self.logger.info(ret_dim_list)
-                self.logger.info(retval.shape)
-                self.logger.info(ret_dim_list)
-            # reshape to reflect the request
-            retval = np.reshape(retval, new_dims)
-            return retval
+            return self.dataset[self.variable].read(val)
         except KeyError:
             self.logger.error("Cannot find the requested variable " + self.variable)
         except (IOError, RuntimeError):
-            self.logger.error("Cannot open the file " + self.file_name)
+            self.logger.error("Cannot read the variable " + self.variable)
         return None
 
     def _get_dimensions(self):
         """Return the dimensions of the variables."""
         try:
-            dvar = self.dataset.findVariable(self.variable)
-            if dvar is None:
-                raise KeyError()
-            retval = tuple(dvar.getDimensionsString().split(" "))
-            return retval
+            return self.dataset[self.variable].dimensions
+        except KeyError:
+            self.logger.error("Cannot find the requested variable " + self.variable)
+        return None
+
+    def _get_dtype(self):
+        """Return the type of the data in the files."""
+        try:
+            return self.dataset[self.variable].get_dtype()
         except KeyError:
             self.logger.error("Cannot find the requested variable " + self.variable)
         return None
@@ -309,29 +216,298 @@ class Variable(object):
     def get_attribute_value(self, attr_name):
         """Return the attribute value of the variable."""
         try:
-            dvar = self.dataset.findVariable(self.variable)
-            if dvar is None:
-                raise KeyError()
-            attr = dvar.findAttributeIgnoreCase(attr_name)
-            if attr is not None:
-                retval = attr.getValue(0)
-                return retval
+            attr = self.dataset[self.variable].find_attribute(attr_name)
         except KeyError:
             self.logger.error("Cannot find the requested variable " + self.variable)
-        return None
+            return None
+        if attr is None or isinstance(attr, str):
+            return attr
+        return np.ravel(attr)[0]
 
 
 class NcMLFile(object):
     def __init__(self, filename):
-        self.dataset = None
-        try:
-            self.dataset = NetcdfDataset.openFile(filename, None)
-        except (IOError, RuntimeError):
-            self.logger.error("Cannot open the file " + filename)
+        self.dataset = open_ncml(filename)
 
     def __getitem__(self, val):
         return Variable(self.dataset, val)
 
     def close(self):
-        if self.dataset is not None:
-            self.dataset.close()
+        """Files are held open in the pool for reuse."""
+        pass
+
+
+class AggVariable(object):
+    """
+    A variable of an NcML dataset made from one or more files.
+
+    Notes
+    -----
+    When the variable is joined along a dimension, files holds each file
+    in order and offsets the index of the first entry of each file along
+    the joined dimension.
+    """
+
+    def __init__(self, files, org_name, dimensions, shape, attributes):
+        self.files = files
+        self.org_name = org_name
+        self.dimensions = dimensions
+        self.shape = shape
+        self.attributes = attributes
+        self.join_axis = None
+        self.offsets = np.array([0, shape[0] if shape else 0])
+
+    def join(self, join_axis, offsets):
+        """Join the variable along an axis with files starting at offsets."""
+        self.join_axis = join_axis
+        self.offsets = offsets
+        shape = list(self.shape)
+        shape[join_axis] = offsets[-1]
+        self.shape = tuple(shape)
+
+    def find_attribute(self, name):
+        """
+        Return an attribute, matching the name ignoring case.
+
+        Parameters
+        ----------
+        name   (str) : name of the attribute
+
+        Returns
+        -------
+        value  (obj) : value of the attribute or None if not found
+        """
+        for key, value in self.attributes.items():
+            if key.lower() == name.lower():
+                return value
+        dvar = dataset_pool.get(self.files[0]).variables[self.org_name]
+        for key in dvar.ncattrs():
+            if key.lower() == name.lower():
+                return dvar.getncattr(key)
+        return None
+
+    def get_dtype(self):
+        """Return the type of the variable in the files."""
+        return dataset_pool.get(self.files[0]).variables[self.org_name].dtype
+
+    def read(self, val):
+        """
+        Read a selection of the variable.
+
+        Parameters
+        ----------
+        val (obj) : index, slice, array or tuple of these for each dimension
+
+        Returns
+        -------
+        data (np.array) : selected data
+        """
+        if type(val) is not tuple:
+            val = (val,)
+        val = val + (slice(None),) * (len(self.shape) - len(val))
+        if self.join_axis is None:
+            return self._read_file(0, val)
+
+        # Find the files holding the requested entries along the join axis
+        key = val[self.join_axis]
+        n_join = self.shape[self.join_axis]
+        if isinstance(key, slice):
+            index = np.arange(*key.indices(n_join))
+        else:
+            index = np.asarray(key)
+            if index.dtype == bool:
+                index = np.flatnonzero(index)
+            index = np.where(index < 0, index + n_join, index)
+        file_ind = np.searchsorted(self.offsets, index, side="right") - 1
+
+        if index.ndim == 0:
+            val = list(val)
+            val[self.join_axis] = int(index - self.offsets[file_ind])
+            return self._read_file(int(file_ind), tuple(val))
+
+        # Read each run of entries from the same file as one selection
+        retvals = []
+        breaks = np.flatnonzero(np.diff(file_ind)) + 1
+        for run in np.split(np.arange(len(index)), breaks):
+            if not len(run):
+                continue
+            f = file_ind[run[0]]
+            local = index[run] - self.offsets[f]
+            step = local[1] - local[0] if len(local) > 1 else 1
+            if (step > 0) and np.all(np.diff(local) == step):
+                local = slice(int(local[0]), int(local[-1]) + 1, int(step))
+            val = list(val)
+            val[self.join_axis] = local
+            retvals.append(self._read_file(int(f), tuple(val)))
+        # Integer indices before the join axis remove a dimension
+        out_axis = self.join_axis - sum(
+            np.ndim(k) == 0 and not isinstance(k, slice) for k in val[: self.join_axis]
+        )
+        if len(retvals) == 1:
+            return retvals[0]
+        elif not retvals:
+            shape = list(self._read_file(0, tuple(val)).shape)
+            shape[out_axis] = 0
+            return np.zeros(shape)
+        return np.concatenate(retvals, axis=out_axis)
+
+    def _read_file(self, f, val):
+        """Read a selection from one of the files."""
+        dvar = dataset_pool.get(self.files[f]).variables[self.org_name]
+        return dvar[val]
+
+
+def open_ncml(uri):
+    """
+    Read an NcML file into a dictionary of its variables.
+
+    Parameters
+    ----------
+    uri    (str) : path or url of the NcML file
+
+    Returns
+    -------
+    dataset (dict) : AggVariable of each variable keyed by name
+    """
+    if uri.startswith("http:") or uri.startswith("https:"):
+        with urlopen(uri) as f:
+            root = ET.fromstring(f.read())
+    else:
+        root = ET.parse(uri).getroot()
+    return _read_netcdf(root, uri)
+
+
+def _tag(elem):
+    """Return the tag of an element without the namespace."""
+    return elem.tag.split("}")[-1]
+
+
+def _location(location, base):
+    """Return the path or url of a location relative to the NcML file."""
+    if location.startswith("file:"):
+        location = location[5:]
+    if re.match(r"^[a-zA-Z][a-zA-Z0-9+.-]*://", location):
+        return location
+    if base.startswith("http:") or base.startswith("https:"):
+        return urljoin(base, location)
+    return os.path.normpath(os.path.join(os.path.dirname(base), location))
+
+
+def _scan(elem, base):
+    """Return the files found by a scan element, sorted by name."""
+    location = _location(elem.get("location"), base)
+    suffix = elem.get("suffix")
+    reg_exp = elem.get("regExp")
+    subdirs = elem.get("subdirs", "true").lower() == "true"
+    files = []
+    for path, dirs, names in os.walk(location):
+        for name in names:
+            filename = os.path.join(path, name)
+            if suffix is not None and not name.endswith(suffix):
+                continue
+            if reg_exp is not None and re.fullmatch(reg_exp, filename) is None:
+                continue
+            files.append(filename)
+        if not subdirs:
+            break
+    return sorted(files)
+
+
+def _read_file(filename):
+    """Return the variables of a single netCDF file."""
+    nc = dataset_pool.get(filename)
+    dataset = {}
+    for name, dvar in nc.variables.items():
+        dataset[name] = AggVariable(
+            [filename], name, tuple(dvar.dimensions), tuple(dvar.shape), {}
+        )
+    return dataset
+
+
+def _join_existing(files, dim_name):
+    """Return the variables of files joined along an existing dimension."""
+    if not files:
+        raise ValueError("No files found for the aggregation on " + dim_name)
+    dataset = _read_file(files[0])
+    lengths = [
+        len(dataset_pool.get(filename).dimensions[dim_name]) for filename in files
+    ]
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    for agg_var in dataset.values():
+        if dim_name in agg_var.dimensions:
+            agg_var.files = files
+            agg_var.join(agg_var.dimensions.index(dim_name), offsets)
+    return dataset
+
+
+def _read_netcdf(elem, base):
+    """Build the variables described by a netcdf element."""
+    dataset = {}
+    if elem.get("location") is not None:
+        dataset = _read_file(_location(elem.get("location"), base))
+
+    changes = [elem]
+    for agg in elem.findall(NCML_NS + "aggregation"):
+        changes.append(agg)
+        agg_type = agg.get("type")
+        if agg_type == "union":
+            for child in agg.findall(NCML_NS + "netcdf"):
+                for name, agg_var in _read_netcdf(child, base).items():
+                    # The first dataset with a variable takes priority
+                    dataset.setdefault(name, agg_var)
+        elif agg_type == "joinExisting":
+            files = []
+            for child in agg:
+                if _tag(child) == "netcdf" and child.get("location") is not None:
+                    files.append(_location(child.get("location"), base))
+                elif _tag(child) == "scan":
+                    files.extend(_scan(child, base))
+            dataset.update(_join_existing(files, agg.get("dimName")))
+        else:
+            raise ValueError("NcML aggregation type %s is not supported" % agg_type)
+
+    for parent in changes:
+        _apply_changes(parent, dataset)
+    return dataset
+
+
+def _apply_changes(elem, dataset):
+    """Apply the variable and dimension elements of an element to the variables."""
+    for child in elem:
+        if _tag(child) == "variable":
+            name = child.get("name")
+            org_name = child.get("orgName")
+            for rename in child.findall(NCML_NS + "rename"):
+                org_name, name = name, rename.get("name")
+            if org_name is not None and org_name in dataset:
+                dataset[name] = dataset.pop(org_name)
+            if name not in dataset:
+                continue
+            for attr in child.findall(NCML_NS + "attribute"):
+                dataset[name].attributes[attr.get("name")] = _attribute(attr)
+        elif _tag(child) == "dimension" and child.get("orgName") is not None:
+            for agg_var in dataset.values():
+                agg_var.dimensions = tuple(
+                    child.get("name") if dim == child.get("orgName") else dim
+                    for dim in agg_var.dimensions
+                )
+
+
+def _attribute(elem):
+    """Return the value of an attribute element."""
+    value = elem.get("value", elem.text)
+    attr_type = elem.get("type", "String")
+    if attr_type == "String":
+        return value
+    dtype = {
+        "byte": np.int8,
+        "short": np.int16,
+        "int": np.int32,
+        "long": np.int64,
+        "float": np.float32,
+        "double": np.float64,
+    }[attr_type.lower()]
+    values = np.array(value.split(elem.get("separator", " ")), dtype=dtype)
+    if len(values) == 1:
+        return values[0]
+    return values
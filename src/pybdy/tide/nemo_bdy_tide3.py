@@ -23,9 +23,12 @@ import logging
 import numpy as np
 
 from pybdy import nemo_bdy_grid_angle
-from pybdy.utils.nemo_bdy_lib import rot_rep
+from pybdy.utils.nemo_bdy_lib import bdy_gather, rot_rep
 
-from . import fes2014_extract_HC, tpxo_extract_HC
+from . import fes2014_extract_HC, nemo_bdy_tide_cache, tpxo_extract_HC
+
+# tide model grid cells read around the boundary points
+ATLAS_HALO = 3
 
 
 def nemo_bdy_tide_rot(setup, DstCoord, Grid_T, Grid_U, Grid_V, comp):
@@ -60,52 +63,101 @@ def nemo_bdy_tide_rot(setup, DstCoord, Grid_T, Grid_U, Grid_V, comp):
     cosv = np.zeros((numharm, len(Grid_V.bdy_i)))
     sinv = np.zeros((numharm, len(Grid_V.bdy_i)))
 
+    # Extract the constituents at the boundary points of all chunks at once
+    # so each tide model grid is only read once
+    atlas = {"t": None, "u": None, "v": None}
+    if setup.settings.get("tide_cache", False):
+        # Use the atlas cropped to the domain by a previous run
+        atlas = nemo_bdy_tide_cache.get(setup.settings, DC.lonlat)
+
     # T grid
 
+    dst_lon, dst_lat, ends_t = bdy_points(DC, Grid_T, g_type)
+
+    # convert the dst_lon into TMD Conventions (0E/360E)
+    dst_lon[dst_lon < 0.0] = dst_lon[dst_lon < 0.0] + 360.0
+    # extract the surface elevation at each z-point
+    tide_z = extract_constituents(
+        setup.settings, dst_lat, dst_lon, g_type, atlas[g_type]
+    )
+
+    # check if elevation data are missing
+    ind = np.where((np.isnan(tide_z.amp)) | (np.isnan(tide_z.gph)))
+    if ind[0].size > 0:
+        logger.warning("Missing elevation along the open boundary")
+
+    ampz = tide_z.amp
+    phaz = tide_z.gph
+
+    ampz[ind] = 0.0
+    phaz[ind] = 0.0
+
+    compindx = constituents_index(tide_z.cons, comp)
+
     for ch in range(len(DstCoord.all_chunk)):
         ct_ind = Grid_T.chunk_number == DstCoord.all_chunk[ch]
         if sum(ct_ind) == 0:
             continue
-
-        dst_lon = DC.bdy_lonlat[g_type]["lon"][(Grid_T.bdy_r == 0) & ct_ind]
-        dst_lat = DC.bdy_lonlat[g_type]["lat"][(Grid_T.bdy_r == 0) & ct_ind]
-
-        # convert the dst_lon into TMD Conventions (0E/360E)
-        dst_lon[dst_lon < 0.0] = dst_lon[dst_lon < 0.0] + 360.0
-        # extract the surface elevation at each z-point
-        if setup.settings["tide_model"].lower() == "tpxo7p2":
-            tide_z = tpxo_extract_HC.TpxoExtract(
-                setup.settings, dst_lat, dst_lon, g_type
-            )
-        elif setup.settings["tide_model"].lower() == "tpxo9v5":
-            tide_z = tpxo_extract_HC.TpxoExtract(
-                setup.settings, dst_lat, dst_lon, g_type
-            )
-        elif setup.settings["tide_model"].lower() == "fes2014":
-            tide_z = fes2014_extract_HC.FesExtract(
-                setup.settings, dst_lat, dst_lon, g_type
-            )
-
-        # convert back the z-longitudes into the usual conventions (-180E/+180E)
-        dst_lon[dst_lon > 180.0] = dst_lon[dst_lon > 180.0] - 360.0
-        # check if elevation data are missing
-        ind = np.where((np.isnan(tide_z.amp)) | (np.isnan(tide_z.gph)))
-        if ind[0].size > 0:
-            logger.warning("Missing elevation along the open boundary")
-
-        ampz = tide_z.amp
-        phaz = tide_z.gph
-
-        ampz[ind] = 0.0
-        phaz[ind] = 0.0
-
-        compindx = constituents_index(tide_z.cons, comp)
+        pt_ind = slice(ends_t[ch], ends_t[ch + 1])
 
         for h in range(numharm):
             c = int(compindx[h])
             if c != -1:
-                cosz[h, ct_ind] = ampz[c, :] * np.cos(np.deg2rad(phaz[c, :]))
-                sinz[h, ct_ind] = ampz[c, :] * np.sin(np.deg2rad(phaz[c, :]))
+                cosz[h, ct_ind] = ampz[c, pt_ind] * np.cos(np.deg2rad(phaz[c, pt_ind]))
+                sinz[h, ct_ind] = ampz[c, pt_ind] * np.sin(np.deg2rad(phaz[c, pt_ind]))
+
+    # U and V grid velocities are both needed on the U and V points
+
+    dst_lon_u, dst_lat_u, ends_u = bdy_points(DC, Grid_U, Grid_U.grid_type)
+    dst_lon_v, dst_lat_v, ends_v = bdy_points(DC, Grid_V, Grid_V.grid_type)
+    nbdyu = len(dst_lon_u)
+    dst_lon = np.concatenate((dst_lon_u, dst_lon_v))
+    dst_lat = np.concatenate((dst_lat_u, dst_lat_v))
+
+    # convert the U-longitudes into the TMD conventions (0/360E)
+    dst_lon[dst_lon < 0.0] = dst_lon[dst_lon < 0.0] + 360.0
+    tide_u = extract_constituents(
+        setup.settings, dst_lat, dst_lon, Grid_U.grid_type, atlas["u"]
+    )
+    tide_v = extract_constituents(
+        setup.settings, dst_lat, dst_lon, Grid_V.grid_type, atlas["v"]
+    )
+
+    ampuX = tide_u.amp[:, :nbdyu]
+    phauX = tide_u.gph[:, :nbdyu]
+    ampvX = tide_v.amp[:, :nbdyu]
+    phavX = tide_v.gph[:, :nbdyu]
+    ampuY = tide_u.amp[:, nbdyu:]
+    phauY = tide_u.gph[:, nbdyu:]
+    ampvY = tide_v.amp[:, nbdyu:]
+    phavY = tide_v.gph[:, nbdyu:]
+
+    # check if ux data are missing
+    ind = np.where((np.isnan(ampuX)) | (np.isnan(phauX)))
+    if ind[0].size > 0:
+        logger.warning("Missing zonal velocity along the x open boundary")
+    ampuX[ind] = 0
+    phauX[ind] = 0
+    # check if vx data are missing
+    ind = np.where((np.isnan(ampvX)) | (np.isnan(phavX)))
+    if ind[0].size > 0:
+        logger.warning("Missing meridional velocity along the x open boundary")
+    ampvX[ind] = 0
+    phavX[ind] = 0
+    # check if uy data are missing
+    ind = np.where((np.isnan(ampuY)) | (np.isnan(phauY)))
+    if ind[0].size > 0:
+        logger.warning("Missing zonal velocity along the y open boundary")
+    ampuY[ind] = 0
+    phauY[ind] = 0
+    # check if vy data are missing
+    ind = np.where((np.isnan(ampvY)) | (np.isnan(phavY)))
+    if ind[0].size > 0:
+        logger.warning("Missing meridional velocity along the y open boundary")
+    ampvY[ind] = 0
+    phavY[ind] = 0
+
+    compindx = constituents_index(tide_u.cons, comp)
 
     # U grid
 
@@ -113,61 +165,7 @@ def nemo_bdy_tide_rot(setup, DstCoord, Grid_T, Grid_U, Grid_V, comp):
         cu_ind = Grid_U.chunk_number == DstCoord.all_chunk[ch]
         if sum(cu_ind) == 0:
             continue
-
-        # extract U values of constituents
-        dst_lon = DC.bdy_lonlat[Grid_U.grid_type]["lon"][(Grid_U.bdy_r == 0) & cu_ind]
-        dst_lat = DC.bdy_lonlat[Grid_U.grid_type]["lat"][(Grid_U.bdy_r == 0) & cu_ind]
-        # set the array size for the target boundary output
-        if len(dst_lon) != len(dst_lon):
-            logger.error("These should be the same size")
-        else:
-            nbdyu = len(dst_lon)
-
-        # convert the U-longitudes into the TMD conventions (0/360E)
-        dst_lon[dst_lon < 0.0] = dst_lon[dst_lon < 0.0] + 360.0
-
-        if setup.settings["tide_model"].lower() == "tpxo7p2":
-            tide_ux = tpxo_extract_HC.TpxoExtract(
-                setup.settings, dst_lat, dst_lon, Grid_U.grid_type
-            )
-            tide_vx = tpxo_extract_HC.TpxoExtract(
-                setup.settings, dst_lat, dst_lon, Grid_V.grid_type
-            )
-        elif setup.settings["tide_model"].lower() == "tpxo9v5":
-            tide_ux = tpxo_extract_HC.TpxoExtract(
-                setup.settings, dst_lat, dst_lon, Grid_U.grid_type
-            )
-            tide_vx = tpxo_extract_HC.TpxoExtract(
-                setup.settings, dst_lat, dst_lon, Grid_V.grid_type
-            )
-        elif setup.settings["tide_model"].lower() == "fes2014":
-            tide_ux = fes2014_extract_HC.FesExtract(
-                setup.settings, dst_lat, dst_lon, Grid_U.grid_type
-            )
-            tide_vx = fes2014_extract_HC.FesExtract(
-                setup.settings, dst_lat, dst_lon, Grid_V.grid_type
-            )
-
-        ampuX = tide_ux.amp
-        phauX = tide_ux.gph
-        ampvX = tide_vx.amp
-        phavX = tide_vx.gph
-
-        # check if ux data are missing
-        ind = np.where((np.isnan(ampuX)) | (np.isnan(phauX)))
-        if ind[0].size > 0:
-            logger.warning("Missing zonal velocity along the x open boundary")
-        ampuX[ind] = 0
-        phauX[ind] = 0
-        # check if vx data are missing
-        ind = np.where((np.isnan(ampvX)) | (np.isnan(phavX)))
-        if ind[0].size > 0:
-            logger.warning("Missing meridional velocity along the x open boundary")
-        ampvX[ind] = 0
-        phavX[ind] = 0
-
-        # convert back the u-longitudes into the usual conventions (-180E/+180E)
-        dst_lon[dst_lon > 180.0] = dst_lon[dst_lon > 180.0] - 360.0
+        pt_ind = slice(ends_u[ch], ends_u[ch + 1])
 
         # extract the depths along the U-point open boundary
 
@@ -193,16 +191,12 @@ def nemo_bdy_tide_rot(setup, DstCoord, Grid_T, Grid_U, Grid_V, comp):
         hbatX = np.sum(e3X * ind, 0)
 
         bdy_i_ch = Grid_U.bdy_i_ch[cu_ind, :]
-        depu = np.zeros((1, bdy_i_ch.shape[0]))
-        for n in range(0, bdy_i_ch.shape[0]):
-            depu[0, n] = hbatX[bdy_i_ch[n, 1], bdy_i_ch[n, 0]]
+        depu = np.array(bdy_gather(hbatX, bdy_i_ch)[np.newaxis, :], dtype=np.float64)
 
         # although we already have this in bdy_H, if zinterp id false this would
         # be the wrong bathy for tides so recalculating makes sense
         # depu = DC.depths["u"]["bdy_H"][np.newaxis, :]
 
-        compindx = constituents_index(tide_ux.cons, comp)
-
         nbdyu = np.sum(cu_ind)
         cosuX = np.zeros((numharm, nbdyu))
         sinuX = np.zeros((numharm, nbdyu))
@@ -219,22 +213,30 @@ def nemo_bdy_tide_rot(setup, DstCoord, Grid_T, Grid_U, Grid_V, comp):
                     logger.error("Error: Land or Mask contamination")
 
                 cosuX[h, :] = (
-                    ampuX[c, :] * np.cos(np.deg2rad(phauX[c, :])) / depu.ravel()
+                    ampuX[c, pt_ind]
+                    * np.cos(np.deg2rad(phauX[c, pt_ind]))
+                    / depu.ravel()
                 )
                 sinuX[h, :] = (
-                    ampuX[c, :] * np.sin(np.deg2rad(phauX[c, :])) / depu.ravel()
+                    ampuX[c, pt_ind]
+                    * np.sin(np.deg2rad(phauX[c, pt_ind]))
+                    / depu.ravel()
                 )
                 cosvX[h, :] = (
-                    ampvX[c, :] * np.cos(np.deg2rad(phavX[c, :])) / depu.ravel()
+                    ampvX[c, pt_ind]
+                    * np.cos(np.deg2rad(phavX[c, pt_ind]))
+                    / depu.ravel()
                 )
                 sinvX[h, :] = (
-                    ampvX[c, :] * np.sin(np.deg2rad(phavX[c, :])) / depu.ravel()
+                    ampvX[c, pt_ind]
+                    * np.sin(np.deg2rad(phavX[c, pt_ind]))
+                    / depu.ravel()
                 )
             else:
-                cosuX[h, :] = ampuX[c, :] * np.cos(np.deg2rad(phauX[c, :]))
-                sinuX[h, :] = ampuX[c, :] * np.sin(np.deg2rad(phauX[c, :]))
-                cosvX[h, :] = ampvX[c, :] * np.cos(np.deg2rad(phavX[c, :]))
-                sinvX[h, :] = ampvX[c, :] * np.sin(np.deg2rad(phavX[c, :]))
+                cosuX[h, :] = ampuX[c, pt_ind] * np.cos(np.deg2rad(phauX[c, pt_ind]))
+                sinuX[h, :] = ampuX[c, pt_ind] * np.sin(np.deg2rad(phauX[c, pt_ind]))
+                cosvX[h, :] = ampvX[c, pt_ind] * np.cos(np.deg2rad(phavX[c, pt_ind]))
+                sinvX[h, :] = ampvX[c, pt_ind] * np.sin(np.deg2rad(phavX[c, pt_ind]))
 
         maxJ = DC.hgr["u"][ch].grid["glamu"].squeeze().shape[0]
         maxI = DC.hgr["u"][ch].grid["glamu"].squeeze().shape[1]
@@ -245,13 +247,9 @@ def nemo_bdy_tide_rot(setup, DstCoord, Grid_T, Grid_U, Grid_V, comp):
         dst_gsin = grid_angles.sinval
 
         # retain only boundary points rotation information
-        tmp_gcos = np.zeros((Grid_U.bdy_r[cu_ind] == 0).sum())
-        tmp_gsin = np.zeros((Grid_U.bdy_r[cu_ind] == 0).sum())
-        for index in range(len(tmp_gcos)):
-            tmp_gcos[index] = dst_gcos[bdy_i_ch[index, 1], bdy_i_ch[index, 0]]
-            tmp_gsin[index] = dst_gsin[bdy_i_ch[index, 1], bdy_i_ch[index, 0]]
-        dst_gcos = tmp_gcos.copy()
-        dst_gsin = tmp_gsin.copy()
+        rim_i = bdy_i_ch[: (Grid_U.bdy_r[cu_ind] == 0).sum()]
+        dst_gcos = np.array(bdy_gather(dst_gcos, rim_i), dtype=np.float64)
+        dst_gsin = np.array(bdy_gather(dst_gsin, rim_i), dtype=np.float64)
 
         cosu[:, cu_ind] = rot_rep(cosuX, cosvX, "u", "en to i", dst_gcos, dst_gsin)
         sinu[:, cu_ind] = rot_rep(sinuX, sinvX, "u", "en to i", dst_gcos, dst_gsin)
@@ -262,61 +260,7 @@ def nemo_bdy_tide_rot(setup, DstCoord, Grid_T, Grid_U, Grid_V, comp):
         cv_ind = Grid_V.chunk_number == DstCoord.all_chunk[ch]
         if sum(cv_ind) == 0:
             continue
-
-        # extract V values of constituents
-        dst_lon = DC.bdy_lonlat[Grid_V.grid_type]["lon"][(Grid_V.bdy_r == 0) & cv_ind]
-        dst_lat = DC.bdy_lonlat[Grid_V.grid_type]["lat"][(Grid_V.bdy_r == 0) & cv_ind]
-        # set the array size for the target boundary output
-        if len(dst_lon) != len(dst_lon):
-            logger.error("These should be the same size")
-
-        else:
-            nbdyv = len(dst_lon)
-
-        # convert the U-longitudes into the TMD conventions (0/360E)
-        dst_lon[dst_lon < 0.0] = dst_lon[dst_lon < 0.0] + 360.0
-        if setup.settings["tide_model"].lower() == "tpxo7p2":
-            tpxo_uy = tpxo_extract_HC.TpxoExtract(
-                setup.settings, dst_lat, dst_lon, Grid_U.grid_type
-            )
-            tpxo_vy = tpxo_extract_HC.TpxoExtract(
-                setup.settings, dst_lat, dst_lon, Grid_V.grid_type
-            )
-        elif setup.settings["tide_model"].lower() == "tpxo9v5":
-            tpxo_uy = tpxo_extract_HC.TpxoExtract(
-                setup.settings, dst_lat, dst_lon, Grid_U.grid_type
-            )
-            tpxo_vy = tpxo_extract_HC.TpxoExtract(
-                setup.settings, dst_lat, dst_lon, Grid_V.grid_type
-            )
-        elif setup.settings["tide_model"].lower() == "fes2014":
-            tpxo_uy = fes2014_extract_HC.FesExtract(
-                setup.settings, dst_lat, dst_lon, Grid_U.grid_type
-            )
-            tpxo_vy = fes2014_extract_HC.FesExtract(
-                setup.settings, dst_lat, dst_lon, Grid_V.grid_type
-            )
-
-        ampuY = tpxo_uy.amp
-        phauY = tpxo_uy.gph
-        ampvY = tpxo_vy.amp
-        phavY = tpxo_vy.gph
-
-        # check if uy data are missing
-        ind = np.where((np.isnan(ampuY)) | (np.isnan(phauY)))
-        if ind[0].size > 0:
-            logger.warning("Missing zonal velocity along the y open boundary")
-        ampuY[ind] = 0
-        phauY[ind] = 0
-        # check if ux data are missing
-        ind = np.where((np.isnan(ampvY)) | (np.isnan(phavY)))
-        if ind[0].size > 0:
-            logger.warning("Missing meridional velocity along the y open boundary")
-        ampvY[ind] = 0
-        phavY[ind] = 0
-
-        # convert back the u-longitudes into the usual conventions (-180E/+180E)
-        dst_lon[dst_lon > 180.0] = dst_lon[dst_lon > 180.0] - 360.0
+        pt_ind = slice(ends_v[ch], ends_v[ch + 1])
 
         # extract the depths along the V-point open boundary
 
@@ -342,11 +286,7 @@ def nemo_bdy_tide_rot(setup, DstCoord, Grid_T, Grid_U, Grid_V, comp):
         hbatX = np.sum(e3X * ind, 0)
 
         bdy_i_ch = Grid_V.bdy_i_ch[cv_ind, :]
-        depv = np.zeros((1, bdy_i_ch.shape[0]))
-        for n in range(0, bdy_i_ch.shape[0]):
-            depv[0, n] = hbatX[bdy_i_ch[n, 1], bdy_i_ch[n, 0]]
-
-        compindx = constituents_index(tpxo_uy.cons, comp)
+        depv = np.array(bdy_gather(hbatX, bdy_i_ch)[np.newaxis, :], dtype=np.float64)
 
         nbdyv = np.sum(cv_ind)
         cosuY = np.zeros((numharm, nbdyv))
@@ -363,22 +303,30 @@ def nemo_bdy_tide_rot(setup, DstCoord, Grid_T, Grid_U, Grid_V, comp):
                 if np.sum(depv[:] <= 0.0) > 0:
                     logger.error("Error: Land or Mask contamination")
                 cosuY[h, :] = (
-                    ampuY[c, :] * np.cos(np.deg2rad(phauY[c, :])) / depv.ravel()
+                    ampuY[c, pt_ind]
+                    * np.cos(np.deg2rad(phauY[c, pt_ind]))
+                    / depv.ravel()
                 )
                 sinuY[h, :] = (
-                    ampuY[c, :] * np.sin(np.deg2rad(phauY[c, :])) / depv.ravel()
+                    ampuY[c, pt_ind]
+                    * np.sin(np.deg2rad(phauY[c, pt_ind]))
+                    / depv.ravel()
                 )
                 cosvY[h, :] = (
-                    ampvY[c, :] * np.cos(np.deg2rad(phavY[c, :])) / depv.ravel()
+                    ampvY[c, pt_ind]
+                    * np.cos(np.deg2rad(phavY[c, pt_ind]))
+                    / depv.ravel()
                 )
                 sinvY[h, :] = (
-                    ampvY[c, :] * np.sin(np.deg2rad(phavY[c, :])) / depv.ravel()
+                    ampvY[c, pt_ind]
+                    * np.sin(np.deg2rad(phavY[c, pt_ind]))
+                    / depv.ravel()
                 )
             else:
-                cosuY[h, :] = ampuY[c, :] * np.cos(np.deg2rad(phauY[c, :]))
-                sinuY[h, :] = ampuY[c, :] * np.sin(np.deg2rad(phauY[c, :]))
-                cosvY[h, :] = ampvY[c, :] * np.cos(np.deg2rad(phavY[c, :]))
-                sinvY[h, :] = ampvY[c, :] * np.sin(np.deg2rad(phavY[c, :]))
+                cosuY[h, :] = ampuY[c, pt_ind] * np.cos(np.deg2rad(phauY[c, pt_ind]))
+                sinuY[h, :] = ampuY[c, pt_ind] * np.sin(np.deg2rad(phauY[c, pt_ind]))
+                cosvY[h, :] = ampvY[c, pt_ind] * np.cos(np.deg2rad(phavY[c, pt_ind]))
+                sinvY[h, :] = ampvY[c, pt_ind] * np.sin(np.deg2rad(phavY[c, pt_ind]))
 
         maxJ = DC.hgr["v"][ch].grid["glamv"].squeeze().shape[0]
         maxI = DC.hgr["v"][ch].grid["glamv"].squeeze().shape[1]
@@ -389,13 +337,9 @@ def nemo_bdy_tide_rot(setup, DstCoord, Grid_T, Grid_U, Grid_V, comp):
         dst_gsin = grid_angles.sinval
 
         # retain only boundary points rotation information
-        tmp_gcos = np.zeros((Grid_V.bdy_r[cv_ind] == 0).sum())
-        tmp_gsin = np.zeros((Grid_V.bdy_r[cv_ind] == 0).sum())
-        for index in range(len(tmp_gcos)):
-            tmp_gcos[index] = dst_gcos[bdy_i_ch[index, 1], bdy_i_ch[index, 0]]
-            tmp_gsin[index] = dst_gsin[bdy_i_ch[index, 1], bdy_i_ch[index, 0]]
-        dst_gcos = tmp_gcos.copy()
-        dst_gsin = tmp_gsin.copy()
+        rim_i = bdy_i_ch[: (Grid_V.bdy_r[cv_ind] == 0).sum()]
+        dst_gcos = np.array(bdy_gather(dst_gcos, rim_i), dtype=np.float64)
+        dst_gsin = np.array(bdy_gather(dst_gsin, rim_i), dtype=np.float64)
 
         cosv[:, cv_ind] = rot_rep(cosuY, cosvY, "v", "en to j", dst_gcos, dst_gsin)
         sinv[:, cv_ind] = rot_rep(sinuY, sinvY, "v", "en to j", dst_gcos, dst_gsin)
@@ -404,6 +348,240 @@ def nemo_bdy_tide_rot(setup, DstCoord, Grid_T, Grid_U, Grid_V, comp):
     return cosz, sinz, cosu, sinu, cosv, sinv
 
 
+def bdy_points(DstCoord, Grid, grd):
+    """
+    Gather the boundary points of all chunks in chunk order.
+
+    Parameters
+    ----------
+        DstCoord       : destination coordinate object
+        Grid           : grid bdy_i, grid_type, bdy_r, chunk_number
+        grd (str)      : grid type t, u or v
+
+    Returns
+    -------
+        lon, lat       : longitudes and latitudes of the rim 0 points
+        ends           : start of the points of each chunk and the total
+    """
+    lon = []
+    lat = []
+    ends = [0]
+    for chunk in DstCoord.all_chunk:
+        c_ind = (Grid.bdy_r == 0) & (Grid.chunk_number == chunk)
+        lon.append(DstCoord.bdy_lonlat[grd]["lon"][c_ind])
+        lat.append(DstCoord.bdy_lonlat[grd]["lat"][c_ind])
+        ends.append(ends[-1] + len(lon[-1]))
+    return np.concatenate(lon), np.concatenate(lat), ends
+
+
+def extract_constituents(settings, lat, lon, grid_type, atlas=None):
+    """
+    Extract the harmonic constituents from the tide model at the given points.
+
+    Parameters
+    ----------
+        settings       : settings
+        lat, lon       : latitudes and longitudes (0E/360E) of the points
+        grid_type      : grid type t, u or v
+        atlas          : cropped atlas from the tide cache, None to read the
+                         tide model files
+
+    Returns
+    -------
+        tide           : extract object with cons, amp and gph
+    """
+    if settings["tide_model"].lower() in ["tpxo7p2", "tpxo9v5"]:
+        return tpxo_extract_HC.TpxoExtract(settings, lat, lon, grid_type, atlas)
+    elif settings["tide_model"].lower() == "fes2014":
+        return fes2014_extract_HC.FesExtract(settings, lat, lon, grid_type, atlas)
+
+
+def read_atlas(settings, lat, lon, grid_type):
+    """
+    Read the part of the tide model around the given points.
+
+    Parameters
+    ----------
+        settings       : settings
+        lat, lon       : latitudes and longitudes (0E/360E) of the points
+        grid_type      : grid type t, u or v
+
+    Returns
+    -------
+        atlas          : dict of the constituents, coordinates and mask
+    """
+    if settings["tide_model"].lower() in ["tpxo7p2", "tpxo9v5"]:
+        return tpxo_extract_HC.read_atlas(settings, lat, lon, grid_type)
+    elif settings["tide_model"].lower() == "fes2014":
+        return fes2014_extract_HC.read_atlas(settings, lat, lon, grid_type)
+
+
+def atlas_window(x, y, lon, lat, cyclic, halo=ATLAS_HALO):
+    """
+    Find the part of a regular tide model grid needed for the given points.
+
+    The window covers the grid cells of the points plus halo cells around
+    them. For global grids the window wraps around in longitude, the window
+    longitudes are then continuous and the point longitudes are shifted to
+    match.
+
+    Parameters
+    ----------
+        x (np.array)       : tide model longitudes, increasing
+        y (np.array)       : tide model latitudes, increasing
+        lon (np.array)     : longitudes of the points in the tide model convention
+        lat (np.array)     : latitudes of the points
+        cyclic (bool)      : True if the tide model grid is global in longitude
+        halo (int)         : number of extra grid cells around the points
+
+    Returns
+    -------
+        cols (np.array)    : longitude indices of the window
+        rows (slice)       : latitude indices of the window
+        x_win (np.array)   : longitudes of the window
+        lon_win (np.array) : longitudes of the points within the window
+    """
+    n = len(x)
+    j = np.searchsorted(y, lat)
+    rows = slice(max(j.min() - 1 - halo, 0), min(j.max() + 1 + halo, len(y)))
+    if not cyclic:
+        i = np.searchsorted(x, lon)
+        cols = np.arange(max(i.min() - 1 - halo, 0), min(i.max() + 1 + halo, n))
+        return cols, rows, x[cols], lon
+
+    # grid point at or west of each point, cyclic
+    i = np.unique((np.searchsorted(x, lon, side="right") - 1) % n)
+    gaps = np.diff(np.append(i, i[0] + n))
+    k = np.argmax(gaps)
+    start = i[(k + 1) % len(i)] - halo
+    end = i[k] + 1 + halo
+    if k < len(i) - 1:
+        # the points cross the start of the grid
+        end = end + n
+    if end - start + 1 > n // 2:
+        # use the whole grid with a wrapped point either side
+        cols = np.arange(-1, n + 1) % n
+        x_res = x[1] - x[0]
+        x_win = np.concatenate(([x[0] - x_res], x, [x[-1] + x_res]))
+        return cols, rows, x_win, lon
+    if end >= n:
+        start = start - n
+        end = end - n
+    cols = np.arange(start, end + 1)
+    x_win = x[cols % n] + 360.0 * (cols // n)
+    lon_win = np.where(lon > x_win[-1], lon - 360.0, lon)
+    return cols % n, rows, x_win, lon_win
+
+
+def window_lon(x, lon):
+    """
+    Shift the longitudes of points by 360 degrees to fall within a window.
+
+    Parameters
+    ----------
+        x (np.array)   : longitudes of the window, increasing and continuous
+        lon (np.array) : longitudes of the points
+
+    Returns
+    -------
+        lon (np.array) : longitudes of the points in the window convention
+    """
+    lon = np.where(lon < x[0], lon + 360.0, lon)
+    return np.where(lon > x[-1], lon - 360.0, lon)
+
+
+class BilinearStencil(object):
+    """
+    Bilinear interpolation from a regular grid onto a fixed set of points.
+
+    The corner indices and weights of the points are computed once and then
+    applied to any number of fields on the grid, e.g. all the constituents.
+    """
+
+    def __init__(self, x, y, lon, lat):
+        """
+        Compute the corners and weights of the points.
+
+        Parameters
+        ----------
+            x (np.array)   : grid longitudes, increasing
+            y (np.array)   : grid latitudes, increasing
+            lon (np.array) : longitudes of the points, within the grid
+            lat (np.array) : latitudes of the points, within the grid
+        """
+        i, wx = stencil_1d(x, lon)
+        j, wy = stencil_1d(y, lat)
+        # corners in the order (i, j), (i + 1, j), (i, j + 1), (i + 1, j + 1)
+        self.ii = np.stack((i, i + 1, i, i + 1), axis=-1)
+        self.jj = np.stack((j, j, j + 1, j + 1), axis=-1)
+        self.weights = np.stack(
+            ((1 - wx) * (1 - wy), wx * (1 - wy), (1 - wx) * wy, wx * wy), axis=-1
+        )
+
+    def wet(self, mask):
+        """
+        Interpolate a mask (water=1, land=0) onto the points.
+
+        Parameters
+        ----------
+            mask (np.array) : mask [x, y]
+
+        Returns
+        -------
+            wet (np.array)  : fraction of water at the points
+        """
+        return np.sum(mask[self.ii, self.jj] * self.weights, axis=-1)
+
+    def apply(self, data, mask=None):
+        """
+        Interpolate fields onto the points.
+
+        Corners where the data are NaN, or that are land in the mask, are left
+        out and the weights of the remaining corners are renormalised. Points
+        without any valid corner are NaN.
+
+        Parameters
+        ----------
+            data (np.array) : real or complex fields [..., x, y]
+            mask (np.array) : mask [x, y] (water=1, land=0), optional
+
+        Returns
+        -------
+            result (np.array) : the fields at the points [..., point]
+        """
+        corners = data[..., self.ii, self.jj]
+        valid = np.isfinite(corners)
+        if mask is not None:
+            valid &= mask[self.ii, self.jj] != 0
+        weights = np.where(valid, self.weights, 0.0)
+        total = np.sum(weights, axis=-1)
+        values = np.sum(np.where(valid, corners, 0) * weights, axis=-1)
+        result = np.full(values.shape, np.nan, dtype=values.dtype)
+        np.divide(values, total, out=result, where=total > 0)
+        return result
+
+
+def stencil_1d(x, v):
+    """
+    Find the grid interval and linear weight of points along one axis.
+
+    Parameters
+    ----------
+        x (np.array) : grid coordinates, increasing
+        v (np.array) : coordinates of the points
+
+    Returns
+    -------
+        i (np.array) : index of the grid point at or below each point
+        w (np.array) : weight of the grid point above each point
+    """
+    if np.any(v < x[0]) or np.any(v > x[-1]):
+        raise ValueError("Points are outside the tide model grid.")
+    i = np.minimum(np.searchsorted(x, v, side="right") - 1, len(x) - 2)
+    w = (v - x[i]) / (x[i + 1] - x[i])
+    return i, w
+
+
 def constituents_index(constituents, inputcons):
     """
     Convert the input contituents to index in the tidal constituents.
@@ -0,0 +1,248 @@
+# ===================================================================
+# Copyright 2025 National Oceanography Centre
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# ===================================================================
+
+"""
+Created on Sun Oct 18 17:30:00 2026.
+
+Store the tide model atlas cropped to the destination domain so repeat
+tidal runs over the same domain don't read the global atlas.
+
+The cache is a directory of .npy files in sn_dst_dir, named after a hash of
+the tide model settings, the constituents available and the domain, with
+the constituents, land mask and depths of each grid. The files are memory
+mapped when read so only the constituents requested are loaded.
+"""
+# External imports
+import hashlib
+import logging
+import os
+import shutil
+
+import numpy as np
+
+# Local imports
+from . import fes2014_extract_HC, nemo_bdy_tide3, tpxo_extract_HC
+
+logger = logging.getLogger(__name__)
+
+# Increase if the contents of the cache change
+CACHE_VERSION = "1"
+
+# Settings the atlas depends on
+KEY_SETTINGS = [
+    "tide_model",
+    "tide_grid_7p2",
+    "tide_h",
+    "tide_u",
+    "tide_grid_9p5",
+    "tide_dir",
+    "tide_fes",
+]
+
+# Arrays of each grid in the cache
+ATLAS_VARS = [
+    "cons",
+    "lon",
+    "lat",
+    "data",
+    "mask",
+    "depth_lon",
+    "depth_lat",
+    "depth",
+    "depth_mask",
+]
+
+
+def domain_points(lonlat):
+    """
+    Return the points of the t, u and v grids of the destination domain.
+
+    Parameters
+    ----------
+    lonlat (dict)  : lon and lat arrays of each grid t, u and v
+
+    Returns
+    -------
+    lon, lat       : longitudes (0E/360E) and latitudes of all the points
+    """
+    lon = []
+    lat = []
+    for grd in ["t", "u", "v"]:
+        lon.append(np.ravel(lonlat[grd]["lon"]))
+        lat.append(np.ravel(lonlat[grd]["lat"]))
+    lon = np.concatenate(lon)
+    lon[lon < 0.0] = lon[lon < 0.0] + 360.0
+    return lon, np.concatenate(lat)
+
+
+def available_constituents(settings):
+    """
+    List the constituents of the tide model that have data files.
+
+    Parameters
+    ----------
+    settings (dict) : settings for bdy
+
+    Returns
+    -------
+    cons (list)     : names of the constituents, None for TPXO7.2 which
+                      has all the constituents in one file
+    """
+    model = settings["tide_model"].lower()
+    if model == "fes2014":
+        dirs = ["ocean_tide_extrapolated", "eastward_velocity", "northward_velocity"]
+        return [
+            con
+            for con in fes2014_extract_HC.CONSTITUENTS
+            if all(
+                os.path.isfile(settings["tide_fes"] + f"/{d}/{con.lower()}.nc")
+                for d in dirs
+            )
+        ]
+    elif model == "tpxo9v5":
+        return [
+            con
+            for con in tpxo_extract_HC.CONSTITUENTS_9V5
+            if all(
+                os.path.isfile(
+                    settings["tide_dir"] + f"{f}_{con.lower()}_tpxo9_atlas_30_v5.nc"
+                )
+                for f in ["h", "u"]
+            )
+        ]
+    return None
+
+
+def get_key(settings, lon, lat):
+    """
+    Hash the inputs that determine the cropped atlas.
+
+    Parameters
+    ----------
+    settings (dict) : settings for bdy
+    lon, lat        : points of the destination domain
+
+    Returns
+    -------
+    key (str)       : hex digest of the inputs
+    """
+    sha = hashlib.sha256()
+    sha.update(CACHE_VERSION.encode())
+    for name in KEY_SETTINGS:
+        sha.update((name + "=" + str(settings.get(name))).encode())
+    sha.update(str(available_constituents(settings)).encode())
+    sha.update(str(nemo_bdy_tide3.ATLAS_HALO).encode())
+    for pts in [lon, lat]:
+        pts = np.ascontiguousarray(pts, dtype=float)
+        sha.update(str(pts.shape).encode())
+        sha.update(pts.tobytes())
+    return sha.hexdigest()
+
+
+def get_dir(settings, lon, lat):
+    """
+    Return the cache directory for the given inputs.
+
+    Parameters
+    ----------
+    settings (dict) : settings for bdy
+    lon, lat        : points of the destination domain
+
+    Returns
+    -------
+    dirname (str)   : path of the cache directory in the output directory
+    """
+    key = get_key(settings, lon, lat)
+    return settings["dst_dir"] + settings["fn"] + "_tide_cache_" + key[:16] + "/"
+
+
+def build(settings, lon, lat, dirname):
+    """
+    Crop the tide model atlas to the domain and write it to the cache.
+
+    All the constituents available are written, not only those requested,
+    so the cache can be reused when the constituents change.
+
+    Parameters
+    ----------
+    settings (dict) : settings for bdy
+    lon, lat        : points of the destination domain
+    dirname (str)   : path of the cache directory
+    """
+    settings = dict(settings)
+    cons = available_constituents(settings)
+    if cons is not None:
+        settings["clname"] = {str(i + 1): con for i, con in enumerate(cons)}
+
+    tmp_dir = dirname.rstrip("/") + ".tmp/"
+    if os.path.isdir(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+    for grd in ["t", "u", "v"]:
+        atlas = nemo_bdy_tide3.read_atlas(settings, lat, lon.copy(), grd)
+        for name, value in atlas.items():
+            np.save(tmp_dir + grd + "_" + name + ".npy", np.asarray(value))
+    if os.path.isdir(dirname):
+        shutil.rmtree(dirname)
+    os.replace(tmp_dir, dirname)
+    logger.info("Written tide cache %s", dirname)
+
+
+def load(dirname):
+    """
+    Memory map the cropped atlas of each grid from the cache.
+
+    Parameters
+    ----------
+    dirname (str)  : path of the cache directory
+
+    Returns
+    -------
+    atlas (dict)   : atlas of each grid t, u and v or None if the cache
+                     doesn't exist
+    """
+    if not os.path.isdir(dirname):
+        logger.info("No tide cache found at %s", dirname)
+        return None
+    atlas = {}
+    for grd in ["t", "u", "v"]:
+        atlas[grd] = {}
+        for name in ATLAS_VARS:
+            filename = dirname + grd + "_" + name + ".npy"
+            if os.path.isfile(filename):
+                atlas[grd][name] = np.load(filename, mmap_mode="r")
+    logger.info("Using tide cache %s", dirname)
+    return atlas
+
+
+def get(settings, lonlat):
+    """
+    Return the cropped atlas of the domain, building the cache if needed.
+
+    Parameters
+    ----------
+    settings (dict) : settings for bdy
+    lonlat (dict)   : lon and lat arrays of each grid t, u and v
+
+    Returns
+    -------
+    atlas (dict)    : atlas of each grid t, u and v
+    """
+    lon, lat = domain_points(lonlat)
+    dirname = get_dir(settings, lon, lat)
+    atlas = load(dirname)
+    if atlas is None:
+        build(settings, lon, lat, dirname)
+        atlas = load(dirname)
+    return atlas
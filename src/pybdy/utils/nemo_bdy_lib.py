@@ -18,9 +18,20 @@ Library of some functions used by multiple classes.
 
 Written by John Kazimierz Farey, Sep 2012.
 """
+import hashlib
+import logging
+import multiprocessing
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import scipy.spatial as sp
 
+# Number of KD-trees kept for reuse by kd_tree
+KD_TREE_CACHE_SIZE = 3
+_kd_trees = OrderedDict()
+
 
 def sub2ind(shap, subx, suby):
     """Subscript to index of a 1d array."""
@@ -28,6 +39,22 @@ def sub2ind(shap, subx, suby):
     return ind
 
 
+def bdy_gather(field, bdy_i):
+    """
+    Gather the values of a field at the boundary points.
+
+    Parameters
+    ----------
+    field (np.array) : 2D field [j, i] or 3D field [k, j, i]
+    bdy_i (np.array) : i/j indices of the boundary points [point, i/j]
+
+    Returns
+    -------
+    values (np.array) : values at the boundary points [point] or [k, point]
+    """
+    return field[..., bdy_i[:, 1], bdy_i[:, 0]]
+
+
 def rot_rep(pxin, pyin, dummy, cd_todo, gcos, gsin):
     """Rotate function."""
     if cd_todo.lower() == "en to i":
@@ -43,6 +70,134 @@ def rot_rep(pxin, pyin, dummy, cd_todo, gcos, gsin):
     return x_var * gcos + y_var * gsin
 
 
+def process_pool(workers, initializer=None, initargs=()):
+    """
+    Return a pool of worker processes.
+
+    Processes are forked where the platform allows it so the workers share
+    the memory of large arrays, such as the interpolation weights, with the
+    parent rather than being sent a copy.
+
+    Parameters
+    ----------
+    workers     (int)  : number of worker processes
+    initializer (func) : None or function run once in each worker
+    initargs    (tuple): arguments of the initializer
+
+    Returns
+    -------
+    pool (ProcessPoolExecutor) : the pool of workers
+    """
+    if "fork" in multiprocessing.get_all_start_methods():
+        mp_context = multiprocessing.get_context("fork")
+    else:
+        mp_context = multiprocessing.get_context()
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=mp_context,
+        initializer=initializer,
+        initargs=initargs,
+    )
+
+
+def _run_background(conn, func, args):
+    """Run a function in a forked process and send back any error."""
+    try:
+        func(*args)
+        conn.send(None)
+    except BaseException:
+        conn.send(traceback.format_exc())
+    finally:
+        conn.close()
+
+
+class BackgroundTasks:
+    """
+    Run functions in the background on forked processes.
+
+    Each function runs on a process forked when it is submitted, so it sees
+    a snapshot of the memory of the parent, such as a month of bdy data,
+    without the arrays being copied through a pipe. At most max_pending
+    functions run at once, submit waits for the oldest when there are more.
+    An error in a function is raised as a RuntimeError by submit or join.
+    Where fork isn't available the functions are run straight away.
+    """
+
+    def __init__(self, max_pending=1):
+        """
+        Initialise the background tasks.
+
+        Parameters
+        ----------
+        max_pending (int) : maximum number of functions running at once
+        """
+        self.max_pending = max(max_pending, 1)
+        self.pending = []
+        if "fork" in multiprocessing.get_all_start_methods():
+            self.mp_context = multiprocessing.get_context("fork")
+        else:
+            self.mp_context = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        if exc_type is None:
+            self.join()
+            return
+        # Don't hide the error that is already being raised
+        try:
+            self.join()
+        except RuntimeError as err:
+            logging.getLogger(__name__).error(str(err))
+
+    def submit(self, func, *args):
+        """
+        Run func(*args) in the background.
+
+        Parameters
+        ----------
+        func (function) : function to run
+        *args           : arguments of the function
+        """
+        if self.mp_context is None:
+            func(*args)
+            return
+        while len(self.pending) >= self.max_pending:
+            self._wait(self.pending.pop(0))
+        recv, send = self.mp_context.Pipe(duplex=False)
+        proc = self.mp_context.Process(target=_run_background, args=(send, func, args))
+        proc.start()
+        send.close()
+        self.pending.append((proc, recv))
+
+    def join(self):
+        """Wait for all the functions to finish, raising the first error."""
+        error = None
+        while self.pending:
+            try:
+                self._wait(self.pending.pop(0))
+            except RuntimeError as err:
+                if error is None:
+                    error = err
+        if error is not None:
+            raise error
+
+    def _wait(self, task):
+        """Wait for a function to finish and raise its error."""
+        proc, recv = task
+        try:
+            error = recv.recv()
+        except EOFError:
+            error = None
+        proc.join()
+        recv.close()
+        if (error is None) and (proc.exitcode != 0):
+            error = "Process exited with code %s" % proc.exitcode
+        if error is not None:
+            raise RuntimeError("Background task failed:\n" + error)
+
+
 def get_output_filename(setup_var, year, month, var_type):
     """Return a output filename constructed for a given var_type, year and month."""
     if var_type == "ice":
@@ -112,6 +267,76 @@ def velocity_field(psi):
     return U, V
 
 
+def kd_points(*coords):
+    """
+    Stack coordinates into a contiguous array of points for a KD-tree.
+
+    Parameters
+    ----------
+    *coords (np.array) : coordinates of the points, each raveled in the same
+                         order
+
+    Returns
+    -------
+    pts (np.array)     : float64 array of the points [n, len(coords)]
+    """
+    pts = np.column_stack([np.ravel(np.asarray(c)) for c in coords])
+    return np.ascontiguousarray(pts, dtype=np.float64)
+
+
+def kd_tree(pts, reuse=False):
+    """
+    Build a KD-tree of the points.
+
+    With reuse the last few trees are kept and returned again for identical
+    points, e.g. for source grids that share their coordinates.
+
+    Parameters
+    ----------
+    pts (np.array) : points from kd_points [n, d]
+    reuse (bool)   : look up and keep the tree in the cache
+
+    Returns
+    -------
+    tree (cKDTree) : the KD-tree of the points
+    """
+    key = None
+    if reuse:
+        key = (pts.shape, hashlib.sha1(np.ascontiguousarray(pts)).digest())
+        if key in _kd_trees:
+            _kd_trees.move_to_end(key)
+            return _kd_trees[key]
+    try:
+        tree = sp.cKDTree(pts, balanced_tree=False, compact_nodes=False)
+    except TypeError:  # fix for scipy 0.16.0
+        tree = sp.cKDTree(pts)
+    if reuse:
+        _kd_trees[key] = tree
+        while len(_kd_trees) > KD_TREE_CACHE_SIZE:
+            _kd_trees.popitem(last=False)
+    return tree
+
+
+def kd_query(tree, pts, **kwargs):
+    """
+    Query the KD-tree for the neighbours of the points on all the cpus.
+
+    Parameters
+    ----------
+    tree (cKDTree) : the KD-tree from kd_tree
+    pts (np.array) : points from kd_points [n, d]
+    **kwargs       : arguments of cKDTree.query e.g. k
+
+    Returns
+    -------
+    dist, ind      : distances and indices of the neighbours
+    """
+    try:
+        return tree.query(pts, workers=-1, **kwargs)
+    except TypeError:  # scipy < 1.6 has no workers
+        return tree.query(pts, **kwargs)
+
+
 def bdy_sections(nbidta, nbjdta, nbrdta, rw):
     """Extract individual byd sections."""
     # TODO Need to put a check in here to STOP if we have E-W wrap
@@ -127,7 +352,7 @@ def bdy_sections(nbidta, nbjdta, nbrdta, rw):
     count = 0
     flag = 0
     mark = 0
-    source_tree = sp.cKDTree(list(zip(outer_rim_i, outer_rim_j)))
+    source_tree = kd_tree(kd_points(outer_rim_i, outer_rim_j))
     id_order = np.ones((nbdy,), dtype=np.int) * source_tree.n
     id_order[count] = 0  # use index 0 as the starting point
     count += 1
@@ -137,8 +362,8 @@ def bdy_sections(nbidta, nbjdta, nbrdta, rw):
     # Search for individual sections and order
 
     while count <= nbdy:
-        lcl_pt = list(
-            zip([outer_rim_i[id_order[count - 1]]], [outer_rim_j[id_order[count - 1]]])
+        lcl_pt = kd_points(
+            outer_rim_i[id_order[count - 1]], outer_rim_j[id_order[count - 1]]
         )
         junk, an_id = source_tree.query(lcl_pt, k=3, distance_upper_bound=1.1)
 
@@ -0,0 +1,73 @@
+# ===================================================================
+# Copyright 2025 National Oceanography Centre
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# ===================================================================
+
+"""
+Created on Sun Oct 18 22:10:00 2026.
+
+Time get_vertical_weights with sco levels for increasing boundary lengths.
+
+This is not part of the test suite, run it from the top of the repository
+with: python -m tests.bench_vertical_weights
+"""
+
+# External imports
+import time
+
+import numpy as np
+
+# Local imports
+from src.pybdy import nemo_bdy_extr_assist as extr_assist
+from tests.synth import synth_zgrid
+
+
+def bench_get_vertical_weights_sco(num_bdy, sc_z_len=30, dst_len_z=20):
+    """
+    Time get_vertical_weights for random sco levels.
+
+    Parameters
+    ----------
+    num_bdy (int)   : number of boundary points
+    sc_z_len (int)  : the length of depth axis of the source grid
+    dst_len_z (int) : the length of depth axis of the destination grid
+
+    Returns
+    -------
+    seconds (float) : time taken by get_vertical_weights
+    """
+    rng = np.random.default_rng(2)
+    sc_bathy = rng.uniform(50, 1000, (3, num_bdy + 2))
+    sc_z, sc_zw = synth_zgrid.synth_sco(sc_bathy, sc_z_len)
+    dst_dep, dst_depw = synth_zgrid.synth_sco(sc_bathy[1, 1:-1], dst_len_z)
+    dst_dep = np.ma.masked_array(dst_dep)
+
+    ind_g = np.array([[1, 2, 1, 0, 1, 2, 0, 0, 2], [1, 1, 2, 1, 0, 2, 2, 0, 0]])
+    ind = np.zeros((num_bdy, 9), dtype=int)
+    for i in range(num_bdy):
+        ind[i, :] = np.ravel_multi_index(
+            ind_g + [[0], [i]], (3, num_bdy + 2), order="F"
+        )
+
+    st = time.time()
+    extr_assist.get_vertical_weights(
+        dst_dep, dst_len_z, num_bdy, sc_z, sc_z_len, ind, False
+    )
+    return time.time() - st
+
+
+if __name__ == "__main__":
+    for num_bdy in [10, 100, 1000, 10000]:
+        print(
+            "get_vertical_weights sco num_bdy %d: %.3f s"
+            % (num_bdy, bench_get_vertical_weights_sco(num_bdy))
+        )
@@ -289,6 +289,30 @@ def test_h_grid_synth_C():
     assert not errors, "errors occured:\n{}".format("\n".join(errors))
 
 
+def test_subset_hgr():
+    # Test the chunk subsets read and calculated on a window match the full grid
+    logger = logging.getLogger(__name__)
+    name_map = "./tests/data/grid_name_map.json"
+    variables = ["glamt", "gphit", "glamu", "gphiu", "glamv", "gphiv", "e1t"]
+    path1, path2 = gen_synth_netcdf(variables)
+    hg_full = hgr.H_Grid(path2, name_map, logger)
+    hg = hgr.H_Grid(path2, name_map, logger)
+
+    errors = []
+    for indices in [[0, 4, 0, 3], [5, 21, 10, 20], [18, 25, 1, 2]]:
+        x1, x2, y1, y2 = indices
+        sub = hg.subset_hgr("t", indices)
+        if hg.grid.is_loaded("e1t") or hg.grid.is_loaded("e2u"):
+            errors.append("Full scale factors loaded for subset.")
+        for var in hg_full.var_list:
+            if not np.array_equal(sub.grid[var], hg_full.grid[var][:, y1:y2, x1:x2]):
+                errors.append(var + " does not match for " + str(indices) + ".")
+    os.remove(path1)
+    os.remove(path2)
+    # assert no error message has been registered, else print messages
+    assert not errors, "errors occured:\n{}".format("\n".join(errors))
+
+
 def gen_synth_netcdf(variables):
     # Generate a synthetic test case
     lon_t = np.arange(-20, 1, 1)
@@ -232,6 +232,16 @@ def test_chunk_large_diag():
     assert (np.unique(chunk_number) == np.array([0, 1, 2, 3, 4])).all()
 
 
+def test_chunk_land_order():
+    # Chunks are joined diagonally and numbered in order of their first point
+    ibdy = np.array([10, 0, 11, 1, 5, 2, 12])
+    jbdy = np.array([0, 0, 1, 1, 5, 0, 2])
+    chunk_number = np.zeros(len(ibdy)) - 1
+
+    chunk_number = chunk.chunk_land(ibdy, jbdy, chunk_number, 1)
+    assert (chunk_number == np.array([0, 1, 0, 1, 2, 1, 0])).all()
+
+
 # Synthetic test cases
 
 
@@ -211,6 +211,71 @@ def test_get_vertical_weights_sco():
     assert not errors, "errors occured:\n{}".format("\n".join(errors))
 
 
+def test_get_vertical_weights_sco_many():
+    # Test the indices and weights of get_vertical_weights with random sco
+    # levels against the nearest levels found by comparing all of them
+    num_bdy = 100
+    sc_z_len = 30
+    dst_len_z = 20
+    rng = np.random.default_rng(2)
+    sc_bathy = rng.uniform(50, 1000, (3, num_bdy + 2))
+    sc_z, sc_zw = synth_zgrid.synth_sco(sc_bathy, sc_z_len)
+    dst_dep, dst_depw = synth_zgrid.synth_sco(sc_bathy[1, 1:-1], dst_len_z)
+    dst_dep = np.ma.masked_array(dst_dep)
+    # Make a few depths fall exactly between source levels
+    dst_dep[3, :5] = (sc_z[3, 1, 1:6] + sc_z[4, 1, 1:6]) / 2
+    dst_dep[-1, -1] = np.ma.masked
+
+    ind_g = np.array([[1, 2, 1, 0, 1, 2, 0, 0, 2], [1, 1, 2, 1, 0, 2, 2, 0, 0]])
+    ind = np.zeros((num_bdy, 9), dtype=int)
+    for i in range(num_bdy):
+        ind[i, :] = np.ravel_multi_index(
+            ind_g + [[0], [i]], (3, num_bdy + 2), order="F"
+        )
+
+    # Run function
+    z9_dist, z9_ind = extr_assist.get_vertical_weights(
+        dst_dep, dst_len_z, num_bdy, sc_z, sc_z_len, ind, False
+    )
+
+    # Source and destination depths of each row of the results
+    sc_z9 = sc_z.transpose(0, 2, 1).reshape(sc_z_len, -1)[:, ind]
+    k_dst, i_bdy, i_9 = np.unravel_index(
+        np.arange(z9_ind.shape[0]), (dst_len_z, num_bdy, 9), order="F"
+    )
+    dst_z = dst_dep.filled(np.nan)[k_dst, i_bdy]
+    k_sc = np.unravel_index(z9_ind, (sc_z_len, num_bdy, 9), order="F")[0]
+    sc_near = sc_z9[k_sc[:, 0], i_bdy, i_9]
+    sc_next = sc_z9[k_sc[:, 1], i_bdy, i_9]
+
+    # Nearest level, the level on the other side of the depth and the
+    # linear weights of the two
+    valid = np.invert(np.isnan(dst_z))
+    min_dist = np.min(np.abs(sc_z9[:, i_bdy, i_9] - dst_z), axis=0)
+    next_test = np.where(sc_near > dst_z, k_sc[:, 0] - 1, k_sc[:, 0] + 1)
+    next_test = np.clip(next_test, 0, sc_z_len - 1)
+    dist = np.abs(np.stack([sc_near, sc_next], axis=1) - dst_z[:, np.newaxis])
+    dist_test = 1 - dist / np.sum(dist, axis=1)[:, np.newaxis]
+    between = valid & (sc_near != sc_next)
+    z_interp = np.sum(z9_dist * np.stack([sc_near, sc_next], axis=1), axis=1)
+
+    errors = []
+    if not (z9_ind[:, 0] // sc_z_len == z9_ind[:, 1] // sc_z_len).all():
+        errors.append("Error with vertical index z9_ind columns.")
+    elif not np.isclose(np.abs(sc_near - dst_z)[valid], min_dist[valid]).all():
+        errors.append("Error with nearest vertical index z9_ind.")
+    elif not (k_sc[:, 1][valid] == next_test[valid]).all():
+        errors.append("Error with adjacent vertical index z9_ind.")
+    elif not np.isclose(z9_dist[between], dist_test[between]).all():
+        errors.append("Error with vertical weights z9_dist.")
+    elif not np.isclose(z_interp[between], dst_z[between]).all():
+        errors.append("Weights z9_dist do not interpolate to the depth.")
+    elif not np.isnan(np.ma.filled(z9_dist[~valid], np.nan)).all():
+        errors.append("Weights z9_dist found for a masked depth.")
+    # assert no error message has been registered, else print messages
+    assert not errors, "errors occured:\n{}".format("\n".join(errors))
+
+
 def test_flood_fill():
     # Test the flood_fill function
     logger = logging.getLogger(__name__)
@@ -272,68 +337,33 @@ def test_flood_fill():
     assert not errors, "errors occured:\n{}".format("\n".join(errors))
 
 
-def test_interp_vertical():
-    # Test the interp_vertical function
-    logger = logging.getLogger(__name__)
-    max_depth = 100
-    num_bdy = 3
-    dst_len_z = 10
-    bdy_bathy = np.array([80.5, 100, 60])
-    gdept, _ = synth_zgrid.synth_zco(max_depth, dst_len_z)
-    dst_dep = np.tile(gdept, (num_bdy, 1)).T
-    dst_dep[dst_dep > np.tile(bdy_bathy, (dst_len_z, 1))] = np.nan
-    dst_dep = np.ma.masked_array(dst_dep)
-    sc_z_len = 15
-    gdept, _ = synth_zgrid.synth_zco(max_depth, sc_z_len)
-    sc_z = np.tile(gdept, (3, 5, 1)).T
-    sc_bdy = np.tile(np.linspace(12, 5, num=sc_z_len), (3, 5, 1)).T  # Temperature data
-
-    # Centre then clockwise from 12 then corners
-    ind_g = np.array([[1, 2, 1, 0, 1, 2, 0, 0, 2], [1, 1, 2, 1, 0, 2, 2, 0, 0]])
-    ind = np.zeros((num_bdy, 9), dtype=int)
-    ind[0, :] = np.ravel_multi_index(ind_g, (3, 5), order="F")
-    ind_g[1, :] = ind_g[1, :] + 1
-    ind[1, :] = np.ravel_multi_index(ind_g, (3, 5), order="F")
-    ind_g[1, :] = ind_g[1, :] + 1
-    ind[2, :] = np.ravel_multi_index(ind_g, (3, 5), order="F")
-
-    sc_bdy = sc_bdy.reshape((sc_bdy.shape[0], sc_bdy.shape[1] * sc_bdy.shape[2]))[
-        :, ind
-    ]
-    zco = True
-
-    z_dist, z_ind = extr_assist.get_vertical_weights(
-        dst_dep, dst_len_z, num_bdy, sc_z, sc_z_len, ind, zco
-    )
-    sc_bdy = extr_assist.flood_fill(sc_bdy, False, logger)
-
-    # Run function
-    sc_bdy_lev = extr_assist.interp_vertical(
-        sc_bdy, dst_dep, bdy_bathy, z_ind, z_dist, num_bdy
+def test_fill_nearest():
+    # Test the fill_nearest function
+    nan = np.nan
+    sc_cen = np.array(
+        [
+            [nan, 1.0, nan, nan, 4.0, nan, nan, nan, 8.0, nan],
+            [nan, nan, nan, nan, nan, nan, nan, nan, nan, 2.0],
+            [nan, nan, nan, nan, nan, nan, nan, nan, nan, nan],
+        ]
     )
-    sc_bdy_lev[np.isnan(sc_bdy_lev)] = -1
-
-    # Check results
     lev_test = np.array(
         [
-            11.86111,
-            11.08333,
-            10.30555,
-            9.52777,
-            8.75,
-            7.97222,
-            7.19444,
-            -1.0,
-            -1.0,
-            -1.0,
+            [1.0, 1.0, 1.0, 4.0, 4.0, 4.0, 4.0, 8.0, 8.0, 8.0],
+            [2.0, 2.0, 2.0, 2.0, 2.0, 2.0, 2.0, 2.0, 2.0, 2.0],
+            [nan, nan, nan, nan, nan, nan, nan, nan, nan, nan],
         ]
     )
 
+    # Run function
+    sc_fill = extr_assist.fill_nearest(sc_cen)
+
+    # Check results
     errors = []
-    if not (sc_bdy_lev.shape == (dst_len_z, num_bdy, 9)):
-        errors.append("Error with output sc_bdy_lev shape.")
-    elif not np.isclose(sc_bdy_lev[:, 0, 0], lev_test, atol=1e-4).all():
-        errors.append("Error with sc_bdy_lev.")
+    if not np.array_equal(sc_fill, lev_test, equal_nan=True):
+        errors.append("Nans not filled from the nearest valid point.")
+    elif np.isnan(sc_cen).sum() != 26:
+        errors.append("Input array modified.")
     # assert no error message has been registered, else print messages
     assert not errors, "errors occured:\n{}".format("\n".join(errors))
 
@@ -378,33 +408,92 @@ def test_valid_index():
     assert not errors, "errors occured:\n{}".format("\n".join(errors))
 
 
-def test_interp_horizontal():
-    # Test the horizontal interpolation by weighted average
+def test_interp_operator():
+    # Test the sparse operator gives the flood filled and interpolated data
     logger = logging.getLogger(__name__)
-    r0 = 0.041666666
+    num_bdy = 3
+    dst_len_z = 10
+    bdy_bathy = np.array([80.5, 100, 60])  # bathy
+    dst_dep, dst_depw = synth_zgrid.synth_sco(bdy_bathy, dst_len_z)
+    dst_dep = np.ma.masked_array(dst_dep)
+    sc_z_len = 15
+    sc_bathy = np.zeros((3, 5)) + 100
+    sc_bathy[:, 0] = 80.5
+    sc_bathy[:, -2:] = 60
+    sc_z, sc_zw = synth_zgrid.synth_sco(sc_bathy, sc_z_len)
 
-    sc_bdy = np.zeros((1, 5, 9)) + 0.1
-    sc_bdy[:, :, 0] = 0.225
-    dist_tot = np.tile(np.linspace(0.05, 0.35, num=9), (1, 5, 1))
-    dist_wei = (1 / (r0 * np.power(2 * np.pi, 0.5))) * (
-        np.exp(-0.5 * np.power(dist_tot / r0, 2))
+    ind_g = np.array([[1, 2, 1, 0, 1, 2, 0, 0, 2], [1, 1, 2, 1, 0, 2, 2, 0, 0]])
+    ind = np.zeros((num_bdy, 9), dtype=int)
+    ind[0, :] = np.ravel_multi_index(ind_g, (3, 5), order="F")
+    ind_g[1, :] = ind_g[1, :] + 1
+    ind[1, :] = np.ravel_multi_index(ind_g, (3, 5), order="F")
+    ind_g[1, :] = ind_g[1, :] + 1
+    ind[2, :] = np.ravel_multi_index(ind_g, (3, 5), order="F")
+    z_dist, z_ind = extr_assist.get_vertical_weights(
+        dst_dep, dst_len_z, num_bdy, sc_z, sc_z_len, ind, False
+    )
+    dist_tot = np.tile(np.linspace(0.01, 0.05, num=9), (num_bdy, 1))
+
+    # Land on the first column and the bottom levels of the last column
+    sc_msk = np.ones((sc_z_len, 3, 5))
+    sc_msk[:, :, 0] = 0
+    sc_msk[-5:, :, -1] = 0
+    rng = np.random.default_rng(1)
+    sc_data = rng.random((sc_z_len, 3, 5)) + 10
+    sc_data[sc_msk == 0] = np.nan
+
+    # Flood fill, vertical then weighted horizontal interpolation of sc_data
+    dst_test = np.array(
+        [
+            [10.56396, 10.48618, 10.47218],
+            [10.31325, 10.50134, 10.47476],
+            [10.61849, 10.56163, 10.60521],
+            [10.43236, 10.63185, 10.58244],
+            [10.37581, 10.43062, 10.59512],
+            [10.26930, 10.58906, 10.52519],
+            [10.45676, 10.54577, 10.43687],
+            [10.50027, 10.55862, 10.45621],
+            [10.52515, 10.53672, 10.56665],
+            [10.37082, 10.47930, 10.59733],
+        ]
     )
-    dist_fac = np.sum(dist_wei, 2)
-    dst1 = extr_assist.interp_horizontal(sc_bdy, dist_wei, dist_fac, logger)
 
-    sc_bdy = np.zeros((10, 5, 9)) + 0.1
-    sc_bdy[:, :, 4] = 0.5
-    dist_tot = np.tile(np.linspace(0.05, 0.35, num=9), (10, 5, 1))
-    dist_wei = (1 / (r0 * np.power(2 * np.pi, 0.5))) * (
-        np.exp(-0.5 * np.power(dist_tot / r0, 2))
+    interp_op = extr_assist.interp_operator(
+        sc_msk,
+        ind,
+        dist_tot,
+        z_ind,
+        z_dist,
+        dst_dep.filled(np.nan),
+        bdy_bathy,
+        False,
+        True,
+        0.041666666,
+        logger,
     )
-    dist_fac = np.sum(dist_wei, 2)
-    dst2 = extr_assist.interp_horizontal(sc_bdy, dist_wei, dist_fac, logger)
+    dst_op = extr_assist.apply_interp_operator(interp_op, sc_data)
+
+    # Missing data not covered by the mask is renormalised out
+    sc_block = np.stack((sc_data, sc_data))
+    sc_data[3, 1, 2] = np.nan
+    dst_nan = extr_assist.apply_interp_operator(interp_op, sc_data)
+
+    # A block of time steps gives the same result as one step at a time
+    sc_block[1] = sc_data
+    dst_block = extr_assist.apply_interp_operator(interp_op, sc_block)
 
     errors = []
-    if not np.isclose(dst1, np.zeros((1, 5)) + 0.2, atol=1e-4).all():
-        errors.append("Does not interp 1d correct.")
-    elif not np.isclose(dst2, np.zeros((10, 5)) + 0.1, atol=1e-4).all():
-        errors.append("Does not interp 2d correct.")
+    if dst_op.shape != (dst_len_z, num_bdy):
+        errors.append("Operator output has the wrong shape.")
+    elif not np.isclose(dst_op, dst_test, atol=1e-5).all():
+        errors.append("Operator does not match interpolated data.")
+    elif not np.isfinite(dst_nan).all():
+        errors.append("Missing data not renormalised.")
+    elif not ((dst_nan[np.isfinite(dst_nan)] >= 10).all()):
+        errors.append("Renormalised data out of range.")
+    elif not np.allclose(
+        dst_block, np.stack((dst_op, dst_nan)), rtol=1e-12, equal_nan=True
+    ):
+        errors.append("Block of time steps does not match single steps.")
     # assert no error message has been registered, else print messages
     assert not errors, "errors occured:\n{}".format("\n".join(errors))
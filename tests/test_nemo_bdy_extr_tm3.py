@@ -0,0 +1,278 @@
+# ===================================================================
+# Copyright 2025 National Oceanography Centre
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# ===================================================================
+
+"""
+Created on Sun Oct 18 21:30:00 2026.
+
+Tests for the extraction of the boundary data.
+"""
+
+# External imports
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import xarray as xr
+from netCDF4 import Dataset
+
+# Local imports
+from src.pybdy import nemo_bdy_dst_coord as dst_coord
+from src.pybdy import nemo_bdy_extr_tm3 as extract
+from src.pybdy import nemo_bdy_ncgen as ncgen
+from src.pybdy import nemo_bdy_setup as setup
+from src.pybdy import nemo_bdy_source_coord as source_coord
+from src.pybdy import profiler
+from src.pybdy.reader import factory
+from tests import test_zz_end_to_end as end_to_end
+
+
+def test_fill_nan_mean(tmp_path):
+    # Test the streamed fill of nans matches the fill of a buffered month
+    filename = str(tmp_path / "bdy.nc")
+    ncid = ncgen.CreateBDYNetcdfFile(
+        filename,
+        7,
+        5,
+        4,
+        3,
+        1,
+        "",
+        "1960-01-01 00:00:00",
+        -1e20,
+        "gregorian",
+        False,
+        "T",
+        keep_open=True,
+    )
+    temp = np.linspace(0, 30, 4 * 3 * 7).reshape(4, 3, 7)
+    temp[:, 2, 5:] = np.nan
+    temp[1, :, 0] = np.nan
+
+    # Write each time entry and sum the data as stream_month does
+    data_sum = 0.0
+    data_count = 0
+    for n in range(temp.shape[0]):
+        data_sum += np.nansum(temp[n])
+        data_count += np.sum(np.invert(np.isnan(temp[n])))
+        nc_var = ncid.variables["votemper"]
+        nc_var[n] = np.reshape(temp[n], nc_var.shape[1:])
+    written = ncid.variables["votemper"][:]
+    extract._fill_nan_mean(ncid.variables["votemper"], data_sum / data_count)
+    ncid.close()
+
+    nc = Dataset(filename)
+    filled = nc.variables["votemper"][:]
+    nc.close()
+
+    # Fill of the month held in memory
+    expected = temp.copy()
+    expected[np.isnan(expected)] = np.nanmean(expected)
+
+    errors = []
+    if not np.isnan(np.ma.getdata(written)).any():
+        errors.append("Nans not written.")
+    elif np.isnan(np.ma.getdata(filled)).any():
+        errors.append("Nans not filled.")
+    elif not np.array_equal(filled[:, :, 0, :], expected.astype(np.float32)):
+        errors.append("Filled data do not match the buffered fill.")
+    # assert no error message has been registered, else print messages
+    assert not errors, "errors occured:\n{}".format("\n".join(errors))
+
+
+def test_time_blocks():
+    # Test the time entries are split into blocks within nn_block_mem
+    step_size = 3 * 1024**2
+    blocks = {}
+    for name, block_read, block_mem in [
+        ("each", False, 0),
+        ("all", True, 0),
+        ("small", True, 1),
+        ("uneven", True, 12),
+    ]:
+        ext = SimpleNamespace(
+            settings={"block_read": block_read, "block_mem": block_mem}
+        )
+        blocks[name] = extract.Extract._time_blocks(ext, 2, 11, step_size)
+
+    errors = []
+    if blocks["each"] != [(f, f + 1) for f in range(2, 12)]:
+        errors.append("Time entries not read one at a time.")
+    elif blocks["all"] != [(2, 12)]:
+        errors.append("Time entries not read at once without a limit.")
+    elif blocks["small"] != blocks["each"]:
+        errors.append("Limit smaller than one entry not read one at a time.")
+    elif blocks["uneven"] != [(2, 6), (6, 10), (10, 12)]:
+        errors.append("Time entries not split within the limit.")
+    # assert no error message has been registered, else print messages
+    assert not errors, "errors occured:\n{}".format("\n".join(errors))
+
+
+def setup_case(src_dtype=None):
+    # Set up the grids of the end to end sco case up to the Extract objects,
+    # with the source data written as src_dtype if given
+    path1, path2, path3 = end_to_end.generate_sc_test_case(ztype="sco")
+    path4 = end_to_end.generate_dst_test_case(ztype="sco")
+    if src_dtype is not None:
+        with xr.open_dataset(path2) as ds:
+            ds = ds.load()
+        for name in ds.data_vars:
+            ds[name] = ds[name].astype(src_dtype)
+            ds[name].encoding = {}
+        ds.to_netcdf(path2)
+    with open("./tests/data/namelist_zz_end_to_end.bdy") as f:
+        namelist = f.read()
+    name_list_path = end_to_end.modify_namelist(path1, path3, path4, "sco", "sco")
+    Setup = setup.Setup(name_list_path)
+    with open(name_list_path, "w") as f:
+        f.write(namelist)
+
+    settings = Setup.settings
+    SourceCoord = source_coord.SourceCoord()
+    DstCoord = dst_coord.DstCoord()
+    bdy_msk = profiler._get_mask(Setup, False)
+    DstCoord.bdy_msk = bdy_msk == 1
+    bdy_ind = profiler._setup_grids(Setup, bdy_msk, SourceCoord, DstCoord)
+    reader = factory.GetReader(settings["src_dir"], settings["src_time_adj"])
+    for grd in ["t", "u", "v"]:
+        bdy_ind[grd].source_time = reader[grd]
+    files = [path1, path2, path4, "./tests/data/coordinates.bdy.nc"]
+    return settings, SourceCoord, DstCoord, bdy_ind, files
+
+
+def same_op(op_1, op_2):
+    # Check two interpolation operators from interp_operator are the same
+    if isinstance(op_1["op"], list):
+        same = all([(o_1 != o_2).nnz == 0 for o_1, o_2 in zip(op_1["op"], op_2["op"])])
+    else:
+        same = (op_1["op"] != op_2["op"]).nnz == 0
+    return (
+        same
+        and ((op_1["wei"] != op_2["wei"]).nnz == 0)
+        and np.array_equal(op_1["cols"], op_2["cols"])
+        and np.array_equal(op_1["valid"], op_2["valid"])
+        and (op_1["shape"] == op_2["shape"])
+    )
+
+
+def test_extract_workers():
+    # Test the chunks built and extracted on worker processes match serial
+    settings, SourceCoord, DstCoord, bdy_ind, files = setup_case()
+    variables = {"t": ["votemper", "vosaline"], "u": ["vozocrtx", "vomecrty"]}
+    pair = {"t": None, "u": "uv"}
+
+    ext = {}
+    for workers in [1, 2]:
+        settings["workers"] = workers
+        ext[workers] = {}
+        for grd in ["t", "u"]:
+            ext[workers][grd] = extract.Extract(
+                settings,
+                SourceCoord,
+                DstCoord,
+                bdy_ind,
+                variables[grd],
+                grd,
+                pair[grd],
+            )
+            ext[workers][grd].extract_month(1979, 11)
+
+    # Clean up files
+    for f in files:
+        if os.path.isfile(f):
+            os.remove(f)
+
+    errors = []
+    for grd in ["t", "u"]:
+        serial = ext[1][grd]
+        parallel = ext[2][grd]
+        if len(np.unique(serial.dst_chunk)) < 2:
+            errors.append("Only one chunk on grid %s." % grd)
+        elif len(parallel.interp_op) != len(serial.interp_op):
+            errors.append("Operators missing on grid %s." % grd)
+        for c in range(len(serial.interp_op)):
+            for slab, op in serial.interp_op[c].items():
+                if not same_op(op, parallel.interp_op[c][slab]):
+                    errors.append("Operator %s %s differs on grid %s." % (c, slab, grd))
+        for name in serial.d_bdy:
+            data = serial.d_bdy[name][1979]["data"]
+            if not np.array_equal(
+                data, parallel.d_bdy[name][1979]["data"], equal_nan=True
+            ):
+                errors.append("%s differs with workers." % name)
+            elif np.isnan(data).all():
+                errors.append("%s not extracted." % name)
+    # assert no error message has been registered, else print messages
+    assert not errors, "errors occured:\n{}".format("\n".join(errors))
+
+
+def test_extract_block_read(monkeypatch):
+    # Test reading blocks of time entries sized by the type of the source
+    # data gives the same as reading each time entry
+    settings, SourceCoord, DstCoord, bdy_ind, files = setup_case(np.float32)
+
+    step_sizes = []
+    time_blocks = extract.Extract._time_blocks
+
+    def record_blocks(self, first_date, last_date, step_size):
+        blocks = time_blocks(self, first_date, last_date, step_size)
+        step_sizes.append((step_size, len(blocks)))
+        return blocks
+
+    monkeypatch.setattr(extract.Extract, "_time_blocks", record_blocks)
+
+    ext = {}
+    for block_read in [False, True]:
+        settings["block_read"] = block_read
+        settings["block_mem"] = 1
+        ext[block_read] = extract.Extract(
+            settings,
+            SourceCoord,
+            DstCoord,
+            bdy_ind,
+            ["votemper", "vosaline"],
+            "t",
+            None,
+        )
+        del step_sizes[:]
+        ext[block_read].extract_month(1979, 11)
+
+    # Clean up files
+    for f in files:
+        if os.path.isfile(f):
+            os.remove(f)
+
+    # Size in bytes of one time entry of float32 data for each chunk
+    ext_t = ext[True]
+    sizes = [
+        ext_t.sc_z_len
+        * (ch["jmax"] - ch["jmin"] + 1)
+        * (ch["imax"] - ch["imin"] + 2)
+        * 4
+        for ch in ext_t.sc_ind_ch
+    ]
+
+    errors = []
+    if [s for s, n in step_sizes] != [s for s in sizes for v in range(2)]:
+        errors.append("Block size not found from the type of the source data.")
+    elif any([n != 1 for s, n in step_sizes]):
+        errors.append("Month not read in one block within nn_block_mem.")
+    for name in ext[False].d_bdy:
+        if not np.array_equal(
+            ext[False].d_bdy[name][1979]["data"],
+            ext[True].d_bdy[name][1979]["data"],
+            equal_nan=True,
+        ):
+            errors.append("%s differs when read in blocks." % name)
+    # assert no error message has been registered, else print messages
+    assert not errors, "errors occured:\n{}".format("\n".join(errors))
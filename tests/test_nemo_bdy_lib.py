@@ -0,0 +1,124 @@
+# ===================================================================
+# Copyright 2025 National Oceanography Centre
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# ===================================================================
+
+"""
+Created on Sun Oct 18 18:40:00 2026.
+
+Tests for the library functions.
+"""
+
+# External imports
+import numpy as np
+
+# Local imports
+from src.pybdy.utils import nemo_bdy_lib
+
+
+def test_kd_tree():
+    # Test the nearest neighbours and reuse of the KD-trees
+    lon, lat = np.meshgrid(np.arange(-5, 5, 0.5), np.arange(40, 50, 0.25))
+    sc_pts = nemo_bdy_lib.kd_points(lon.ravel(order="F"), lat.ravel(order="F"))
+    dst_lon = np.array([-4.9, 0.13, 3.3, 4.74])
+    dst_lat = np.array([41.1, 45.0, 49.9, 40.2])
+    dst_pts = nemo_bdy_lib.kd_points(dst_lon, dst_lat)
+
+    tree = nemo_bdy_lib.kd_tree(sc_pts, reuse=True)
+    nn_dist, nn_id = nemo_bdy_lib.kd_query(tree, dst_pts, k=1)
+    brute = np.argmin(
+        (sc_pts[:, None, 0] - dst_lon) ** 2 + (sc_pts[:, None, 1] - dst_lat) ** 2,
+        axis=0,
+    )
+    tree_2 = nemo_bdy_lib.kd_tree(sc_pts.copy(), reuse=True)
+    tree_3 = nemo_bdy_lib.kd_tree(sc_pts + 1, reuse=True)
+    tree_4 = nemo_bdy_lib.kd_tree(sc_pts)
+
+    errors = []
+    if sc_pts.shape != (lon.size, 2) or not sc_pts.flags["C_CONTIGUOUS"]:
+        errors.append("Points not a contiguous array.")
+    elif sc_pts.dtype != np.float64:
+        errors.append("Points not float64.")
+    elif not np.array_equal(nn_id, brute):
+        errors.append("Nearest neighbours do not match.")
+    elif tree_2 is not tree:
+        errors.append("Tree not reused for the same points.")
+    elif tree_3 is tree or tree_4 is tree:
+        errors.append("Tree reused for different points or without reuse.")
+    elif nemo_bdy_lib.kd_points(dst_lon).shape != (4, 1):
+        errors.append("1D points do not have one column.")
+    # assert no error message has been registered, else print messages
+    assert not errors, "errors occured:\n{}".format("\n".join(errors))
+
+
+def test_bdy_gather():
+    # Test the values of 2D and 3D fields at the boundary points
+    field = np.arange(3 * 4 * 5, dtype=float).reshape(3, 4, 5)
+    bdy_i = np.array([[0, 0], [4, 1], [2, 3], [3, 3]])
+    values_2d = nemo_bdy_lib.bdy_gather(field[1], bdy_i)
+    values_3d = nemo_bdy_lib.bdy_gather(field, bdy_i)
+
+    errors = []
+    if values_2d.shape != (4,) or values_3d.shape != (3, 4):
+        errors.append("Gathered shapes do not match.")
+    elif not np.array_equal(values_2d, [20.0, 29.0, 37.0, 38.0]):
+        errors.append("2D values do not match.")
+    elif not np.array_equal(values_3d[1], values_2d):
+        errors.append("3D values do not match.")
+    elif not np.array_equal(values_3d[:, 2], field[:, 3, 2]):
+        errors.append("3D column does not match.")
+    # assert no error message has been registered, else print messages
+    assert not errors, "errors occured:\n{}".format("\n".join(errors))
+
+
+def write_file(filename, value):
+    # Write a value to a file
+    with open(filename, "w") as f:
+        f.write(str(value))
+
+
+def fail(value):
+    # Raise an error
+    raise ValueError("Bad value %s" % value)
+
+
+def test_background_tasks(tmp_path):
+    # Test functions run in the background and their errors are raised
+    with nemo_bdy_lib.BackgroundTasks(2) as tasks:
+        for i in range(3):
+            tasks.submit(write_file, str(tmp_path / ("out_%d.txt" % i)), i)
+        n_pending = len(tasks.pending)
+
+    tasks = nemo_bdy_lib.BackgroundTasks(2)
+    tasks.submit(fail, 7)
+    tasks.submit(write_file, str(tmp_path / "after.txt"), 8)
+    try:
+        tasks.join()
+        message = ""
+    except RuntimeError as err:
+        message = str(err)
+
+    errors = []
+    if n_pending > 2:
+        errors.append("More tasks pending than allowed.")
+    elif not all(
+        (tmp_path / ("out_%d.txt" % i)).read_text() == str(i) for i in range(3)
+    ):
+        errors.append("Files not written in the background.")
+    elif "ValueError: Bad value 7" not in message:
+        errors.append("Error not raised on join.")
+    elif tasks.pending:
+        errors.append("Tasks left pending after an error.")
+    elif not (tmp_path / "after.txt").is_file():
+        errors.append("Tasks after an error not finished.")
+    # assert no error message has been registered, else print messages
+    assert not errors, "errors occured:\n{}".format("\n".join(errors))
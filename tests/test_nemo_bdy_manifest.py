@@ -0,0 +1,84 @@
+# ===================================================================
+# Copyright 2025 National Oceanography Centre
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# ===================================================================
+
+"""
+Created on Sun Oct 18 20:40:00 2026.
+
+Tests for the manifest of the output files.
+"""
+
+# External imports
+import numpy as np
+
+# Local imports
+from src.pybdy import nemo_bdy_manifest as bdy_manifest
+
+
+def test_manifest(tmp_path):
+    # Test finished files are recognised and changed files are not
+    settings = {
+        "dst_dir": str(tmp_path) + "/",
+        "fn": "test",
+        "src_hgr": str(tmp_path / "missing.nc"),
+        "rimwidth": 9,
+        "workers": 1,
+        "date_start": "1979-01-01",
+        "date_end": "1979-03-15",
+    }
+    bdy_msk = np.ones((5, 4))
+    bdy_msk[1:-1, 1:-1] = 0
+    key = bdy_manifest.get_key(settings, bdy_msk)
+    manifest = bdy_manifest.Manifest(bdy_manifest.get_file(settings), key)
+    files = [tmp_path / ("test_bdyT_y1979m%02d.nc" % m) for m in [1, 2, 3]]
+    spans = [bdy_manifest.month_span(settings, 1979, m) for m in [1, 2, 3]]
+    for i, f in enumerate(files):
+        f.write_bytes(b"month %d" % i)
+        manifest.record(str(f), spans[i])
+    done = manifest.load()
+    complete = [
+        manifest.is_complete(str(f), spans[i], done) for i, f in enumerate(files)
+    ]
+
+    # Last month extended by the end date
+    settings["date_end"] = "1979-04-01"
+    span_3 = bdy_manifest.month_span(settings, 1979, 3)
+    extended = manifest.is_complete(str(files[2]), span_3, done)
+
+    # Same size but other contents
+    files[1].write_bytes(b"month 7")
+    changed = manifest.is_complete(str(files[1]), spans[1], manifest.load())
+
+    settings["workers"] = 4
+    key_workers = bdy_manifest.get_key(settings, bdy_msk)
+    settings["rimwidth"] = 1
+    key_rimwidth = bdy_manifest.get_key(settings, bdy_msk)
+    other = bdy_manifest.Manifest(bdy_manifest.get_file(settings), key_rimwidth)
+
+    errors = []
+    if complete != [True, True, True]:
+        errors.append("Finished files not matched.")
+    elif spans[2] != "1979-03-01/1979-03-15" or span_3 != "1979-03-01/1979-04-01":
+        errors.append("Month cut short by the dates not found.")
+    elif extended:
+        errors.append("File of a month cut short matched a longer month.")
+    elif changed:
+        errors.append("Changed file matched.")
+    elif key_workers != key:
+        errors.append("Key changed with the number of workers.")
+    elif key_rimwidth == key:
+        errors.append("Key not changed with the settings.")
+    elif other.load():
+        errors.append("Files of other settings matched.")
+    # assert no error message has been registered, else print messages
+    assert not errors, "errors occured:\n{}".format("\n".join(errors))
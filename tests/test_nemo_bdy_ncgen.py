@@ -0,0 +1,89 @@
+# ===================================================================
+# Copyright 2025 National Oceanography Centre
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# ===================================================================
+
+"""
+Created on Sun Oct 18 19:10:00 2026.
+
+Tests for the bdy output files.
+"""
+
+# External imports
+import numpy as np
+from netCDF4 import Dataset
+
+# Local imports
+from src.pybdy import nemo_bdy_ncgen as ncgen
+from src.pybdy import nemo_bdy_ncpop as ncpop
+
+
+def create_file(filename, options):
+    # Create a T grid file with 7 bdy points and 3 depths and write to it
+    ncid = ncgen.CreateBDYNetcdfFile(
+        filename,
+        7,
+        5,
+        4,
+        3,
+        1,
+        "",
+        "1960-01-01 00:00:00",
+        -1e20,
+        "gregorian",
+        False,
+        "T",
+        options,
+        keep_open=True,
+    )
+    temp = np.linspace(0, 30, 2 * 3 * 7).reshape(2, 3, 7)
+    temp[:, 2, :] = -1e20
+    ncpop.write_data(ncid, "votemper", temp)
+    ncpop.write_data(ncid, "time_counter", np.array([0.0, 86400.0]))
+    ncid.close()
+    return temp
+
+
+def test_output_options(tmp_path):
+    # Test the compression, quantisation and chunks of the output data
+    options = {"compression": "zlib", "complevel": 5, "lsd": 2, "chunk_xb": 4}
+    temp = create_file(str(tmp_path / "bdy_z.nc"), options)
+    create_file(str(tmp_path / "bdy.nc"), {})
+
+    nc = Dataset(str(tmp_path / "bdy_z.nc"))
+    var = nc.variables["votemper"]
+    filters = var.filters()
+    chunks = var.chunking()
+    data = var[:]
+    nc.close()
+    nc = Dataset(str(tmp_path / "bdy.nc"))
+    plain_chunks = nc.variables["votemper"].chunking()
+    plain_data = nc.variables["votemper"][:]
+    nc.close()
+
+    errors = []
+    if not filters["zlib"] or filters["complevel"] != 5:
+        errors.append("Data not compressed.")
+    elif chunks != [1, 3, 1, 4]:
+        errors.append("Chunks do not match.")
+    elif not np.array_equal(np.ma.getmaskarray(data)[:, :, 0, :], temp == -1e20):
+        errors.append("Fill values not kept.")
+    elif np.max(np.abs(data[:, :2, 0, :] - temp[:, :2, :])) > 0.005:
+        errors.append("Quantised data differ by more than the digits kept.")
+    elif np.array_equal(data[:, :2, 0, :], temp[:, :2, :].astype(np.float32)):
+        errors.append("Data not quantised.")
+    elif plain_chunks == chunks:
+        errors.append("Chunks set without options.")
+    elif not np.array_equal(plain_data[:, :2, 0, :], temp[:, :2, :].astype(np.float32)):
+        errors.append("Data without options do not match.")
+    # assert no error message has been registered, else print messages
+    assert not errors, "errors occured:\n{}".format("\n".join(errors))
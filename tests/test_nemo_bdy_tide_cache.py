@@ -0,0 +1,104 @@
+# ===================================================================
+# Copyright 2025 National Oceanography Centre
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# ===================================================================
+
+"""
+Created on Sun Oct 18 18:10:00 2026.
+
+Tests for the tide cache.
+"""
+
+# External imports
+import os
+
+import numpy as np
+from netCDF4 import Dataset
+
+# Local imports
+from src.pybdy.tide import fes2014_extract_HC
+from src.pybdy.tide import nemo_bdy_tide_cache as tide_cache
+
+VARS = {
+    "ocean_tide_extrapolated": ("amplitude", "phase"),
+    "eastward_velocity": ("Ua", "Ug"),
+    "northward_velocity": ("Va", "Vg"),
+}
+
+
+def write_atlas(path, cons):
+    # Write a global 1 degree FES atlas with land in the north east
+    lon = np.arange(0, 360, 1.0)
+    lat = np.arange(-89.5, 90, 1.0)
+    for i, con in enumerate(cons):
+        for d, (amp_var, pha_var) in VARS.items():
+            os.makedirs(str(path / d), exist_ok=True)
+            nc = Dataset(str(path / d / (con.lower() + ".nc")), "w")
+            nc.createDimension("lat", len(lat))
+            nc.createDimension("lon", len(lon))
+            nc.createVariable("lon", "f8", ("lon",))[:] = lon
+            nc.createVariable("lat", "f8", ("lat",))[:] = lat
+            amp = 50 + (i + 1) * np.cos(np.radians(lat))[:, None] * np.ones(len(lon))
+            amp[140:, 5:] = 1e10
+            nc.createVariable(amp_var, "f8", ("lat", "lon"))[:] = amp
+            pha = (lon[None, :] + lat[:, None] + 30 * i) % 360
+            nc.createVariable(pha_var, "f8", ("lat", "lon"))[:] = pha
+            nc.close()
+
+
+def test_cache(tmp_path):
+    # Test the cached atlas gives the same constituents as the FES files
+    write_atlas(tmp_path, ["M2", "S2", "K1"])
+    settings = {
+        "tide_model": "FES2014",
+        "tide_fes": str(tmp_path) + "/",
+        "clname": {"1": "'K1'", "2": "'M2'"},
+        "dst_dir": str(tmp_path) + "/",
+        "fn": "test",
+    }
+    # Domain across the prime meridian
+    lon, lat = np.meshgrid(np.arange(-3, 3, 0.3), np.arange(45, 52, 0.3))
+    lonlat = {grd: {"lon": lon + 0.1 * j, "lat": lat} for j, grd in enumerate("tuv")}
+    atlas = tide_cache.get(settings, lonlat)
+    cache_dir = tide_cache.get_dir(settings, *tide_cache.domain_points(lonlat))
+    atlas_2 = tide_cache.load(cache_dir)
+
+    pts_lon = np.array([357.4, 359.9, 1.3])
+    pts_lat = np.array([46.2, 49.5, 50.8])
+    direct = fes2014_extract_HC.FesExtract(settings, pts_lat, pts_lon.copy(), "u")
+    cached = fes2014_extract_HC.FesExtract(
+        settings, pts_lat, pts_lon.copy(), "u", atlas_2["u"]
+    )
+
+    # Another domain has a different cache
+    lonlat["t"]["lat"] = lat + 1
+    cache_dir_2 = tide_cache.get_dir(settings, *tide_cache.domain_points(lonlat))
+
+    errors = []
+    if not os.path.isfile(cache_dir + "t_data.npy"):
+        errors.append("Cache not written.")
+    elif list(atlas["t"]["cons"]) != ["K1", "M2", "S2"]:
+        errors.append("Not all constituents cached.")
+    elif not isinstance(atlas_2["v"]["data"], np.memmap):
+        errors.append("Cache not memory mapped.")
+    elif atlas_2["t"]["data"].shape[1] > 20:
+        errors.append("Atlas not cropped.")
+    elif cached.cons != direct.cons:
+        errors.append("Constituents do not match.")
+    elif not np.allclose(cached.amp, direct.amp, equal_nan=True):
+        errors.append("Amplitudes do not match.")
+    elif not np.allclose(cached.gph, direct.gph, equal_nan=True):
+        errors.append("Phases do not match.")
+    elif cache_dir_2 == cache_dir:
+        errors.append("Cache not changed with the domain.")
+    # assert no error message has been registered, else print messages
+    assert not errors, "errors occured:\n{}".format("\n".join(errors))
@@ -0,0 +1,95 @@
+# ===================================================================
+# Copyright 2025 National Oceanography Centre
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# ===================================================================
+
+"""
+Created on Sun Oct 18 10:40:00 2026.
+
+Tests for the weight cache.
+"""
+
+# External imports
+import os
+
+import numpy as np
+import scipy.sparse as sparse
+
+# Local imports
+from src.pybdy import nemo_bdy_weight_cache as weight_cache
+
+
+def test_save_load(tmp_path):
+    # Test a nested cache is written and read back unchanged
+    op = sparse.random(20, 30, density=0.1, format="csr", random_state=1)
+    cache = {
+        "version": weight_cache.CACHE_VERSION,
+        "zinterp": True,
+        "bdy": {"t": {"bdy_i": np.arange(10).reshape(5, 2), "bdy_r": np.zeros(5)}},
+        "extract": {
+            "t": {
+                "sc_ind_ch": [{"ind": np.ones((4, 9), dtype=int), "imin": 3}],
+                "dst_z": np.ma.masked_invalid([1.0, np.nan, 3.0]),
+                "interp_op": [
+                    {False: {"op": op, "shape": (2, 10)}, True: {"op": [op, op]}}
+                ],
+                "bdy_msk": None,
+            }
+        },
+    }
+    filename = str(tmp_path / "weights.npz")
+    weight_cache.save(filename, cache)
+    out = weight_cache.load(filename)
+
+    ext = out["extract"]["t"]
+    errors = []
+    if out["zinterp"] is not True:
+        errors.append("Scalar not restored.")
+    elif not (out["bdy"]["t"]["bdy_i"] == cache["bdy"]["t"]["bdy_i"]).all():
+        errors.append("Array not restored.")
+    elif ext["sc_ind_ch"][0]["imin"] != 3:
+        errors.append("List of dicts not restored.")
+    elif not (np.ma.getmaskarray(ext["dst_z"]) == [False, True, False]).all():
+        errors.append("Masked array not restored.")
+    elif (ext["interp_op"][0][False]["op"] != op).nnz != 0:
+        errors.append("Sparse matrix not restored.")
+    elif len(ext["interp_op"][0][True]["op"]) != 2:
+        errors.append("Bool keys not restored.")
+    elif ext["bdy_msk"] is not None:
+        errors.append("None not restored.")
+    # assert no error message has been registered, else print messages
+    assert not errors, "errors occured:\n{}".format("\n".join(errors))
+
+
+def test_get_file(tmp_path):
+    # Test the cache file changes with the inputs
+    grid = tmp_path / "grid.nc"
+    grid.write_bytes(b"grid")
+    settings = {name: str(grid) for name in weight_cache.KEY_FILES}
+    settings.update({name: 1 for name in weight_cache.KEY_SETTINGS})
+    settings.update({"dst_dir": str(tmp_path) + "/", "fn": "test"})
+    bdy_msk = np.ones((5, 5))
+
+    f1 = weight_cache.get_file(settings, bdy_msk)
+    settings["rimwidth"] = 9
+    f2 = weight_cache.get_file(settings, bdy_msk)
+    grid.write_bytes(b"grid2")
+    f3 = weight_cache.get_file(settings, bdy_msk)
+    bdy_msk[0, 0] = 0
+    f4 = weight_cache.get_file(settings, bdy_msk)
+    # Same contents written again later
+    stat = os.stat(grid)
+    os.utime(grid, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    f5 = weight_cache.get_file(settings, bdy_msk)
+
+    assert len({f1, f2, f3, f4, f5}) == 5, "Cache file does not depend on the inputs."
+    assert weight_cache.load(f1) is None, "Missing cache should not load."
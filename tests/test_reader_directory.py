@@ -0,0 +1,140 @@
+# ===================================================================
+# Copyright 2025 National Oceanography Centre
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# ===================================================================
+
+"""
+Created on Sun Oct 18 14:05:00 2026.
+
+Tests for the directory reader.
+"""
+
+# External imports
+import datetime as dt
+import os
+
+import numpy as np
+from netCDF4 import Dataset
+
+# Local imports
+from src.pybdy.reader import directory
+
+
+def write_files(path, n_file=2):
+    # Write files of source data with 3 daily time entries each
+    data = np.arange(n_file * 3 * 2 * 4 * 5, dtype=float).reshape(-1, 2, 4, 5)
+    for m in range(n_file):
+        for grd in ["T", "U", "V", "I"]:
+            nc = Dataset(str(path / ("src_m%s_grid_%s.nc" % (m, grd))), "w")
+            nc.createDimension("time_counter", None)
+            nc.createDimension("deptht", 2)
+            nc.createDimension("y", 4)
+            nc.createDimension("x", 5)
+            time = nc.createVariable("time_counter", "f8", ("time_counter",))
+            time.units = "seconds since 2000-01-01 00:00:00"
+            time.calendar = "gregorian"
+            time[:] = (np.arange(3) + 3 * m) * 86400.0
+            var = nc.createVariable(
+                "votemper", "f8", ("time_counter", "deptht", "y", "x")
+            )
+            var[:] = data[3 * m : 3 * m + 3]
+            nc.close()
+    return data
+
+
+def test_read_across_files(tmp_path):
+    # Test reads spanning two files match the source data
+    data = write_files(tmp_path)
+    reader = directory.Reader(str(tmp_path) + "/", 0, max_open=1)
+    var = reader["t"]["votemper"]
+
+    errors = []
+    if not np.array_equal(var[1:5, :, 1:3, :], data[1:5, :, 1:3, :]):
+        errors.append("Read across files does not match.")
+    elif not np.array_equal(var[4, :, :, 2], data[4:5, :, :, 2:3]):
+        errors.append("Single time entry does not match.")
+    elif len(directory.dataset_pool._datasets) != 1:
+        errors.append("Too many files held open.")
+    elif var._get_dtype() != np.float64:
+        errors.append("Type of the data not found.")
+    # assert no error message has been registered, else print messages
+    assert not errors, "errors occured:\n{}".format("\n".join(errors))
+    directory.dataset_pool.close()
+    directory.dataset_pool.max_open = directory.MAX_OPEN_FILES
+
+
+def test_pool_reuse(tmp_path):
+    # Test a file is opened once and the least recently used is closed
+    write_files(tmp_path)
+    pool = directory.DatasetPool(max_open=2)
+    f0, f1, f2 = [
+        str(tmp_path / ("src_m%s_grid_%s.nc" % f))
+        for f in [(0, "T"), (1, "T"), (0, "U")]
+    ]
+    ds0 = pool.get(f0)
+    pool.get(f1)
+    same = pool.get(f0) is ds0
+    pool.get(f2)
+    held = list(pool._datasets)
+    pool.close()
+
+    assert same, "Open file not reused."
+    assert held == [f0, f2], "Least recently used file not closed."
+    assert not ds0.isopen(), "Pool not closed."
+
+
+def test_time_index(tmp_path):
+    # Test the times are read from the index unless a file changes
+    write_files(tmp_path)
+    src_dir = str(tmp_path) + "/"
+    reader = directory.Reader(src_dir, 0)
+    time_1 = list(reader["t"].time_counter)
+
+    # Files are not opened when the index is up to date
+    get = directory.dataset_pool.get
+    directory.dataset_pool.get = None
+    try:
+        reader = directory.Reader(src_dir, 3600)
+    finally:
+        directory.dataset_pool.get = get
+    time_2 = list(reader["t"].time_counter)
+
+    # A rewritten file is read again
+    filename = str(tmp_path / "src_m1_grid_T.nc")
+    nc = Dataset(filename, "a")
+    nc.variables["time_counter"][:] = np.arange(3) * 86400.0 + 10 * 86400.0
+    nc.close()
+    os.utime(filename, ns=(0, 0))
+    reader = directory.Reader(src_dir, 0)
+    time_3 = list(reader["t"].time_counter)
+    directory.dataset_pool.close()
+
+    assert os.path.isfile(src_dir + directory.INDEX_FILE), "Index not written."
+    assert time_1 == (np.arange(6) * 86400.0).tolist(), "Times not read."
+    assert time_2 == (np.arange(6) * 86400.0 + 3600).tolist(), "Index not used."
+    assert time_3[3:] == (np.arange(3) * 86400.0 + 864000).tolist(), "Stale index."
+    assert reader["t"].date_counter[3].day == 11, "Dates not converted."
+
+
+def test_date_range(tmp_path):
+    # Test only the files overlapping the dates and either side are used
+    write_files(tmp_path, n_file=5)
+    date_range = (dt.datetime(2000, 1, 8), dt.datetime(2000, 1, 9))
+    reader = directory.Reader(str(tmp_path) + "/", 0, date_range=date_range)
+    files = sorted({os.path.basename(f) for f, i in reader["t"].data_list})
+    directory.dataset_pool.close()
+
+    assert files == [
+        "src_m1_grid_T.nc",
+        "src_m2_grid_T.nc",
+        "src_m3_grid_T.nc",
+    ], "Wrong files selected."
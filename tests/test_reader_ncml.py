@@ -0,0 +1,124 @@
+# ===================================================================
+# Copyright 2025 National Oceanography Centre
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# ===================================================================
+
+"""
+Created on Sun Oct 18 15:20:00 2026.
+
+Tests for the NcML reader.
+"""
+
+# External imports
+import numpy as np
+from netCDF4 import Dataset
+
+# Local imports
+from src.pybdy.reader import ncml
+
+NCML = """<?xml version="1.0" encoding="UTF-8"?>
+<netcdf xmlns="http://www.unidata.ucar.edu/namespaces/netcdf/ncml-2.2">
+  <aggregation type="union" >
+     <netcdf>
+        <aggregation type="joinExisting" dimName="time_counter" >
+           <netcdf location="./src_m0_grid_T.nc" />
+           <netcdf location="./src_m1_grid_T.nc" />
+           <variable name="temp">
+              <rename name="votemper" />
+              <attribute name="add_offset" type="double" value="2.5" />
+           </variable>
+        </aggregation>
+     </netcdf>
+     <netcdf>
+        <aggregation type="joinExisting" dimName="time_counter" >
+           <scan location="./" regExp=".*grid_U.*" subdirs="false" />
+        </aggregation>
+     </netcdf>
+  </aggregation>
+  <variable name="vozocrtx" orgName="u" />
+</netcdf>
+"""
+
+
+def write_files(path):
+    # Write two files each of T and U grid data with 3 time entries
+    data = np.arange(6 * 2 * 4 * 5, dtype=float).reshape(6, 2, 4, 5)
+    for m in range(2):
+        for grd, name in [("T", "temp"), ("U", "u")]:
+            nc = Dataset(str(path / ("src_m%s_grid_%s.nc" % (m, grd))), "w")
+            nc.createDimension("time_counter", None)
+            nc.createDimension("deptht", 2)
+            nc.createDimension("y", 4)
+            nc.createDimension("x", 5)
+            time = nc.createVariable("time_counter", "f8", ("time_counter",))
+            time.units = "seconds since 2000-01-01 00:00:00"
+            time.calendar = "gregorian"
+            time[:] = (np.arange(3) + 3 * m) * 86400.0
+            var = nc.createVariable(name, "i2", ("time_counter", "deptht", "y", "x"))
+            var.scale_factor = 0.5
+            var[:] = data[3 * m : 3 * m + 3] * 0.5
+            nc.close()
+    ncml_file = path / "src.ncml"
+    ncml_file.write_text(NCML)
+    return data, str(ncml_file)
+
+
+def test_reader(tmp_path):
+    # Test the aggregation, renames and attributes of the NcML file
+    data, ncml_file = write_files(tmp_path)
+    reader = ncml.Reader(ncml_file, 0)
+    grid = reader["t"]
+    temp = grid["votemper"]
+    meta = grid.get_meta_data("votemper", {})
+
+    errors = []
+    if not np.array_equal(grid.time_counter, np.arange(6) * 86400.0):
+        errors.append("Time counter not joined.")
+    elif grid.date_counter[4].day != 5:
+        errors.append("Dates not converted.")
+    elif len(temp) != 6 or temp._get_dimensions()[0] != "time_counter":
+        errors.append("Dimensions not joined.")
+    elif not np.array_equal(temp[1:5, :, 1:3, :], data[1:5, :, 1:3, :]):
+        errors.append("Read across files does not match.")
+    elif temp[1:5, :, 1:3, :].dtype != np.int16 or temp._get_dtype() != np.int16:
+        errors.append("Data not read in the type of the files.")
+    elif not np.array_equal(temp[4, 1, :, 2], data[4, 1, :, 2]):
+        errors.append("Integer index does not match.")
+    elif not np.array_equal(temp[np.array([0, 5]), 0, 0, 0], data[[0, 5], 0, 0, 0]):
+        errors.append("Array index does not match.")
+    elif not np.array_equal(grid["vozocrtx"][:, :, 0, 0], data[:, :, 0, 0]):
+        errors.append("Scan or orgName rename not applied.")
+    elif meta["sf"] != 0.5 or meta["os"] != 2.5:
+        errors.append("Attributes not read.")
+    elif grid["nothing"]._get_dimensions() is not None:
+        errors.append("Missing variable found.")
+    # assert no error message has been registered, else print messages
+    assert not errors, "errors occured:\n{}".format("\n".join(errors))
+    reader.close()
+
+
+def test_reader_max_open(tmp_path):
+    # Test the files read are limited to the number held open
+    data, ncml_file = write_files(tmp_path)
+    reader = ncml.Reader(ncml_file, 0, max_open=1)
+    temp = reader["t"]["votemper"]
+
+    errors = []
+    if ncml.dataset_pool.max_open != 1:
+        errors.append("Maximum number of open files not set.")
+    elif not np.array_equal(temp[:, :, 0, 0], data[:, :, 0, 0]):
+        errors.append("Read across files does not match.")
+    elif len(ncml.dataset_pool._datasets) > 1:
+        errors.append("More files held open than the maximum.")
+    # assert no error message has been registered, else print messages
+    assert not errors, "errors occured:\n{}".format("\n".join(errors))
+    reader.close()
@@ -0,0 +1,181 @@
+# ===================================================================
+# Copyright 2025 National Oceanography Centre
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#  http://www.apache.org/licenses/LICENSE-2.0.
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied. See the License for the specific language governing
+# permissions and limitations under the License.
+# ===================================================================
+
+"""
+Created on Sun Oct 18 16:40:00 2026.
+
+Tests for cropping the tide model atlas to the boundary points.
+"""
+
+# External imports
+import os
+
+import numpy as np
+from netCDF4 import Dataset
+from scipy import interpolate
+
+# Local imports
+from src.pybdy.tide import nemo_bdy_tide3
+
+
+def test_atlas_window():
+    # Test the window of a global grid for points either side of the seam
+    x = np.arange(0, 360, 1.0)
+    y = np.arange(-89.5, 90, 1.0)
+    data = np.cos(np.radians(x))[:, np.newaxis] * np.cos(np.radians(y))
+    lon = np.array([358.5, 359.2, 1.5])
+    lat = np.array([50.2, 51.7, 49.1])
+    cols, rows, x_win, lon_win = nemo_bdy_tide3.atlas_window(x, y, lon, lat, 1)
+    result = interpolate.interpn(
+        (x_win, y[rows]), data[cols, rows], np.stack((lon_win, lat), axis=1)
+    )
+    # Interpolation on the whole grid with a wrapped point either side
+    x_pad = np.arange(-1, 361, 1.0)
+    data_pad = data[np.arange(-1, 361) % 360, :]
+    expected = interpolate.interpn((x_pad, y), data_pad, np.stack((lon, lat), axis=1))
+
+    # Points away from the seam on a regional grid
+    x_reg = np.arange(-20, 10, 0.5)
+    cols_reg, rows_reg, x_reg_win, lon_reg = nemo_bdy_tide3.atlas_window(
+        x_reg, y, np.array([-3.2, -1.1]), lat[:2], 0
+    )
+
+    errors = []
+    if len(cols) != 11 or not np.array_equal(x_win, np.arange(-5, 6.0)):
+        errors.append("Window does not wrap around the seam.")
+    elif rows != slice(135, 146):
+        errors.append("Wrong latitude window.")
+    elif not np.allclose(lon_win, [-1.5, -0.8, 1.5]):
+        errors.append("Point longitudes not shifted to the window.")
+    elif not np.allclose(result, expected):
+        errors.append("Interpolation on the window does not match.")
+    elif cols_reg[0] != 30 or cols_reg[-1] != 41:
+        errors.append("Wrong regional window.")
+    elif not np.array_equal(x_reg_win, x_reg[cols_reg]):
+        errors.append("Wrong regional window longitudes.")
+    # assert no error message has been registered, else print messages
+    assert not errors, "errors occured:\n{}".format("\n".join(errors))
+
+
+def test_bilinear_stencil():
+    # Test the stencil matches bilinear interpolation and skips land corners
+    # but keeps water corners with a value of zero
+    x = np.arange(0, 10, 1.0)
+    y = np.arange(40, 45, 0.5)
+    data = np.stack(
+        (
+            x[:, np.newaxis] + 2 * y,
+            (x[:, np.newaxis] - y) * 1j,
+        )
+    )
+    lon = np.array([0.0, 2.5, 4.2, 9.0])
+    lat = np.array([40.0, 41.1, 42.3, 44.5])
+    stencil = nemo_bdy_tide3.BilinearStencil(x, y, lon, lat)
+    result = stencil.apply(data)
+    expected = np.stack(
+        [interpolate.interpn((x, y), d, np.stack((lon, lat), axis=1)) for d in data]
+    )
+
+    # Land in one corner of the second point and all corners of the third
+    mask = np.ones(data.shape[1:])
+    mask[2, 2] = 0
+    mask[4:6, 4:7] = 0
+    land = data.copy()
+    land[:, mask == 0] = 0
+    result_land = stencil.apply(land, mask)
+
+    # A water corner with a value of zero is kept
+    zero = data.copy()
+    zero[:, 3, 2] = 0
+    result_zero = stencil.apply(zero, mask)
+    expected_zero = np.stack(
+        [interpolate.interpn((x, y), d, np.stack((lon, lat), axis=1)) for d in zero]
+    )
+
+    errors = []
+    if not np.allclose(result, expected):
+        errors.append("Stencil does not match bilinear interpolation.")
+    elif not np.allclose(stencil.wet(mask), [1, 0.6, 0, 1]):
+        errors.append("Wrong wet fraction.")
+    elif not np.allclose(result_land[:, 0::3], expected[:, 0::3]):
+        errors.append("Points away from land changed.")
+    elif not np.allclose(result_land[0, 1], (0.4 * 85 + 0.1 * 85 + 0.1 * 86) / 0.6):
+        errors.append("Land corner not left out.")
+    elif not np.all(np.isnan(result_land[:, 2])):
+        errors.append("Point on land not NaN.")
+    elif not np.allclose(result_zero[:, 0::3], expected_zero[:, 0::3]):
+        errors.append("Points away from the zero corner changed.")
+    elif not np.allclose(result_zero[0, 1], (0.4 * 0 + 0.1 * 85 + 0.1 * 86) / 0.6):
+        errors.append("Water corner with a value of zero left out.")
+    # assert no error message has been registered, else print messages
+    assert not errors, "errors occured:\n{}".format("\n".join(errors))
+
+
+def test_extract_window_seam(tmp_path):
+    # Test extracting on the window of a global atlas matches the whole atlas
+    # for a boundary crossing the longitude seam
+    x = np.arange(0, 360, 1.0)
+    y = np.arange(-89.5, 90, 1.0)
+    amp = 50 + 20 * np.cos(np.radians(x)) * np.cos(np.radians(y))[:, np.newaxis]
+    pha = 180 + 90 * np.sin(np.radians(x)) * np.cos(np.radians(y))[:, np.newaxis]
+    # Land west of the seam next to the second point
+    amp[141, 358:] = 1e10
+
+    os.mkdir(tmp_path / "ocean_tide_extrapolated")
+    ds = Dataset(tmp_path / "ocean_tide_extrapolated" / "m2.nc", "w")
+    ds.createDimension("lat", len(y))
+    ds.createDimension("lon", len(x))
+    ds.createVariable("lat", "f8", ("lat",))[:] = y
+    ds.createVariable("lon", "f8", ("lon",))[:] = x
+    ds.createVariable("amplitude", "f8", ("lat", "lon"))[:] = amp
+    ds.createVariable("phase", "f8", ("lat", "lon"))[:] = pha
+    ds.close()
+
+    settings = {
+        "tide_model": "fes2014",
+        "tide_fes": str(tmp_path),
+        "clname": {"1": "'M2'"},
+    }
+    lon = np.array([358.5, 359.2, 359.9, 0.3, 1.5])
+    lat = np.array([50.2, 51.7, 49.1, 50.8, 49.6])
+    window = nemo_bdy_tide3.extract_constituents(settings, lat, lon.copy(), "t")
+
+    # The whole atlas with a wrapped column either side
+    cols = np.arange(-1, 361) % 360
+    data = (amp * 0.01 * np.exp(1j * np.radians(pha))).T[cols, :]
+    mask = np.ones(data.shape)
+    mask[amp.T[cols, :] > 9999] = 0
+    data[mask == 0] = np.nan
+    atlas = {
+        "cons": ["M2"],
+        "lon": np.arange(-1, 361, 1.0),
+        "lat": y,
+        "data": data[np.newaxis],
+        "mask": mask,
+    }
+    whole = nemo_bdy_tide3.extract_constituents(settings, lat, lon.copy(), "t", atlas)
+
+    errors = []
+    if window.cons != ["M2"]:
+        errors.append("Wrong constituents.")
+    elif not np.all(np.isfinite(window.amp)):
+        errors.append("Points on the seam not extracted.")
+    elif not np.allclose(window.amp, whole.amp):
+        errors.append("Amplitude on the window does not match the whole atlas.")
+    elif not np.allclose(
+        np.exp(1j * np.radians(window.gph)), np.exp(1j * np.radians(whole.gph))
+    ):
+        errors.append("Phase on the window does not match the whole atlas.")
+    # assert no error message has been registered, else print messages
+    assert not errors, "errors occured:\n{}".format("\n".join(errors))
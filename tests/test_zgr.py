@@ -28,6 +28,7 @@ import subprocess
 import warnings
 
 import numpy as np
+from netCDF4 import Dataset
 
 # Internal imports
 from grid import hgr, zgr
@@ -160,6 +161,46 @@ def test_depth_file_zps():
         assert not errors, "errors occured:\n{}".format("\n".join(errors))
 
 
+def test_z_grid_loader(tmp_path):
+    # Test the shared loader gives the same grids as reading each separately
+    logger = logging.getLogger(__name__)
+    name_map = "./tests/data/grid_name_map.json"
+    in_file = str(tmp_path / "zgr.nc")
+    e3t = np.tile(np.arange(1.0, 9.0), (1, 6, 11, 1)) + np.arange(6)[:, None, None]
+    e3t = np.moveaxis(e3t, -1, 1)
+    nc = Dataset(in_file, "w")
+    for dim, size in zip(["t", "z", "y", "x"], e3t.shape):
+        nc.createDimension(dim, size)
+    for name, data in [("e3t", e3t), ("e3w", e3t * 0.9)]:
+        nc.createVariable(name, "f8", ("t", "z", "y", "x"))[:] = data
+    nc.close()
+
+    loader = zgr.ZGridLoader(in_file, name_map, dst=1)
+    zg = {}
+    for grd in ["t", "u", "v"]:
+        zg[grd] = zgr.Z_Grid(
+            in_file, "sco", name_map, "C", logger, grd, [2, 9, 1, 5], loader=loader
+        )
+    zg_t = zgr.Z_Grid(in_file, "sco", name_map, "C", logger, "t", [2, 9, 1, 5])
+    zg_u = zgr.Z_Grid(in_file, "sco", name_map, "C", logger, "u", [2, 9, 1, 5])
+    n_filled = len(loader.filled)
+    loader.close()
+
+    errors = []
+    if sorted(zg["t"].var_list) != sorted(zg_t.var_list):
+        errors.append("Variables do not match.")
+    elif not all(np.array_equal(zg["t"].grid[v], zg_t.grid[v]) for v in zg_t.var_list):
+        errors.append("t grid does not match.")
+    elif not all(np.array_equal(zg["u"].grid[v], zg_u.grid[v]) for v in zg_u.var_list):
+        errors.append("u grid does not match.")
+    elif zg["t"].grid["gdept"].shape != (1, 8, 4, 7):
+        errors.append("Window not read.")
+    elif n_filled != 1:
+        errors.append("Variables not shared between grids.")
+    # assert no error message has been registered, else print messages
+    assert not errors, "errors occured:\n{}".format("\n".join(errors))
+
+
 def test_e3_to_gdep():
     e3t = np.array(
         [
@@ -24,15 +24,19 @@ Called test_zz_end_to_end so it is the last unit test to run.
 
 # External imports
 import datetime as dt
+import glob
 import os
+import shutil
 import subprocess
 import warnings
 
 import numpy as np
+import pytest
 import xarray as xr
 from grid import hgr, zgr
 
 # Internal imports
+from src.pybdy import profiler
 from tests.synth import synth_bathymetry, synth_temp_sal, synth_zgrid
 
 
@@ -437,6 +441,95 @@ def test_tide():
         assert summary_grid == test_grid, "May need to update regression values."
 
 
+def test_tide_cache():
+    """
+    Test the full pybdy processing with ln_tide_cache.
+
+    The test_tide case is run without the tide cache and then twice with
+    it. The first run with the cache must write the cropped atlas and the
+    second must load it. The tidal output must match the run without it.
+    """
+    tide_dir = "./inputs/FES2014"
+    if (not os.path.isdir(tide_dir)) | (os.getenv("GITHUB_ACTIONS") is True):
+        # If the benchmark isn't present we can't test
+        warnings.warn(Warning("FES2014 tide data not present so can't test tide."))
+        assert True
+    else:
+        log_file = "./nrct.log"
+        coords = "./tests/data/coordinates.bdy.nc"
+        cache_dirs = "./tests/data/data_output_tide_cache_*/"
+        outputs = [
+            "./tests/data/data_output_bdytide_FES2014_M2_grd_Z.nc",
+            "./tests/data/data_output_bdytide_FES2014_M2_grd_U.nc",
+            "./tests/data/data_output_bdytide_FES2014_M2_grd_V.nc",
+            "./tests/data/data_output_bdyT_y1979m11.nc",
+            "./tests/data/data_output_bdyU_y1979m11.nc",
+            "./tests/data/data_output_bdyV_y1979m11.nc",
+        ]
+
+        path1, path2, path3 = generate_sc_test_case(ztype="zco")
+        path4 = generate_dst_test_case(ztype="zco")
+
+        data = {}
+        log = {}
+        cache = {}
+        for run, tide_cache in [("none", False), ("cold", True), ("warm", True)]:
+            name_list_path = modify_namelist(
+                path1, path3, path4, "zco", "zco", tide=True, tide_cache=tide_cache
+            )
+            log_start = os.path.getsize(log_file) if os.path.isfile(log_file) else 0
+
+            # Run pybdy
+            subprocess.run(
+                "pybdy -s " + name_list_path,
+                shell=True,
+                check=True,
+                text=True,
+            )
+            with open(log_file) as f:
+                f.seek(log_start)
+                log[run] = f.read()
+            cache[run] = {
+                f: os.stat(f).st_mtime_ns
+                for f in glob.glob(os.path.join(cache_dirs, "*.npy"))
+            }
+
+            data[run] = {}
+            for output in outputs[:3]:
+                ds = xr.open_dataset(output)
+                for name in ds.data_vars:
+                    data[run][output + ":" + name] = ds[name].to_numpy()
+                ds.close()
+            for output in outputs:
+                os.remove(output)
+
+        # Clean up files
+        os.remove(path1)
+        os.remove(path2)
+        os.remove(path4)
+        os.remove(coords)
+        for d in glob.glob(cache_dirs):
+            shutil.rmtree(d)
+
+        errors = []
+        if len(cache["none"]) != 0:
+            errors.append("Tide cache written without ln_tide_cache.")
+        elif (len(cache["cold"]) == 0) or ("Written tide cache" not in log["cold"]):
+            errors.append("Tide cache not written.")
+        elif "Using tide cache" not in log["warm"]:
+            errors.append("Tide cache not loaded.")
+        elif (cache["warm"] != cache["cold"]) or ("Written tide cache" in log["warm"]):
+            errors.append("Tide cache written again.")
+        for run in ["cold", "warm"]:
+            for name, value in data["none"].items():
+                if name not in data[run]:
+                    errors.append("%s not written in the %s run." % (name, run))
+                elif not np.allclose(value, data[run][name], equal_nan=True):
+                    errors.append("%s differs in the %s run." % (name, run))
+        # assert no error message has been registered, else print messages
+        assert not errors, "errors occured:\n{}".format("\n".join(errors))
+
+
 def test_claw():
     """
     Test the full pybdy processing using a regression test.
@@ -608,6 +701,629 @@ def test_wrap_sc():
     assert summary_grid == test_grid, "May need to update regression values."
 
 
+def test_single_precision():
+    """
+    Test the full pybdy processing with ln_single_precision.
+
+    This is the test_wrap_sc case interpolated in float32. The output is
+    compared with the float64 regression values of test_wrap_sc. Only
+    rounding differences are acceptable, so the values must agree to a
+    relative tolerance of 1e-6 and the masks must match exactly.
+    """
+    path1, path2, path3 = generate_sc_test_case(ztype="zco", wrap=1)
+    path4 = generate_dst_test_case(ztype="zco")
+    name_list_path = modify_namelist(
+        path1, path3, path4, "zco", "zco", single_precision=True
+    )
+
+    # Run pybdy
+    subprocess.run(
+        "pybdy -s " + name_list_path,
+        shell=True,
+        check=True,
+        text=True,
+    )
+
+    coords = "./tests/data/coordinates.bdy.nc"
+    output_t = "./tests/data/data_output_bdyT_y1979m11.nc"
+    output_u = "./tests/data/data_output_bdyU_y1979m11.nc"
+    output_v = "./tests/data/data_output_bdyV_y1979m11.nc"
+
+    # Check output
+    ds_t = xr.open_dataset(output_t)
+    ds_u = xr.open_dataset(output_u)
+    ds_v = xr.open_dataset(output_v)
+    temp = ds_t["votemper"].to_masked_array()
+
+    summary_grid = {
+        "Sum_unmask": np.ma.count(temp),
+        "Sum_mask": np.ma.count_masked(temp),
+        "Mean_temp": float(ds_t["votemper"].mean().to_numpy()),
+        "Mean_sal": float(ds_t["vosaline"].mean().to_numpy()),
+        "Mean_u": float(ds_u["vozocrtx"].mean().to_numpy()),
+        "Mean_v": float(ds_v["vomecrty"].mean().to_numpy()),
+        "Temp_Strip1": ds_t["votemper"].to_numpy()[0, 0, 0, 123:127].tolist(),
+        "Temp_Strip2": ds_t["votemper"].to_numpy()[0, 0, 0, 1439:1441].tolist(),
+    }
+
+    # Clean up files
+    os.remove(path1)
+    os.remove(path2)
+    os.remove(path4)
+    os.remove(coords)
+    os.remove(output_t)
+    os.remove(output_u)
+    os.remove(output_v)
+
+    print(summary_grid)
+    test_grid = {
+        "Sum_unmask": 447510,
+        "Sum_mask": 740490,
+        "Mean_temp": 19.402727127075195,
+        "Mean_sal": 34.084110260009766,
+        "Mean_u": 0.8305879831314087,
+        "Mean_v": 0.8278060555458069,
+        "Temp_Strip1": [
+            19.80881690979004,
+            24.904409408569336,
+            24.904409408569336,
+            30.0,
+        ],
+        "Temp_Strip2": [30.0, 19.80881690979004],
+    }
+
+    errors = []
+    for key, value in test_grid.items():
+        if key.startswith("Sum"):
+            if summary_grid[key] != value:
+                errors.append("%s does not match." % key)
+        elif not np.allclose(summary_grid[key], value, rtol=1e-6, atol=0):
+            errors.append("%s differs by more than rounding." % key)
+    # assert no error message has been registered, else print messages
+    assert not errors, "errors occured:\n{}".format("\n".join(errors))
+
+
+def test_resume():
+    """
+    Test the full pybdy processing resumed with --resume.
+
+    This is the test_zco_zco case run once with --resume, then run again
+    after the U file is removed. Only the U file should be written again,
+    the same as before, and the T and V files should be left as they were.
+    """
+    path1, path2, path3 = generate_sc_test_case(ztype="zco")
+    path4 = generate_dst_test_case(ztype="zco")
+    name_list_path = modify_namelist(path1, path3, path4, "zco", "zco")
+
+    coords = "./tests/data/coordinates.bdy.nc"
+    manifest = "./tests/data/data_output_bdy_manifest.txt"
+    output_t = "./tests/data/data_output_bdyT_y1979m11.nc"
+    output_u = "./tests/data/data_output_bdyU_y1979m11.nc"
+    output_v = "./tests/data/data_output_bdyV_y1979m11.nc"
+
+    # Run pybdy
+    subprocess.run(
+        "pybdy -r -s " + name_list_path,
+        shell=True,
+        check=True,
+        text=True,
+    )
+    mtime_t = os.stat(output_t).st_mtime_ns
+    mtime_v = os.stat(output_v).st_mtime_ns
+    ds_u = xr.open_dataset(output_u)
+    vel_u = ds_u["vozocrtx"].to_numpy()
+    ds_u.close()
+    os.remove(output_u)
+
+    # Resume pybdy
+    subprocess.run(
+        "pybdy -r -s " + name_list_path,
+        shell=True,
+        check=True,
+        text=True,
+    )
+    resumed_u = os.path.isfile(output_u)
+    if resumed_u:
+        ds_u = xr.open_dataset(output_u)
+        vel_u_2 = ds_u["vozocrtx"].to_numpy()
+        ds_u.close()
+    skipped = (os.stat(output_t).st_mtime_ns == mtime_t) and (
+        os.stat(output_v).st_mtime_ns == mtime_v
+    )
+
+    # Clean up files
+    os.remove(path1)
+    os.remove(path2)
+    os.remove(path4)
+    os.remove(coords)
+    os.remove(output_t)
+    os.remove(output_v)
+    if resumed_u:
+        os.remove(output_u)
+    os.remove(manifest)
+
+    errors = []
+    if not resumed_u:
+        errors.append("Removed file not written again.")
+    elif not skipped:
+        errors.append("Finished files written again.")
+    elif not np.array_equal(vel_u, vel_u_2, equal_nan=True):
+        errors.append("Resumed data do not match.")
+    # assert no error message has been registered, else print messages
+    assert not errors, "errors occured:\n{}".format("\n".join(errors))
+
+
+def test_resume_date_end():
+    """
+    Test a month cut short by sn_date_end is written again on --resume.
+
+    This is the test_zco_zco case run with --resume up to the middle of
+    the month, then resumed with sn_date_end moved to the end of the month.
+    The month should be written again with all its days and match a run
+    without --resume.
+    """
+    path1, path2, path3 = generate_sc_test_case(ztype="zco")
+    path4 = generate_dst_test_case(ztype="zco")
+
+    coords = "./tests/data/coordinates.bdy.nc"
+    manifest = "./tests/data/data_output_bdy_manifest.txt"
+    output_t = "./tests/data/data_output_bdyT_y1979m11.nc"
+    output_u = "./tests/data/data_output_bdyU_y1979m11.nc"
+    output_v = "./tests/data/data_output_bdyV_y1979m11.nc"
+
+    # Run pybdy to the middle of the month
+    name_list_path = modify_namelist(
+        path1, path3, path4, "zco", "zco", date_end="1979-11-15"
+    )
+    subprocess.run(
+        "pybdy -r -s " + name_list_path,
+        shell=True,
+        check=True,
+        text=True,
+    )
+    ds_t = xr.open_dataset(output_t)
+    nt_part = ds_t.sizes["time_counter"]
+    ds_t.close()
+
+    # Resume pybdy to the end of the month
+    name_list_path = modify_namelist(path1, path3, path4, "zco", "zco")
+    subprocess.run(
+        "pybdy -r -s " + name_list_path,
+        shell=True,
+        check=True,
+        text=True,
+    )
+    ds_t = xr.open_dataset(output_t)
+    temp = ds_t["votemper"].to_numpy()
+    ds_t.close()
+    os.remove(output_t)
+
+    # Run pybdy without resuming
+    subprocess.run(
+        "pybdy -s " + name_list_path,
+        shell=True,
+        check=True,
+        text=True,
+    )
+    ds_t = xr.open_dataset(output_t)
+    temp_full = ds_t["votemper"].to_numpy()
+    ds_t.close()
+
+    # Clean up files
+    os.remove(path1)
+    os.remove(path2)
+    os.remove(path4)
+    os.remove(coords)
+    os.remove(output_t)
+    os.remove(output_u)
+    os.remove(output_v)
+    os.remove(manifest)
+
+    errors = []
+    if nt_part >= temp_full.shape[0]:
+        errors.append("First run not cut short by the end date.")
+    elif temp.shape != temp_full.shape:
+        errors.append("Month cut short not written again.")
+    elif not np.array_equal(temp, temp_full, equal_nan=True):
+        errors.append("Resumed data do not match.")
+    # assert no error message has been registered, else print messages
+    assert not errors, "errors occured:\n{}".format("\n".join(errors))
+
+
+def test_stream_write():
+    """
+    Test the full pybdy processing with ln_stream_write.
+
+    The test_zco_zco case is run with the month held in memory and then
+    streamed one time slice at a time, with and without ln_zinterp. The
+    streamed output must match the buffered output exactly. Without
+    ln_zinterp the streamed path goes over the file a second time to fill
+    the nans with the month mean. The streamed output with ln_zinterp is
+    also checked against the test_zco_zco regression values.
+    """
+    coords = "./tests/data/coordinates.bdy.nc"
+    outputs = [
+        "./tests/data/data_output_bdyT_y1979m11.nc",
+        "./tests/data/data_output_bdyU_y1979m11.nc",
+        "./tests/data/data_output_bdyV_y1979m11.nc",
+    ]
+
+    path1, path2, path3 = generate_sc_test_case(ztype="zco")
+    path4 = generate_dst_test_case(ztype="zco")
+
+    errors = []
+    for zinterp in [True, False]:
+        data = {}
+        for stream_write in [False, True]:
+            name_list_path = modify_namelist(
+                path1,
+                path3,
+                path4,
+                "zco",
+                "zco",
+                zinterp=zinterp,
+                stream_write=stream_write,
+            )
+
+            # Run pybdy
+            subprocess.run(
+                "pybdy -s " + name_list_path,
+                shell=True,
+                check=True,
+                text=True,
+            )
+
+            data[stream_write] = {}
+            for output in outputs:
+                ds = xr.open_dataset(output)
+                for name in ds.data_vars:
+                    data[stream_write][output + ":" + name] = ds[name].to_numpy()
+                if zinterp and stream_write and ("bdyT" in output):
+                    temp = ds["votemper"].to_masked_array()
+                    summary_grid = {
+                        "Mean_temp": float(ds["votemper"].mean().to_numpy()),
+                        "Mean_sal": float(ds["vosaline"].mean().to_numpy()),
+                        "Sum_unmask": np.ma.count(temp),
+                        "Sum_mask": np.ma.count_masked(temp),
+                    }
+                ds.close()
+                os.remove(output)
+
+        for name, value in data[False].items():
+            if name not in data[True]:
+                errors.append("%s not streamed, zinterp %s." % (name, zinterp))
+            elif not np.array_equal(value, data[True][name], equal_nan=True):
+                errors.append("%s differs when streamed, zinterp %s." % (name, zinterp))
+
+    # Clean up files
+    os.remove(path1)
+    os.remove(path2)
+    os.remove(path4)
+    os.remove(coords)
+
+    print(summary_grid)
+    test_grid = {
+        "Mean_temp": 18.003202438354492,
+        "Mean_sal": 34.08450698852539,
+        "Sum_unmask": 447510,
+        "Sum_mask": 740490,
+    }
+    if summary_grid != test_grid:
+        errors.append("Streamed output does not match the regression values.")
+    # assert no error message has been registered, else print messages
+    assert not errors, "errors occured:\n{}".format("\n".join(errors))
+
+
+def test_workers():
+    """
+    Test the full pybdy processing with more than one worker.
+
+    The test_sco_sco case is run with -w 1 and then -w 2, when the grids
+    are processed on forked worker processes. The output must match the
+    serial run exactly.
+    """
+    log_file = "./nrct.log"
+    coords = "./tests/data/coordinates.bdy.nc"
+    outputs = [
+        "./tests/data/data_output_bdyT_y1979m11.nc",
+        "./tests/data/data_output_bdyU_y1979m11.nc",
+        "./tests/data/data_output_bdyV_y1979m11.nc",
+    ]
+
+    path1, path2, path3 = generate_sc_test_case(ztype="sco")
+    path4 = generate_dst_test_case(ztype="sco")
+    name_list_path = modify_namelist(path1, path3, path4, "sco", "sco")
+
+    data = {}
+    log = {}
+    for workers in [1, 2]:
+        log_start = os.path.getsize(log_file) if os.path.isfile(log_file) else 0
+
+        # Run pybdy
+        subprocess.run(
+            "pybdy -w %d -s %s" % (workers, name_list_path),
+            shell=True,
+            check=True,
+            text=True,
+        )
+        with open(log_file) as f:
+            f.seek(log_start)
+            log[workers] = f.read()
+
+        data[workers] = {}
+        for output in outputs:
+            ds = xr.open_dataset(output)
+            for name in ds.data_vars:
+                data[workers][output + ":" + name] = ds[name].to_numpy()
+            ds.close()
+            os.remove(output)
+
+    # Clean up files
+    os.remove(path1)
+    os.remove(path2)
+    os.remove(path4)
+    os.remove(coords)
+
+    errors = []
+    if "on 2 workers" not in log[2]:
+        errors.append("Tasks not run on the workers.")
+    for name, value in data[1].items():
+        if name not in data[2]:
+            errors.append("%s not written by the workers." % name)
+        elif not np.array_equal(value, data[2][name], equal_nan=True):
+            errors.append("%s differs with the workers." % name)
+    # assert no error message has been registered, else print messages
+    assert not errors, "errors occured:\n{}".format("\n".join(errors))
+
+
+def test_weight_cache():
+    """
+    Test the full pybdy processing with ln_weight_cache.
+
+    The test_zco_zco case is run twice with the weight cache. The second
+    run must load the weights saved by the first and write the same
+    output. A run with another rn_r0 must build and save new weights.
+    """
+    log_file = "./nrct.log"
+    coords = "./tests/data/coordinates.bdy.nc"
+    cache_files = "./tests/data/data_output_bdy_weights_*.npz"
+    outputs = [
+        "./tests/data/data_output_bdyT_y1979m11.nc",
+        "./tests/data/data_output_bdyU_y1979m11.nc",
+        "./tests/data/data_output_bdyV_y1979m11.nc",
+    ]
+
+    path1, path2, path3 = generate_sc_test_case(ztype="zco")
+    path4 = generate_dst_test_case(ztype="zco")
+
+    data = {}
+    log = {}
+    cache = {}
+    for run, r0 in [("cold", 0.041666666), ("warm", 0.041666666), ("r0", 0.05)]:
+        name_list_path = modify_namelist(
+            path1, path3, path4, "zco", "zco", weight_cache=True, r0=r0
+        )
+        log_start = os.path.getsize(log_file) if os.path.isfile(log_file) else 0
+
+        # Run pybdy
+        subprocess.run(
+            "pybdy -s " + name_list_path,
+            shell=True,
+            check=True,
+            text=True,
+        )
+        with open(log_file) as f:
+            f.seek(log_start)
+            log[run] = f.read()
+        cache[run] = {f: os.stat(f).st_mtime_ns for f in glob.glob(cache_files)}
+
+        data[run] = {}
+        for output in outputs:
+            ds = xr.open_dataset(output)
+            for name in ds.data_vars:
+                data[run][output + ":" + name] = ds[name].to_numpy()
+            ds.close()
+            os.remove(output)
+
+    # Clean up files
+    os.remove(path1)
+    os.remove(path2)
+    os.remove(path4)
+    os.remove(coords)
+    for f in cache["r0"]:
+        os.remove(f)
+
+    errors = []
+    if len(cache["cold"]) != 1:
+        errors.append("Weight cache not saved.")
+    elif "Using weight cache" not in log["warm"]:
+        errors.append("Weight cache not loaded.")
+    elif cache["warm"] != cache["cold"]:
+        errors.append("Weight cache saved again.")
+    elif (len(cache["r0"]) != 2) or ("Using weight cache" in log["r0"]):
+        errors.append("Weights not built again for another rn_r0.")
+    for name, value in data["cold"].items():
+        if name not in data["warm"]:
+            errors.append("%s not written with the weight cache." % name)
+        elif not np.array_equal(value, data["warm"][name], equal_nan=True):
+            errors.append("%s differs with the weight cache." % name)
+    # assert no error message has been registered, else print messages
+    assert not errors, "errors occured:\n{}".format("\n".join(errors))
+
+
+def test_async_write():
+    """
+    Test the full pybdy processing with ln_async_write.
+
+    The test_zco_zco case is run with each month written out in turn and
+    then with the months written in the background while the next is
+    extracted. The output must match exactly.
+    """
+    coords = "./tests/data/coordinates.bdy.nc"
+    outputs = [
+        "./tests/data/data_output_bdyT_y1979m11.nc",
+        "./tests/data/data_output_bdyU_y1979m11.nc",
+        "./tests/data/data_output_bdyV_y1979m11.nc",
+    ]
+
+    path1, path2, path3 = generate_sc_test_case(ztype="zco")
+    path4 = generate_dst_test_case(ztype="zco")
+
+    data = {}
+    for async_write in [False, True]:
+        name_list_path = modify_namelist(
+            path1, path3, path4, "zco", "zco", async_write=async_write
+        )
+
+        # Run pybdy
+        subprocess.run(
+            "pybdy -s " + name_list_path,
+            shell=True,
+            check=True,
+            text=True,
+        )
+
+        data[async_write] = {}
+        for output in outputs:
+            ds = xr.open_dataset(output)
+            for name in ds.data_vars:
+                data[async_write][output + ":" + name] = ds[name].to_numpy()
+            ds.close()
+            os.remove(output)
+
+    # Clean up files
+    os.remove(path1)
+    os.remove(path2)
+    os.remove(path4)
+    os.remove(coords)
+
+    errors = []
+    for name, value in data[False].items():
+        if name not in data[True]:
+            errors.append("%s not written in the background." % name)
+        elif not np.array_equal(value, data[True][name], equal_nan=True):
+            errors.append("%s differs when written in the background." % name)
+    # assert no error message has been registered, else print messages
+    assert not errors, "errors occured:\n{}".format("\n".join(errors))
+
+
+def test_async_write_error(monkeypatch):
+    """
+    Test an error writing a month in the background is raised.
+
+    The test_zco_zco case is run with ln_async_write and the U file made
+    to fail. process_bdy must raise the error once the other months have
+    been written.
+    """
+    coords = "./tests/data/coordinates.bdy.nc"
+    output_t = "./tests/data/data_output_bdyT_y1979m11.nc"
+    output_u = "./tests/data/data_output_bdyU_y1979m11.nc"
+    output_v = "./tests/data/data_output_bdyV_y1979m11.nc"
+
+    path1, path2, path3 = generate_sc_test_case(ztype="zco")
+    path4 = generate_dst_test_case(ztype="zco")
+    name_list_path = modify_namelist(
+        path1, path3, path4, "zco", "zco", async_write=True
+    )
+
+    write_out = profiler.extract.Extract.write_out
+
+    def fail_u(self, year, month, ind, unit_origin):
+        if self.g_type == "u":
+            raise ValueError("Bad write of the U grid")
+        write_out(self, year, month, ind, unit_origin)
+
+    monkeypatch.setattr(profiler.extract.Extract, "write_out", fail_u)
+
+    # Run pybdy
+    with pytest.raises(RuntimeError) as err:
+        profiler.process_bdy(name_list_path)
+    written = [os.path.isfile(output_t), os.path.isfile(output_v)]
+
+    # Clean up files
+    os.remove(path1)
+    os.remove(path2)
+    os.remove(path4)
+    for f in [coords, output_t, output_u, output_v]:
+        if os.path.isfile(f):
+            os.remove(f)
+
+    errors = []
+    if "ValueError: Bad write of the U grid" not in str(err.value):
+        errors.append("Error writing in the background not raised.")
+    elif written != [True, True]:
+        errors.append("Other months not written before the error was raised.")
+    # assert no error message has been registered, else print messages
+    assert not errors, "errors occured:\n{}".format("\n".join(errors))
+
+
+def test_block_read():
+    """
+    Test the full pybdy processing with ln_block_read.
+
+    The test_sco_sco case is run reading each time entry on its own, then
+    reading the whole month at once and then in blocks of nn_block_mem,
+    which splits the month unevenly. The output must match exactly.
+    """
+    coords = "./tests/data/coordinates.bdy.nc"
+    outputs = [
+        "./tests/data/data_output_bdyT_y1979m11.nc",
+        "./tests/data/data_output_bdyU_y1979m11.nc",
+        "./tests/data/data_output_bdyV_y1979m11.nc",
+    ]
+
+    path1, path2, path3 = generate_sc_test_case(ztype="sco")
+    path4 = generate_dst_test_case(ztype="sco")
+
+    data = {}
+    for run, block_read, block_mem in [
+        ("each", False, 0),
+        ("all", True, 0),
+        ("blocks", True, 1),
+    ]:
+        name_list_path = modify_namelist(
+            path1,
+            path3,
+            path4,
+            "sco",
+            "sco",
+            block_read=block_read,
+            block_mem=block_mem,
+        )
+
+        # Run pybdy
+        subprocess.run(
+            "pybdy -s " + name_list_path,
+            shell=True,
+            check=True,
+            text=True,
+        )
+
+        data[run] = {}
+        for output in outputs:
+            ds = xr.open_dataset(output)
+            for name in ds.data_vars:
+                data[run][output + ":" + name] = ds[name].to_numpy()
+            ds.close()
+            os.remove(output)
+
+    # Clean up files
+    os.remove(path1)
+    os.remove(path2)
+    os.remove(path4)
+    os.remove(coords)
+
+    errors = []
+    for run in ["all", "blocks"]:
+        for name, value in data["each"].items():
+            if name not in data[run]:
+                errors.append("%s not written, block read %s." % (name, run))
+            elif not np.array_equal(value, data[run][name], equal_nan=True):
+                errors.append("%s differs, block read %s." % (name, run))
+    # assert no error message has been registered, else print messages
+    assert not errors, "errors occured:\n{}".format("\n".join(errors))
+
+
 def generate_sc_test_case(ztype="zco", wrap=0):
     """
     Generate a synthetic test case for source.
@@ -888,7 +1604,24 @@ def A_to_C(grid):
     return grid
 
 
-def modify_namelist(path_src, path_sc_data, path_dst, src_zgr, dst_zgr, tide=False):
+def modify_namelist(
+    path_src,
+    path_sc_data,
+    path_dst,
+    src_zgr,
+    dst_zgr,
+    tide=False,
+    single_precision=False,
+    date_end="1979-12-01",
+    zinterp=True,
+    stream_write=False,
+    weight_cache=False,
+    r0=0.041666666,
+    async_write=False,
+    block_read=False,
+    block_mem=0,
+    tide_cache=False,
+):
     # Modify paths in a namelist file for testing.
 
     namelist_file = "./tests/data/namelist_zz_end_to_end.bdy"
@@ -951,7 +1684,7 @@ def modify_namelist(path_src, path_sc_data, path_dst, src_zgr, dst_zgr, tide=Fal
                     en = lines[li].split("!")[-1]
                     lines[li] = st + "= 9" + " !" + en
 
-            if "ln_tide" in lines[li]:
+            if "ln_tide " in lines[li]:
                 if tide:
                     st = lines[li].split("=")[0]
                     en = lines[li].split("!")[-1]
@@ -961,6 +1694,77 @@ def modify_namelist(path_src, path_sc_data, path_dst, src_zgr, dst_zgr, tide=Fal
                     en = lines[li].split("!")[-1]
                     lines[li] = st + "= .false." + " !" + en
 
+            if "ln_tide_cache" in lines[li]:
+                st = lines[li].split("=")[0]
+                en = lines[li].split("!")[-1]
+                if tide_cache:
+                    lines[li] = st + "= .true." + " !" + en
+                else:
+                    lines[li] = st + "= .false." + " !" + en
+
+            if "ln_zinterp" in lines[li]:
+                st = lines[li].split("=")[0]
+                en = lines[li].split("!")[-1]
+                if zinterp:
+                    lines[li] = st + "= .true." + " !" + en
+                else:
+                    lines[li] = st + "= .false." + " !" + en
+
+            if "ln_stream_write" in lines[li]:
+                st = lines[li].split("=")[0]
+                en = lines[li].split("!")[-1]
+                if stream_write:
+                    lines[li] = st + "= .true." + " !" + en
+                else:
+                    lines[li] = st + "= .false." + " !" + en
+
+            if "ln_weight_cache" in lines[li]:
+                st = lines[li].split("=")[0]
+                en = lines[li].split("!")[-1]
+                if weight_cache:
+                    lines[li] = st + "= .true." + " !" + en
+                else:
+                    lines[li] = st + "= .false." + " !" + en
+
+            if "ln_async_write" in lines[li]:
+                st = lines[li].split("=")[0]
+                en = lines[li].split("!")[-1]
+                if async_write:
+                    lines[li] = st + "= .true." + " !" + en
+                else:
+                    lines[li] = st + "= .false." + " !" + en
+
+            if "ln_block_read" in lines[li]:
+                st = lines[li].split("=")[0]
+                en = lines[li].split("!")[-1]
+                if block_read:
+                    lines[li] = st + "= .true." + " !" + en
+                else:
+                    lines[li] = st + "= .false." + " !" + en
+
+            if "nn_block_mem" in lines[li]:
+                st = lines[li].split("=")[0]
+                en = lines[li].split("!")[-1]
+                lines[li] = st + "= " + str(block_mem) + " !" + en
+
+            if "rn_r0" in lines[li]:
+                st = lines[li].split("=")[0]
+                en = lines[li].split("!")[-1]
+                lines[li] = st + "= " + str(r0) + " !" + en
+
+            if "sn_date_end" in lines[li]:
+                st = lines[li].split("=")[0]
+                en = lines[li].split("!")[-1]
+                lines[li] = st + "= '" + date_end + "' !" + en
+
+            if "ln_single_precision" in lines[li]:
+                st = lines[li].split("=")[0]
+                en = lines[li].split("!")[-1]
+                if single_precision:
+                    lines[li] = st + "= .true." + " !" + en
+                else:
+                    lines[li] = st + "= .false." + " !" + en
+
     with open(namelist_file, "w") as f:
         for li in range(len(lines)):
             f.write(lines[li])